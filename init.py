@@ -229,6 +229,9 @@ __pycache__/
 audio/*.wav
 audio/*.mp3
 !audio/audio_info.json
+audio/.probe_cache.json
+audio/pcm/
+.tts_cache/
 
 # Video
 *.mp4
@@ -262,7 +265,7 @@ def main():
             error("依赖检查失败，请先安装必需依赖")
             print()
             print("快速安装:")
-            print("  pip install manim edge-tts mutagen")
+            print("  pip install manim edge-tts")
             print()
             print("或跳过依赖检查:")
             print("  python init.py [项目目录] --skip-deps")
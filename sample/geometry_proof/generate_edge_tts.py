@@ -8,10 +8,15 @@
 示例:
     python generate_edge_tts.py 几何_20260128_正方形面积问题_分镜.md ./audio
     python generate_edge_tts.py 分镜.md ./audio --voice zh-CN-YunjianNeural
+    python generate_edge_tts.py 分镜.md ./audio --jobs 8
+    python generate_edge_tts.py 分镜.md ./audio --cache-dir ./.tts_cache
+    python generate_edge_tts.py 分镜.md ./audio --incremental
+    python generate_edge_tts.py 分镜.md ./audio --chunk 60
+    python generate_edge_tts.py 分镜.md ./audio --trim
+    python generate_edge_tts.py 分镜.md ./audio --fit
 """
 
 import asyncio
-import edge_tts
 import re
 import os
 import sys
@@ -20,11 +25,16 @@ import json
 from pathlib import Path
 from typing import List, Dict, Optional
 
-try:
-    import miniaudio
-    HAS_MINIAUDIO = True
-except ImportError:
-    HAS_MINIAUDIO = False
+# 共用 scripts/ 下的合成引擎（并发调度等）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+from tts_engine import (run_bounded, ResilientCaller, CallFailed,
+                        DEFAULT_JOBS, DEFAULT_RPS, DEFAULT_RETRIES)
+from tts_cache import TTSCache, cache_key, remove_output, DEFAULT_CACHE_SIZE_MB
+from tts_backends import (create_backend, is_transient, TTSBackendError,
+                          compact_boundaries, expand_boundaries)
+from tts_chunks import synthesize_chunked, chunk_format, DEFAULT_CHUNK_CHARS, DEFAULT_CHUNK_GAP
+from tts_fit import DurationModel, fit_rate, rate_for, within, DEFAULT_FIT_TOLERANCE
+from storyboard import compile_storyboard
 
 # Edge TTS 支持的中文语音
 VOICES = {
@@ -39,115 +49,209 @@ VOICES = {
 DEFAULT_VOICE = 'zh-CN-XiaoxiaoNeural'
 
 
-def get_audio_duration(audio_path: str) -> float:
-    """
-    获取音频文件的时长（秒）
+def parse_storyboard(storyboard_path) -> List[Dict]:
+    """解析分镜脚本，提取有读白的场景（由 scripts/storyboard.py 编译，按内容哈希缓存）"""
+    scenes = []
+    for scene in compile_storyboard(storyboard_path)['scenes']:
+        if not scene['voiceover']:
+            continue
+        duration = scene['target_duration']
+        scenes.append({
+            "scene_num": scene['num'],
+            "title": scene['title'],
+            "duration": f"{duration:g}秒" if duration is not None else "0秒",
+            "target_duration": duration,
+            "voiceover": scene['voiceover'],
+            "emotion": scene['emotion'].split('/')[0].strip()
+        })
+    return scenes
+
 
-    参数:
-        audio_path: 音频文件路径
+async def generate_audio(text: str, output_file: str, voice: str = DEFAULT_VOICE, backend=None,
+                         caller=None, chunk_chars: int = DEFAULT_CHUNK_CHARS,
+                         chunk_gap: float = DEFAULT_CHUNK_GAP, rate: str = '+0%'):
+    """
+    使用 TTS 后端（默认 Edge TTS）流式生成音频；超长读白按句切分并发合成后拼接
 
     返回:
-        时长（秒）
+        ({'duration': 秒, 'boundaries': 边界事件列表, 'chunks': 分句偏移}, 调用次数)
+        时长取自合成流，无需再探测文件
     """
+    backend = backend or create_backend('edge')
+    caller = caller or ResilientCaller(is_transient=is_transient)
+    return await synthesize_chunked(backend, caller, text, voice, output_file, rate,
+                                    max_chars=chunk_chars, gap=chunk_gap)
+
+
+def audio_filename(scene: Dict) -> str:
+    """场景音频文件名"""
+    return f"audio_{scene['scene_num']:03d}_{scene['title']}.mp3"
+
+
+AUDIO_FILE_PATTERN = re.compile(r'^audio_\d{3}_.+\.mp3$')
+
+
+def load_json(path: Path) -> Optional[Dict]:
+    """读取 JSON 文件，不存在或损坏时返回 None"""
     try:
-        if HAS_MINIAUDIO:
-            info = miniaudio.get_file_info(audio_path)
-            return info.duration
-        else:
-            # 使用 ffprobe 或 fallback
-            import subprocess
-            result = subprocess.run(
-                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                 '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
-                capture_output=True, text=True
-            )
-            if result.returncode == 0:
-                return float(result.stdout.strip())
-    except Exception as e:
-        print(f"  警告: 无法获取音频时长: {e}")
-    return 0.0
-
-
-def parse_storyboard(md_content: str):
-    """解析分镜脚本，提取读白"""
-    scenes = []
-    num_map = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
-
-    lines = md_content.split('\n')
-    current_scene = None
-    in_voiceover = False
-    voiceover_lines = []
-
-    for line in lines:
-        if line.startswith('###') and '第' in line and '幕' in line and '（' in line and '秒）' in line:
-            if current_scene and current_scene.get('voiceover'):
-                scenes.append(current_scene)
-
-            num_char = ''
-            for c in line:
-                if c in num_map:
-                    num_char = c
-                    break
-
-            idx_mu = line.find('幕')
-            idx_bracket = line.find('（')
-            if idx_mu > 0 and idx_bracket > idx_mu:
-                title = line[idx_mu+1:idx_bracket].strip()
-                if ':' in title:
-                    title = title[1:]
-                if '：' in title:
-                    title = title[1:]
-
-                idx_end = line.find('秒）')
-                duration = line[idx_bracket+1:idx_end] if idx_end > 0 else '0'
-
-                current_scene = {
-                    "scene_num": num_map.get(num_char, len(scenes) + 1),
-                    "title": title.strip(),
-                    "duration": f"{duration}秒",
-                    "voiceover": ""
-                }
-                in_voiceover = False
-                voiceover_lines = []
-                continue
-
-        if current_scene and '**读白**' in line:
-            in_voiceover = True
-            if ':' in line or '：' in line:
-                content_part = line.split(':', 1)[-1].split('：', 1)[-1].strip()
-                if content_part and content_part.startswith('"') and content_part.endswith('"'):
-                    content_part = content_part[1:-1]
-                if content_part and not content_part.startswith('-') and not content_part.startswith('示例'):
-                    voiceover_lines = [content_part]
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_if_changed(path: Path, data: Dict) -> bool:
+    """内容有变化时才写入（临时文件 + rename），避免无谓的 mtime 变化；返回是否写入"""
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    try:
+        if path.read_text(encoding='utf-8') == text:
+            return False
+    except OSError:
+        pass
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+    return True
+
+
+def fit_target(scene: Dict, fit: bool) -> Optional[float]:
+    """语速拟合的目标时长（未开启拟合或分镜未标注时为 None）"""
+    return scene['target_duration'] if fit and scene.get('target_duration') else None
+
+
+def plan_incremental(scenes: List[Dict], output_dir: Path, voice: str, output_format: str,
+                     fit: bool = False):
+    """
+    对比分镜与已有清单，确定需要重新合成的场景
+
+    返回:
+        (changed, reused, orphans)
+        changed: 需要合成的场景号集合（新增或读白/标题/拟合目标变化，或音频文件缺失）
+        reused: {场景号: 旧清单条目}，可直接复用
+        orphans: 不再被分镜引用的音频文件
+    """
+    manifest = load_json(output_dir / "audio_manifest.json") or {}
+    same_engine = (manifest.get('voice') == voice
+                   and manifest.get('output_format', output_format) == output_format)
+    old = {item['scene_num']: item for item in manifest.get('scenes', [])} if same_engine else {}
+
+    changed, reused = set(), {}
+    for scene in scenes:
+        if not scene['voiceover']:
             continue
+        entry = old.get(scene['scene_num'])
+        if (entry and entry.get('title') == scene['title']
+                and entry.get('voiceover') == scene['voiceover']
+                and entry.get('fit_target') == fit_target(scene, fit)
+                and (output_dir / audio_filename(scene)).exists()):
+            reused[scene['scene_num']] = entry
+        else:
+            changed.add(scene['scene_num'])
 
-        if in_voiceover and current_scene:
-            if line.startswith('**') and '读白' not in line:
-                in_voiceover = False
-                if voiceover_lines:
-                    current_scene['voiceover'] = ' '.join(voiceover_lines).strip()
-                continue
+    wanted = {audio_filename(s) for s in scenes if s['voiceover']}
+    orphans = sorted(p for p in output_dir.glob('audio_*.mp3')
+                     if AUDIO_FILE_PATTERN.match(p.name) and p.name not in wanted)
+    return changed, reused, orphans
 
-            if line.strip() and not line.strip().startswith('示例') and not line.strip().startswith('-'):
-                voiceover_lines.append(line.strip())
 
-        if current_scene and '**情感**' in line:
-            if ':' in line or '：' in line:
-                content_part = line.split(':', 1)[-1].split('：', 1)[-1].strip()
-                if content_part and not content_part.startswith('-'):
-                    current_scene['emotion'] = content_part.split('/')[0].strip()
+def patch_outputs(output_dir: Path, scenes_with_duration: List[Dict], voice: str, output_format: str):
+    """
+    按当前场景列表修补 audio_manifest.json 与 timeline.json
 
-    if current_scene and current_scene.get('voiceover'):
-        scenes.append(current_scene)
+    已有条目上的其它字段（如后续工具写入的信息）保留，只更新本脚本负责的字段；
+    已删除的场景移除，新场景追加，顺序与分镜一致。
 
-    return scenes
+    返回:
+        (manifest_path, timeline_path, timeline)
+    """
+    manifest_path = output_dir / "audio_manifest.json"
+    timeline_path = output_dir / "timeline.json"
+    old_manifest = load_json(manifest_path) or {}
+    old_timeline = load_json(timeline_path) or {}
+    old_m = {e.get('scene_num'): e for e in old_manifest.get('scenes', [])}
+    old_t = {e.get('scene_num'): e for e in old_timeline.get('scenes', [])}
+
+    manifest_scenes, timeline_scenes = [], []
+    for i, s in enumerate(scenes_with_duration):
+        keep = s.get('reused', False)
+        entry = dict(old_m.get(s['scene_num'], {})) if keep else {}
+        entry.update({
+            "scene_num": s['scene_num'],
+            "title": s['title'],
+            "voiceover": s['voiceover'],
+            "duration": s.get('duration', 0),
+            "attempts": s.get('attempts', 0),
+            "audio_file": audio_filename(s)
+        })
+        if s.get('chunks'):
+            entry['chunks'] = s['chunks']
+        else:
+            entry.pop('chunks', None)
+        # 语速拟合：记录所选语速与目标时长，目标不变时增量模式直接复用
+        if s.get('fit_target'):
+            entry['rate'] = s['rate']
+            entry['fit_target'] = s['fit_target']
+        else:
+            entry.pop('rate', None)
+            entry.pop('fit_target', None)
+        manifest_scenes.append(entry)
+
+        entry = dict(old_t.get(s['scene_num'], {})) if keep else {}
+        entry.update({
+            "index": i + 1,
+            "scene_num": s['scene_num'],
+            "title": s['title'],
+            "duration": s.get('duration', 0),
+            "audio_file": audio_filename(s),
+            "voiceover": s['voiceover'][:100] + "..." if len(s['voiceover']) > 100 else s['voiceover']
+        })
+        # 分句合成时记录每句在场景音频中的起止，供渲染端做句级同步
+        if s.get('chunks'):
+            entry['chunks'] = s['chunks']
+        else:
+            entry.pop('chunks', None)
+        # 词边界时间戳（复用的场景沿用时间轴中已有的记录）
+        if not keep:
+            boundaries = compact_boundaries(s.get('boundaries'))
+            if boundaries:
+                entry['boundaries'] = boundaries
+        timeline_scenes.append(entry)
 
+    # 生成清单文件（包含时长）
+    manifest = dict(old_manifest)
+    manifest.update({
+        "total_scenes": len(manifest_scenes),
+        "voice": voice,
+        "output_format": output_format,
+        "scenes": manifest_scenes
+    })
+    write_json_if_changed(manifest_path, manifest)
 
-async def generate_audio(text: str, output_file: str, voice: str = DEFAULT_VOICE):
-    """使用 Edge TTS 生成音频"""
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(output_file)
-    return output_file
+    # 生成时间轴文件（用于Manim生成）
+    timeline = dict(old_timeline)
+    timeline.update({
+        "total_duration": sum(e['duration'] for e in timeline_scenes),
+        "scenes": timeline_scenes
+    })
+    write_json_if_changed(timeline_path, timeline)
+
+    return manifest_path, timeline_path, timeline
+
+
+def print_fit_report(scenes_with_duration: List[Dict], tolerance: float):
+    """语速拟合结果：各幕实测时长与目标的偏差，未达标的幕单独列出"""
+    fitted = [s for s in scenes_with_duration if s.get('fit_target')]
+    if not fitted:
+        print("\n语速拟合: 分镜标题中没有目标时长，未调整")
+        return
+    missed = [s for s in fitted if not within(s['duration'], s['fit_target'], tolerance)]
+    print(f"\n语速拟合: {len(fitted) - len(missed)}/{len(fitted)} 幕落在目标 ±{tolerance:.0%} 内")
+    for s in missed:
+        delta = s['duration'] - s['fit_target']
+        print(f"  ⚠️ 场景 {s['scene_num']}: {s['duration']:.2f}秒 / 目标 {s['fit_target']:g}秒 "
+              f"({delta:+.2f}秒，语速 {s['rate']})")
+    if missed:
+        print("  语速已到上下限或多次修正仍未达标，请精简/扩充读白或调整目标时长")
 
 
 async def main():
@@ -162,6 +266,18 @@ async def main():
   # 使用 Yunjian 男声
   python generate_edge_tts.py 分镜.md ./audio --voice yunjian
 
+  # 8 个场景并发合成
+  python generate_edge_tts.py 分镜.md ./audio --jobs 8
+
+  # 增量模式：只合成改动过的场景
+  python generate_edge_tts.py 分镜.md ./audio --incremental --yes
+
+  # 按分镜标题中的目标时长为每幕拟合语速
+  python generate_edge_tts.py 分镜.md ./audio --fit --fit-tolerance 0.05
+
+  # 离线替身后端（无需网络，用于压测）
+  python generate_edge_tts.py 分镜.md ./audio --backend offline:latency=0.5 --yes
+
 可用语音:
   xiaoxiao  - 女声，温暖（默认）
   xiaoyi    - 女声，清脆
@@ -177,6 +293,32 @@ async def main():
     parser.add_argument('--voice', default='xiaoxiao', choices=list(VOICES.keys()),
                        help='语音选择（默认：xiaoxiao）')
     parser.add_argument('--yes', action='store_true', help='跳过确认直接生成')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                       help=f'并发合成数（默认：{DEFAULT_JOBS}，1 为串行）')
+    parser.add_argument('--cache-dir', default=str(TTSCache.default_dir()),
+                       help='TTS 缓存目录（默认：全局 ~/.cache/tutor/tts，可指定项目内目录）')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE_MB,
+                       help=f'缓存上限 MB（默认：{DEFAULT_CACHE_SIZE_MB}，超出按 LRU 淘汰）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用缓存，全部重新合成')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                       help=f'每秒最多发起的 TTS 请求数（默认：{DEFAULT_RPS:g}，0 为不限流）')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                       help=f'瞬时错误的最大重试次数（默认：{DEFAULT_RETRIES}）')
+    parser.add_argument('--incremental', action='store_true',
+                       help='增量模式：只合成新增/改动的场景，删除孤立音频，修补清单与时间轴')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_CHARS,
+                       help='超过该字数的读白在句末标点处切分，并发合成后拼接（默认：0 不切分）')
+    parser.add_argument('--chunk-gap', type=float, default=DEFAULT_CHUNK_GAP,
+                       help=f'分句拼接的句间静音秒数（默认：{DEFAULT_CHUNK_GAP:g}）')
+    parser.add_argument('--trim', action='store_true',
+                       help='合成后裁掉首尾静音，并在清单与时间轴中记录内部停顿（需要 numpy 与 ffmpeg）')
+    parser.add_argument('--fit', action='store_true',
+                       help='按分镜标题中的目标时长为每幕选择语速（预测时长，未达标时按实测修正后经缓存重新合成）')
+    parser.add_argument('--fit-tolerance', type=float, default=DEFAULT_FIT_TOLERANCE,
+                       help=f'语速拟合的相对容差（默认：{DEFAULT_FIT_TOLERANCE:g}，即目标时长的 ±5%%）')
+    parser.add_argument('--backend', default='edge',
+                       help='TTS 后端（默认：edge）；offline[:latency=秒,fail=失败率,cps=每秒字数,format=mp3|wav,seed=N] '
+                            '为本地确定性替身，无需网络')
 
     args = parser.parse_args()
 
@@ -186,14 +328,9 @@ async def main():
         print(f"错误: 分镜文件不存在: {storyboard_path}")
         sys.exit(1)
 
-    # 读取分镜内容
-    print(f"读取分镜脚本: {storyboard_path}")
-    with open(storyboard_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
     # 解析分镜
-    print("解析分镜脚本...")
-    scenes = parse_storyboard(content)
+    print(f"读取分镜脚本: {storyboard_path}")
+    scenes = parse_storyboard(storyboard_path)
     print(f"找到 {len(scenes)} 个场景\n")
 
     if not scenes:
@@ -207,94 +344,198 @@ async def main():
     # 获取语音
     voice = VOICES.get(args.voice, DEFAULT_VOICE)
 
+    try:
+        backend = create_backend(args.backend)
+    except TTSBackendError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+
+    # 清单中记录的输出格式（含分句参数），参数变化时增量模式会全部重新合成
+    engine_format = backend.output_format
+    if args.chunk > 0:
+        engine_format += f"|chunk{args.chunk}|gap{args.chunk_gap:g}"
+
+    # 增量模式：对比已有清单
+    reused, orphans = {}, []
+    if args.incremental:
+        changed, reused, orphans = plan_incremental(scenes, output_dir, voice, engine_format, args.fit)
+
+    # 语速拟合的时长模型（合成过程中按实测校准）
+    model = DurationModel()
+
     # 显示场景列表
     print("场景列表:")
     for scene in scenes:
-        print(f"  场景 {scene['scene_num']}: {scene['title']}")
+        mark = "（未变化，复用）" if scene['scene_num'] in reused else ""
+        print(f"  场景 {scene['scene_num']}: {scene['title']}{mark}")
         print(f"    读白: {scene['voiceover'][:50]}...")
+        target = fit_target(scene, args.fit)
+        if target:
+            predicted = model.predict(scene['voiceover'])
+            rate = '+0%' if within(predicted, target, args.fit_tolerance) else rate_for(
+                model.body(scene['voiceover']), target)
+            print(f"    预测: {predicted:.1f}秒 / 目标 {target:g}秒 → 语速 {rate}")
         print()
 
-    # 确认
-    if not args.yes:
+    if args.incremental:
+        print(f"增量模式: 需合成 {len(changed)} 个场景，复用 {len(reused)} 个，孤立文件 {len(orphans)} 个\n")
+
+    # 确认（增量模式下无事可做时无需确认）
+    nothing_to_do = args.incremental and not changed and not orphans
+    if not args.yes and not nothing_to_do:
         response = input(f"是否继续生成音频? (使用语音: {args.voice}) (y/n): ").strip().lower()
         if response != 'y':
             print("已取消")
             sys.exit(0)
 
     # 生成所有场景的音频
-    print(f"\n开始生成音频 (使用 Edge TTS - {voice})...\n")
+    print(f"\n开始生成音频 (后端 {backend.name} - {voice}, 并发: {args.jobs})...\n")
 
     generated_files = []
     scenes_with_duration = []
+    cache = None if args.no_cache else TTSCache(args.cache_dir, args.cache_size)
+    # 分句并发时请求数可能超过场景数，同时进行中的请求也限制在 --jobs 以内
+    caller = ResilientCaller(rps=args.rps, retries=args.retries, is_transient=is_transient,
+                             concurrency=args.jobs)
+
+    async def synthesize(index, scene):
+        if not scene['voiceover']:
+            return None
+
+        output_path = output_dir / audio_filename(scene)
+        if scene['scene_num'] in reused:
+            entry = reused[scene['scene_num']]
+            return {'path': output_path, 'duration': entry.get('duration', 0), 'error': None,
+                    'cached': False, 'reused': True, 'attempts': entry.get('attempts', 0),
+                    'chunks': entry.get('chunks', []), 'rate': entry.get('rate', '+0%'),
+                    'fit_target': entry.get('fit_target'), 'passes': 0}
+
+        fmt = chunk_format(backend.output_format, scene['voiceover'], args.chunk, args.chunk_gap)
+        passes = 0
+
+        def known(rate):
+            """缓存中该语速的实测时长"""
+            meta = cache.peek(cache_key(scene['voiceover'], voice, rate, fmt=fmt)) if cache is not None else None
+            return meta['duration'] if meta else None
+
+        async def synthesize_at(rate):
+            nonlocal passes
+            passes += 1
+            key = cache_key(scene['voiceover'], voice, rate, fmt=fmt)
+            # 缓存命中：时长直接取自缓存元数据
+            if cache is not None:
+                hit = cache.fetch(key, output_path)
+                if hit is not None:
+                    return {'path': output_path, 'duration': hit['duration'], 'error': None,
+                            'cached': True, 'reused': False, 'attempts': 0,
+                            'chunks': hit.get('chunks', []),
+                            'boundaries': expand_boundaries(hit.get('boundaries'))}
+
+            remove_output(output_path)
+            synthesis, attempts = await generate_audio(
+                scene['voiceover'], str(output_path), voice, backend, caller, args.chunk, args.chunk_gap, rate)
+            duration = synthesis['duration']
+            chunks = synthesis['chunks'] if len(synthesis['chunks']) > 1 else []
+            if cache is not None and duration > 0:
+                cache.store(key, output_path, duration, voice=voice, text=scene['voiceover'][:50],
+                            chunks=chunks, boundaries=compact_boundaries(synthesis['boundaries']))
+            return {'path': output_path, 'duration': duration, 'error': None,
+                    'cached': False, 'reused': False, 'attempts': attempts, 'chunks': chunks,
+                    'boundaries': synthesis['boundaries']}
 
-    for scene in scenes:
+        try:
+            target = fit_target(scene, args.fit)
+            result, rate = await fit_rate(synthesize_at, scene['voiceover'], target, model, known,
+                                          args.fit_tolerance)
+            result.update({'rate': rate, 'fit_target': target, 'passes': passes})
+            return result
+        except CallFailed as e:
+            remove_output(output_path)
+            return {'path': output_path, 'duration': 0, 'error': e, 'cached': False, 'attempts': e.attempts}
+        except Exception as e:
+            remove_output(output_path)
+            return {'path': output_path, 'duration': 0, 'error': e, 'cached': False, 'attempts': 0}
+
+    def report(index, scene, result):
         num = scene['scene_num']
         title = scene['title']
-        voiceover = scene['voiceover']
 
-        if not voiceover:
+        if result is None:
             print(f"跳过场景 {num}: 无读白内容")
-            continue
-
-        filename = f"audio_{num:03d}_{title}.mp3"
-        output_path = output_dir / filename
-
-        print(f"生成场景 {num}: {title}")
-        try:
-            await generate_audio(voiceover, str(output_path), voice)
-            file_size = output_path.stat().st_size / 1024
-
-            # 获取音频时长
-            duration = get_audio_duration(str(output_path))
-            scene['duration'] = duration
+            return
+
+        if result.get('reused'):
+            scene['duration'] = result['duration']
+            scene['attempts'] = result['attempts']
+            scene['reused'] = True
+            scene['chunks'] = result['chunks']
+            scene['rate'] = result['rate']
+            scene['fit_target'] = result['fit_target']
             scenes_with_duration.append(scene)
+            generated_files.append(result['path'])
+            print(f"场景 {num}: {title} 未变化，跳过 ({result['duration']:.2f}秒)")
+            return
 
-            print(f"  ✓ 已生成: {filename} ({file_size:.1f} KB, {duration:.2f}秒)")
-            generated_files.append(output_path)
-        except Exception as e:
-            print(f"  ✗ 错误: {e}")
-
-    # 生成清单文件（包含时长）
-    manifest_path = output_dir / "audio_manifest.json"
-    manifest = {
-        "total_scenes": len(scenes_with_duration),
-        "voice": voice,
-        "scenes": [
-            {
-                "scene_num": s['scene_num'],
-                "title": s['title'],
-                "voiceover": s['voiceover'],
-                "duration": s.get('duration', 0),
-                "audio_file": f"audio_{s['scene_num']:03d}_{s['title']}.mp3"
-            }
-            for s in scenes_with_duration
-        ]
-    }
-    with open(manifest_path, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
-
-    # 生成时间轴文件（用于Manim生成）
-    timeline_path = output_dir / "timeline.json"
-    timeline = {
-        "total_duration": sum(s.get('duration', 0) for s in scenes_with_duration),
-        "scenes": [
-            {
-                "index": i + 1,
-                "scene_num": s['scene_num'],
-                "title": s['title'],
-                "duration": s.get('duration', 0),
-                "audio_file": f"audio_{s['scene_num']:03d}_{s['title']}.mp3",
-                "voiceover": s['voiceover'][:100] + "..." if len(s['voiceover']) > 100 else s['voiceover']
-            }
-            for i, s in enumerate(scenes_with_duration)
-        ]
-    }
-    with open(timeline_path, 'w', encoding='utf-8') as f:
-        json.dump(timeline, f, ensure_ascii=False, indent=2)
+        print(f"生成场景 {num}: {title}")
+        if result['error'] is not None:
+            print(f"  ✗ 错误: {result['error']} (尝试 {result['attempts']} 次)")
+            return
+
+        output_path = result['path']
+        file_size = output_path.stat().st_size / 1024
+        scene['duration'] = result['duration']
+        scene['attempts'] = result['attempts']
+        scene['chunks'] = result['chunks']
+        scene['boundaries'] = result['boundaries']
+        scene['rate'] = result['rate']
+        scene['fit_target'] = result['fit_target']
+        scenes_with_duration.append(scene)
+        if result['cached']:
+            source = "，缓存"
+        elif result['attempts'] > 1:
+            source = f"，第 {result['attempts']} 次尝试成功"
+        else:
+            source = ""
+        if result['chunks']:
+            source += f"，分 {len(result['chunks'])} 句合成"
+        if result['fit_target']:
+            source += f"，语速 {result['rate']}（目标 {result['fit_target']:g}秒"
+            source += f"，合成 {result['passes']} 次）" if result['passes'] > 1 else "）"
+        print(f"  ✓ 已生成: {output_path.name} ({file_size:.1f} KB, {result['duration']:.2f}秒{source})")
+        generated_files.append(output_path)
+
+    await run_bounded(scenes, synthesize, jobs=args.jobs, on_done=report)
+
+    if cache is not None:
+        cache.save()
+        print(f"\n{cache.summary()}")
+
+    # 删除不再被分镜引用的音频
+    for orphan in orphans:
+        orphan.unlink()
+        print(f"删除孤立音频: {orphan.name}")
+
+    manifest_path, timeline_path, timeline = patch_outputs(
+        output_dir, scenes_with_duration, voice, engine_format)
+
+    # 裁剪全部场景的首尾静音，时长与词边界随之更新；复用的场景上次未必带 --trim，
+    # 已裁剪过的文件不会改写，再处理一遍只多一次解码
+    if args.trim:
+        from audio_trim import trim_audio_dir, print_report
+        print("\n裁剪首尾静音...")
+        outcomes, errors = trim_audio_dir(
+            str(output_dir), [audio_filename(s) for s in scenes_with_duration])
+        print_report(outcomes, errors)
+        timeline = load_json(timeline_path) or timeline
+
+    if args.fit:
+        print_fit_report(scenes_with_duration, args.fit_tolerance)
 
     print(f"\n{'='*60}")
     print(f"音频生成完成！")
     print(f"生成文件数: {len(generated_files)}/{len(scenes)}")
+    if args.incremental:
+        print(f"复用场景数: {len(reused)}")
     print(f"总时长: {timeline['total_duration']:.2f}秒")
     print(f"输出目录: {output_dir}")
     print(f"语音: {voice}")
@@ -305,6 +546,14 @@ async def main():
     print(f"\n音频清单: {manifest_path}")
     print(f"时间轴文件: {timeline_path}")
     print(f"{'='*60}")
+
+    missing = [s for s in scenes if s['voiceover'] and s not in scenes_with_duration]
+    if missing:
+        print(f"\n⚠️ {len(missing)} 个场景重试后仍生成失败，请重新运行（已成功的场景会命中缓存）:")
+        for s in missing:
+            print(f"  - 场景 {s['scene_num']}: {s['title']}")
+        sys.exit(1)
+
     print("\n✅ 音频时长已自动记录，可直接用于生成Manim代码")
 
 
@@ -25,7 +25,7 @@ if [ "$1" == "--help" ] || [ "$1" == "-h" ]; then
     echo "  1. 生成 TTS 音频"
     echo "  2. 记录每段音频实际时长 → audio/timeline.json"
     echo "  3. 渲染视频（画面自动等待对应音频时长）"
-    echo "  4. 合并音视频 → final_video.mp4"
+    echo "  4. 合并音视频（按文件响度增益）→ final_video.mp4"
     exit 0
 fi
 
@@ -79,17 +79,20 @@ echo ""
 
 PYTHON="$VENV_DIR/bin/python"
 MANIM="$VENV_DIR/bin/manim"
+# 音频时长探测（只解析文件头，不依赖 ffprobe）
+AUDIO_PROBE="../../scripts/audio_probe.py"
+# 分镜编译器（生成各工具共用的结构化 IR）
+STORYBOARD_TOOL="../../scripts/storyboard.py"
+# 响度测量（EBU R128），输出按文件增益的 volume 滤镜，在合成音视频时一次施加
+LOUDNESS_TOOL="../../scripts/audio_loudness.py"
 
 # 步骤 1: 生成音频
 generate_audio() {
     echo "📢 步骤 1: 生成 TTS 音频"
     echo "----------------------------------------"
 
-    # 查找分镜文件
-    STORYBOARD=$(ls *.md 2>/dev/null | grep -E "(分镜|storyboard)" | head -1)
-    if [ -z "$STORYBOARD" ]; then
-        STORYBOARD=$(ls *.md 2>/dev/null | head -1)
-    fi
+    # 查找分镜文件（编译结果按内容哈希缓存，后续工具直接复用）
+    STORYBOARD=$("$PYTHON" "$STORYBOARD_TOOL" --find . 2>/dev/null || true)
 
     if [ -z "$STORYBOARD" ]; then
         echo "❌ 错误: 未找到分镜脚本 (.md 文件)"
@@ -177,12 +180,21 @@ merge_audio_video() {
         ffmpeg -f concat -safe 0 -i "$AUDIO_LIST" -c copy /tmp/combined_audio.mp3 -y 2>/dev/null || true
 
         if [ -f "/tmp/combined_audio.mp3" ]; then
-            AUDIO_DURATION=$(ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 /tmp/combined_audio.mp3 2>/dev/null | cut -d. -f1)
+            AUDIO_DURATION=$("$PYTHON" "$AUDIO_PROBE" --duration /tmp/combined_audio.mp3 2>/dev/null | cut -d. -f1)
             echo "音频时长: ${AUDIO_DURATION}秒"
             echo ""
 
+            # 响度归一：每个文件一个增益（测量结果随探测缓存复用），
+            # 在下面唯一一次 AAC 编码中施加，不再对整条音轨做两遍 loudnorm
+            GAIN_ARGS=()
+            GAIN_FILTER=$("$PYTHON" "$LOUDNESS_TOOL" --filter audio/audio_*.mp3 2>/dev/null || true)
+            if [ -n "$GAIN_FILTER" ]; then
+                echo "响度归一: 按文件增益对齐到 -16 LUFS"
+                GAIN_ARGS=(-af "$GAIN_FILTER")
+            fi
+
             # 合并视频和音频（取较长者）
-            ffmpeg -i "$VIDEO_FILE" -i /tmp/combined_audio.mp3 -c:v copy -c:a aac \
+            ffmpeg -i "$VIDEO_FILE" -i /tmp/combined_audio.mp3 -c:v copy "${GAIN_ARGS[@]}" -c:a aac \
                    -shortest final_video.mp4 -y 2>&1 | grep -E "(Duration|Output|Stream)" || true
 
             echo ""
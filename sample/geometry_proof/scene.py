@@ -47,6 +47,42 @@ def load_audio_timings():
 
 AUDIO_TIMINGS = load_audio_timings()
 
+
+def load_audio_boundaries():
+    """从 timeline.json 加载各场景读白的词边界时间戳（offsets/tokens），不存在时返回空表"""
+    timeline_path = "audio/timeline.json"
+    if not os.path.exists(timeline_path):
+        return {}
+    with open(timeline_path, 'r', encoding='utf-8') as f:
+        timeline = json.load(f)
+    scene_names = ['opening', 'show_figure', 'tangent', 'hyperbola', 'monge', 'summary']
+    boundaries = {}
+    for scene in timeline.get('scenes', []):
+        idx = scene.get('index', 0)
+        if scene.get('boundaries') and 0 < idx <= len(scene_names):
+            boundaries[scene_names[idx-1]] = scene['boundaries']
+    return boundaries
+
+
+def narration_time(boundaries, text):
+    """读白中 text 开始被念出的时刻（秒，相对场景音频开头），找不到时返回 None"""
+    if not boundaries:
+        return None
+    starts = []
+    joined = ""
+    for token in boundaries['tokens']:
+        starts.append(len(joined))
+        joined += token.replace(" ", "")
+    pos = joined.find(text.replace(" ", ""))
+    if pos < 0:
+        return None
+    # 包含 pos 的最后一个词
+    index = max(i for i, start in enumerate(starts) if start <= pos)
+    return boundaries['offsets'][index]
+
+
+AUDIO_BOUNDARIES = load_audio_boundaries()
+
 # 颜色定义
 CIRCLE_I_COLOR = "#3498db"   # 蓝色 - 内切圆 I (虚线)
 CIRCLE_J_COLOR = "#e74c3c"   # 红色 - 内切圆 J (虚线)
@@ -177,6 +213,21 @@ class GeometryProof(Scene):
         else:
             print(f"   ⚠️  动画用时 {animation_time:.2f}秒 已超过音频时长!")
 
+    def wait_until_narration(self, text):
+        """等待到当前场景读白念到 text 的时刻（按合成时记录的词边界时间戳）
+
+        例如在念到"双曲线"时再画出双曲线：
+            self.wait_until_narration("双曲线")
+            self.play(Create(hyperbola))
+        """
+        target = narration_time(AUDIO_BOUNDARIES.get(self.current_scene_name), text)
+        if target is None:
+            print(f"   ⚠️  读白中未找到「{text}」的时间戳，不等待")
+            return
+        remaining = target - (self.time - self.scene_start_time)
+        if remaining > 0:
+            self.wait(remaining)
+
     def construct(self):
         # 计算所有几何元素
         geo = calculate_geometry()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+响度测量（EBU R128 / ITU-R BS.1770 积分响度）与按文件增益
+
+功能：
+- 每个音频解码一次为 PCM，NumPy 计算 K 计权积分响度（LUFS）与采样峰值（dBFS）：
+  K 计权两级滤波在频域一次完成（rfft × 频响 × irfft），400ms 块、75% 重叠，
+  -70 LUFS 绝对门限 + 相对 -10 LU 门限
+- 每个文件得到一个增益（dB）= 目标响度 - 实测响度，并受峰值上限（-1 dBFS）约束
+- 测量结果与文件头探测结果存在同一个旁路缓存（audio/.probe_cache.json），
+  文件未变化时不再解码；validate_audio.py --loudness 在验证时顺带测量并写入 audio_info.json
+- --filter 输出 ffmpeg volume 滤镜表达式：按各文件在拼接音轨中的起止时间施加各自的增益，
+  在最终合成音视频时一次完成，无需对整条音轨做两遍 loudnorm 再编码
+
+使用：
+    python audio_loudness.py audio/*.mp3                  # 列出响度、峰值与增益
+    python audio_loudness.py audio/*.mp3 --target -14
+    python audio_loudness.py --filter audio/audio_*.mp3   # 输出 -af 可用的滤镜（供 render.sh 使用）
+
+依赖：numpy；MP3 解码需要 ffmpeg
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from audio_probe import probe_many, ProbeCache, DEFAULT_PROBE_JOBS
+from audio_trim import decode_pcm, AudioDecodeError
+
+
+# 目标积分响度（LUFS），语音类网络视频的常用值
+DEFAULT_TARGET_LUFS = -16.0
+
+# 增益后采样峰值上限（dBFS）
+PEAK_CEILING_DB = -1.0
+
+# 最大提升量（dB），避免把几乎无声的文件放大成噪声
+MAX_GAIN_DB = 12.0
+
+# BS.1770 门限块参数
+BLOCK_SECONDS = 0.4
+BLOCK_STEP = 0.1
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+
+def _biquad(b, a, w):
+    """双二阶滤波器在角频率 w（弧度/采样）处的复频响"""
+    z = np.exp(-1j * w)
+    return (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+
+
+def k_weighting(w, sample_rate):
+    """
+    K 计权频响：高频搁架（+4 dB @ 1.5 kHz）× 高通（38 Hz）
+
+    系数按采样率由模拟原型推导，48 kHz 时与 BS.1770 给出的系数一致
+    """
+    # 第一级：高频搁架
+    gain_db, q, fc = 4.0, 1 / np.sqrt(2), 1500.0
+    A = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * fc / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos0 = np.cos(w0)
+    shelf_b = (A * ((A + 1) + (A - 1) * cos0 + 2 * np.sqrt(A) * alpha),
+               -2 * A * ((A - 1) + (A + 1) * cos0),
+               A * ((A + 1) + (A - 1) * cos0 - 2 * np.sqrt(A) * alpha))
+    shelf_a = ((A + 1) - (A - 1) * cos0 + 2 * np.sqrt(A) * alpha,
+               2 * ((A - 1) - (A + 1) * cos0),
+               (A + 1) - (A - 1) * cos0 - 2 * np.sqrt(A) * alpha)
+
+    # 第二级：高通
+    q, fc = 0.5, 38.0
+    w0 = 2 * np.pi * fc / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos0 = np.cos(w0)
+    high_b = ((1 + cos0) / 2, -(1 + cos0), (1 + cos0) / 2)
+    high_a = (1 + alpha, -2 * cos0, 1 - alpha)
+
+    return _biquad(shelf_b, shelf_a, w) * _biquad(high_b, high_a, w)
+
+
+def k_weight(samples, sample_rate):
+    """对整段信号做 K 计权（频域一次完成；末尾补零容纳滤波器拖尾，避免循环卷积回绕）"""
+    n = len(samples) + sample_rate // 2
+    spectrum = np.fft.rfft(samples, n)
+    w = np.linspace(0, np.pi, len(spectrum))
+    return np.fft.irfft(spectrum * k_weighting(w, sample_rate), n)[:len(samples)]
+
+
+def integrated_loudness(samples, sample_rate):
+    """单声道积分响度（LUFS），全部低于绝对门限时返回 None"""
+    weighted = k_weight(samples.astype(np.float64), sample_rate)
+    block = int(round(BLOCK_SECONDS * sample_rate))
+    step = int(round(BLOCK_STEP * sample_rate))
+
+    if len(weighted) < block:
+        energies = np.array([np.mean(weighted ** 2)]) if len(weighted) else np.zeros(0)
+    else:
+        # 各块均方值：平方的前缀和相减，整段一次向量化计算
+        cumulative = np.concatenate(([0.0], np.cumsum(weighted ** 2)))
+        starts = np.arange(0, len(weighted) - block + 1, step)
+        energies = (cumulative[starts + block] - cumulative[starts]) / block
+
+    with np.errstate(divide='ignore'):
+        levels = -0.691 + 10 * np.log10(energies)
+    gated = energies[levels > ABSOLUTE_GATE]
+    if gated.size == 0:
+        return None
+    relative = -0.691 + 10 * np.log10(np.mean(gated)) + RELATIVE_GATE
+    gated = energies[(levels > ABSOLUTE_GATE) & (levels > relative)]
+    return float(-0.691 + 10 * np.log10(np.mean(gated)))
+
+
+def measure(samples, sample_rate):
+    """返回 {'loudness': LUFS 或 None, 'peak': 采样峰值 dBFS}"""
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    return {
+        'loudness': integrated_loudness(samples, sample_rate),
+        'peak': round(float(20 * np.log10(max(peak, 1e-10))), 2),
+    }
+
+
+def measure_file(path):
+    """解码并测量单个文件"""
+    samples, rate = decode_pcm(path)
+    result = measure(samples, rate)
+    if result['loudness'] is not None:
+        result['loudness'] = round(result['loudness'], 2)
+    return result
+
+
+def gain_for(info, target=DEFAULT_TARGET_LUFS):
+    """按测量结果计算增益（dB）；无法测量或静音时为 0"""
+    if not info or info.get('loudness') is None:
+        return 0.0
+    gain = min(target - info['loudness'], PEAK_CEILING_DB - info.get('peak', PEAK_CEILING_DB), MAX_GAIN_DB)
+    return round(gain, 2)
+
+
+def measure_many(infos, jobs=DEFAULT_PROBE_JOBS, cache=None):
+    """
+    为探测结果补充响度测量（已有 loudness 字段的跳过），结果写回 infos 与缓存
+
+    参数:
+        infos: probe_many 的返回值 {路径: info 或 None}
+
+    返回:
+        [错误信息]
+    """
+    pending = [path for path, info in infos.items() if info is not None and 'loudness' not in info]
+
+    def run(path):
+        try:
+            return path, measure_file(path), None
+        except (AudioDecodeError, OSError) as e:
+            return path, None, str(e)
+
+    if jobs > 1 and len(pending) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            done = list(pool.map(run, pending))
+    else:
+        done = [run(path) for path in pending]
+
+    errors = []
+    for path, result, error in done:
+        if error is not None:
+            errors.append(f"{os.path.basename(path)}: {error}")
+            continue
+        infos[path].update(result)
+        if cache is not None:
+            cache.put(path, os.stat(path), infos[path])
+    return errors
+
+
+def gain_filter(paths, target=DEFAULT_TARGET_LUFS, jobs=DEFAULT_PROBE_JOBS, cache=None):
+    """
+    拼接音轨的分段增益滤镜（ffmpeg volume，按时间选择各文件的增益）
+
+    paths 的顺序必须与拼接顺序一致；所有增益都为 0 时返回空字符串。
+
+    返回:
+        (filter, errors)
+    """
+    infos = probe_many(paths, jobs=jobs, cache=cache)
+    errors = measure_many(infos, jobs, cache)
+
+    segments = []
+    end = 0.0
+    for path in paths:
+        info = infos.get(path)
+        if info is None:
+            continue
+        end += info['duration']
+        segments.append((end, 10 ** (gain_for(info, target) / 20)))
+    if not segments or all(abs(factor - 1) < 1e-4 for _, factor in segments):
+        return '', errors
+
+    expression = f"{segments[-1][1]:.4f}"
+    for end, factor in reversed(segments[:-1]):
+        expression = f"if(lt(t,{end:.3f}),{factor:.4f},{expression})"
+    return f"volume=volume='{expression}':eval=frame", errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量音频积分响度（EBU R128），计算按文件增益')
+    parser.add_argument('files', nargs='+', help='音频文件（--filter 时按拼接顺序给出）')
+    parser.add_argument('--target', type=float, default=DEFAULT_TARGET_LUFS,
+                        help=f'目标响度 LUFS（默认：{DEFAULT_TARGET_LUFS:g}）')
+    parser.add_argument('--filter', action='store_true',
+                        help='输出 ffmpeg -af 可用的分段增益滤镜（无需调整时输出空行）')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_PROBE_JOBS,
+                        help=f'并发测量数（默认：{DEFAULT_PROBE_JOBS}）')
+    parser.add_argument('--no-cache', action='store_true', help='忽略探测缓存，全部重新测量')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ProbeCache.for_dir(os.path.dirname(args.files[0]) or '.')
+    jobs = max(1, args.jobs)
+
+    if args.filter:
+        expression, errors = gain_filter(args.files, args.target, jobs, cache)
+        print(expression)
+    else:
+        infos = probe_many(args.files, jobs=jobs, cache=cache)
+        errors = measure_many(infos, jobs, cache)
+        for path in args.files:
+            info = infos.get(path)
+            if info is None or 'loudness' not in info:
+                continue
+            loudness = f"{info['loudness']:.1f} LUFS" if info['loudness'] is not None else "静音"
+            print(f"{path}: {loudness}, 峰值 {info['peak']:.1f} dBFS, "
+                  f"增益 {gain_for(info, args.target):+.1f} dB")
+
+    if cache is not None:
+        cache.save()
+    for error in errors:
+        print(f"Warning: {error}", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+音频规范化：TTS 输出 -> 真正的 PCM WAV（按内容哈希缓存）
+
+背景：
+- Edge TTS 输出 MP3 数据，generate_tts.py 按清单文件名写成 .wav，扩展名与内容不符
+- manim 的 add_sound 在渲染进程内解码音频，MP3 每次渲染都要重新解码，慢且容易卡住
+
+功能：
+- 每个音频只解码一次为 16-bit 单声道 PCM WAV，采样率统一为项目采样率
+  （默认 48000 Hz，与 manim/ffmpeg 输出的音轨一致，渲染时不再重采样）
+- 以 (内容 sha256, 采样率) 为键缓存在 ~/.cache/tutor/pcm，内容不变就不再解码，跨项目共用
+- 结果落地到音频目录的 pcm/ 子目录（硬链接，跨设备时复制），并在 audio_info.json /
+  timeline.json 的条目中记录 pcm 字段（相对音频目录的路径）
+- 已是目标采样率的单声道 PCM WAV 直接复制，不解码
+- 脚手架 add_scene_audio 优先使用 pcm/ 中的文件
+
+使用：
+    python audio_pcm.py ./audio
+    python audio_pcm.py ./audio --sample-rate 44100
+    python audio_pcm.py ./audio --cache-dir ./.pcm_cache
+
+依赖：numpy；MP3 解码需要 ffmpeg
+"""
+
+import os
+import sys
+import json
+import wave
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from audio_probe import probe, DEFAULT_PROBE_JOBS
+from audio_trim import decode_pcm, AudioDecodeError, INFO_FILES
+
+
+# 项目采样率（Hz）
+DEFAULT_SAMPLE_RATE = 48000
+
+# 音频目录下存放规范化结果的子目录
+PCM_DIR_NAME = 'pcm'
+
+# 全局缓存上限（MB），超出时按最近使用时间淘汰
+DEFAULT_PCM_CACHE_MB = 1024
+
+
+def default_cache_dir():
+    """PCM 缓存目录：$XDG_CACHE_HOME/tutor/pcm，默认 ~/.cache/tutor/pcm"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'tutor' / 'pcm'
+
+
+def content_key(path, sample_rate):
+    """缓存键：文件内容 sha256 + 目标采样率"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return f"{digest.hexdigest()[:32]}-{sample_rate}"
+
+
+def write_wav(path, samples, sample_rate):
+    """float32 单声道 -> 16-bit PCM WAV（临时文件 + rename）"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    tmp = f"{path}.tmp"
+    with wave.open(tmp, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    os.replace(tmp, path)
+
+
+def _place(blob, dest):
+    """把缓存文件落地到 dest；已是同一文件时不动（不改 mtime）"""
+    try:
+        if os.path.samefile(blob, dest):
+            return
+    except OSError:
+        pass
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(blob, dest)
+    except OSError:
+        shutil.copyfile(blob, dest)
+
+
+def normalize_file(src, dest, sample_rate=DEFAULT_SAMPLE_RATE, cache_dir=None):
+    """
+    规范化单个音频到 dest
+
+    返回:
+        'cached'（缓存命中）/ 'copied'（已是目标格式）/ 'decoded'（解码并写入缓存）
+
+    异常:
+        AudioDecodeError: 无法识别或解码
+    """
+    cache_dir = Path(cache_dir or default_cache_dir())
+    key = content_key(src, sample_rate)
+    blob = cache_dir / key[:2] / f"{key}.wav"
+
+    if blob.exists():
+        # 更新 mtime，供按最近使用淘汰
+        os.utime(blob)
+        status = 'cached'
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        info = probe(src)
+        if info is None:
+            raise AudioDecodeError(f"无法识别的音频: {src}")
+        if (info['format'] == 'wav' and info.get('codec') == 1 and info.get('bits') == 16
+                and info['channels'] == 1 and info['sample_rate'] == sample_rate):
+            tmp = f"{blob}.tmp"
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, blob)
+            status = 'copied'
+        else:
+            samples, _ = decode_pcm(src, sample_rate)
+            write_wav(blob, samples, sample_rate)
+            status = 'decoded'
+
+    _place(blob, dest)
+    return status
+
+
+def prune_cache(cache_dir, max_mb=DEFAULT_PCM_CACHE_MB):
+    """缓存超过上限时按 mtime（最近使用）从旧到新删除，返回删除的文件数"""
+    files = []
+    for path in Path(cache_dir).glob('*/*.wav'):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    limit = max_mb * 1024 * 1024
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def _listed_files(audio_dir):
+    """清单（audio_info.json / timeline.json 等）中列出的音频文件名"""
+    files = []
+    for name, list_key, file_key in INFO_FILES:
+        try:
+            with open(os.path.join(audio_dir, name), 'r', encoding='utf-8') as f:
+                entries = json.load(f).get(list_key) or []
+        except (OSError, ValueError, AttributeError):
+            continue
+        files += [e[file_key] for e in entries if e.get(file_key) and e[file_key] not in files]
+    return files
+
+
+def pcm_name(filename):
+    """规范化结果相对音频目录的路径"""
+    return f"{PCM_DIR_NAME}/{Path(filename).stem}.wav"
+
+
+def record_pcm(audio_dir, done):
+    """在清单条目中记录 pcm 字段（内容无变化时不写文件）"""
+    for name, list_key, file_key in INFO_FILES:
+        path = os.path.join(audio_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        touched = False
+        for entry in data.get(list_key) or []:
+            filename = entry.get(file_key)
+            if filename in done and entry.get('pcm') != pcm_name(filename):
+                entry['pcm'] = pcm_name(filename)
+                touched = True
+        if touched:
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+
+
+def normalize_audio_dir(audio_dir, files=None, sample_rate=DEFAULT_SAMPLE_RATE, cache_dir=None,
+                        jobs=DEFAULT_PROBE_JOBS, cache_size=DEFAULT_PCM_CACHE_MB):
+    """
+    规范化音频目录中的音频
+
+    参数:
+        files: 要处理的文件名列表，None 表示清单中的全部文件（同时清理 pcm/ 中不再引用的文件）
+
+    返回:
+        (statuses, errors)：{文件名: 'cached' / 'copied' / 'decoded'}，[错误信息]
+    """
+    cache_dir = Path(cache_dir or default_cache_dir())
+    full = files is None
+    if full:
+        files = _listed_files(audio_dir)
+    pcm_dir = os.path.join(audio_dir, PCM_DIR_NAME)
+    os.makedirs(pcm_dir, exist_ok=True)
+
+    def run(name):
+        src = os.path.join(audio_dir, name)
+        try:
+            return name, normalize_file(src, os.path.join(audio_dir, pcm_name(name)), sample_rate, cache_dir), None
+        except (AudioDecodeError, OSError) as e:
+            return name, None, str(e)
+
+    existing = [name for name in files if os.path.isfile(os.path.join(audio_dir, name))]
+    # 解码在 ffmpeg 子进程中进行，线程即可并行
+    if jobs > 1 and len(existing) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            done = list(pool.map(run, existing))
+    else:
+        done = [run(name) for name in existing]
+
+    statuses = {name: status for name, status, _ in done if status is not None}
+    errors = [f"{name}: {error}" for name, _, error in done if error is not None]
+    record_pcm(audio_dir, statuses)
+
+    if full:
+        wanted = {Path(pcm_name(name)).name for name in statuses}
+        for path in Path(pcm_dir).glob('*.wav'):
+            if path.name not in wanted:
+                path.unlink()
+    prune_cache(cache_dir, cache_size)
+    return statuses, errors
+
+
+def print_report(statuses, errors):
+    counts = {key: sum(1 for s in statuses.values() if s == key) for key in ('decoded', 'copied', 'cached')}
+    print(f"PCM 规范化: 解码 {counts['decoded']}, 直接复制 {counts['copied']}, 缓存命中 {counts['cached']}")
+    for error in errors:
+        print(f"  ✗ {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把 TTS 音频规范化为 PCM WAV（按内容哈希缓存）')
+    parser.add_argument('audio_dir', help='音频目录（含 audio_info.json 或 timeline.json）')
+    parser.add_argument('files', nargs='*', help='只处理这些文件（默认：清单中的全部文件）')
+    parser.add_argument('--sample-rate', type=int, default=DEFAULT_SAMPLE_RATE,
+                        help=f'目标采样率（默认：{DEFAULT_SAMPLE_RATE}）')
+    parser.add_argument('--cache-dir', default=str(default_cache_dir()),
+                        help='缓存目录（默认：全局 ~/.cache/tutor/pcm）')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_PCM_CACHE_MB,
+                        help=f'缓存上限 MB（默认：{DEFAULT_PCM_CACHE_MB}）')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_PROBE_JOBS,
+                        help=f'并发处理数（默认：{DEFAULT_PROBE_JOBS}）')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.audio_dir):
+        print(f"Error: 音频目录不存在: {args.audio_dir}")
+        sys.exit(1)
+
+    statuses, errors = normalize_audio_dir(args.audio_dir, args.files or None, args.sample_rate,
+                                           args.cache_dir, max(1, args.jobs), args.cache_size)
+    if not statuses and not errors:
+        print("未找到需要处理的音频（请检查清单文件）")
+        sys.exit(1)
+    print_report(statuses, errors)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
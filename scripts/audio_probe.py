@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+音频头探测（时长 / 格式）
+
+功能：
+- 按魔数识别格式，只解析需要的文件头，不解码、不启动子进程
+- WAV：遍历 RIFF 块，取 fmt 与 data 块，时长 = data 字节数 / 每秒字节数
+- MP3：跳过 ID3v2 标签，定位首个有效帧；
+  优先读取 Xing/Info 或 VBRI 头中的帧数，没有时按恒定码率由字节数推算帧数
+- 每个文件只读开头的小缓冲区（WAV 块头按需 seek），100 个文件在毫秒级完成
+- probe_many()：线程池并发探测 + 旁路缓存（以 路径/大小/mtime_ns 为键），未变化的文件不再打开
+
+使用：
+    from audio_probe import probe, get_audio_duration
+
+    info = probe('audio/audio_001_开场.mp3')
+    info['format'], info['duration'], info['sample_rate']
+    get_audio_duration('audio/audio_001_开场.wav')   # 秒，无法识别时返回 None
+
+    cache = ProbeCache.for_dir('audio')
+    results = probe_many(paths, jobs=8, cache=cache)   # {路径: info 或 None}
+    cache.save()
+
+命令行：
+    python audio_probe.py audio/*.mp3          # 列出格式与时长
+    python audio_probe.py --duration a.mp3     # 只输出时长（秒），供 shell 脚本使用
+"""
+
+import os
+import sys
+import json
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 读取的文件头大小：足够跳过常见的 ID3v2 标签并容纳首帧与 Xing/VBRI 头
+HEAD_BYTES = 64 * 1024
+
+# 默认并发探测线程数（探测以 I/O 为主，线程即可）
+DEFAULT_PROBE_JOBS = min(8, (os.cpu_count() or 1) * 2)
+
+# 旁路缓存文件名（放在音频目录中）
+PROBE_CACHE_NAME = '.probe_cache.json'
+
+# MPEG 音频帧头表
+# 版本位 -> 版本名（'2.5' / None(保留) / '2' / '1'）
+_MPEG_VERSIONS = {0: '2.5', 1: None, 2: '2', 3: '1'}
+# 层位 -> 层号
+_MPEG_LAYERS = {1: 3, 2: 2, 3: 1}
+# (版本为 1, 层) -> 码率表（kbps）
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {'1': [44100, 48000, 32000], '2': [22050, 24000, 16000], '2.5': [11025, 12000, 8000]}
+
+
+def _parse_frame_header(data, pos):
+    """
+    解析 pos 处的 MPEG 音频帧头
+
+    返回:
+        dict（version, layer, bitrate, sample_rate, channels, samples, length），无效时返回 None
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = _MPEG_VERSIONS[(b1 >> 3) & 0x03]
+    layer = _MPEG_LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == '1'
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if (b3 >> 6) == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or mpeg1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+
+    return {'version': version, 'layer': layer, 'bitrate': bitrate, 'sample_rate': sample_rate,
+            'channels': channels, 'samples': samples, 'length': length}
+
+
+def _id3v2_size(data):
+    """ID3v2 标签总长度（无标签时为 0）"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _vbr_frames(data, pos, header):
+    """读取 Xing/Info 或 VBRI 头中的帧数，没有时返回 None"""
+    mpeg1 = header['version'] == '1'
+    if header['channels'] == 1:
+        side_info = 17 if mpeg1 else 9
+    else:
+        side_info = 32 if mpeg1 else 17
+
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing + 4:xing + 8])[0] if len(data) >= xing + 8 else 0
+        if flags & 0x01 and len(data) >= xing + 12:
+            return struct.unpack('>I', data[xing + 8:xing + 12])[0]
+
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI' and len(data) >= vbri + 18:
+        return struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+    return None
+
+
+def _find_first_frame(data, start):
+    """
+    定位首个有效帧：要求紧随其后的位置也是帧头（缓冲区内可检查时），避免误同步
+
+    返回:
+        (pos, header)，找不到时 header 为 None
+    """
+    pos = start
+    while pos + 4 <= len(data):
+        pos = data.find(b'\xff', pos)
+        if pos < 0:
+            break
+        header = _parse_frame_header(data, pos)
+        if header is not None:
+            following = pos + header['length']
+            if following + 4 > len(data) or _parse_frame_header(data, following) is not None:
+                return pos, header
+        pos += 1
+    return -1, None
+
+
+def mp3_frames(data):
+    """
+    列出整个 MP3 数据中的音频帧（用于按帧无损裁剪）
+
+    返回:
+        (frames, vbr_tag)
+        frames: [(偏移, 帧头 dict)]，从首个有效帧起连续排列，遇到非帧数据（如 ID3v1 标签）停止
+        vbr_tag: 首帧为 Xing/Info/VBRI 信息帧（不含音频）时为其标记，否则为 None
+    """
+    pos, header = _find_first_frame(data, _id3v2_size(data))
+    frames = []
+    while header is not None and pos + header['length'] <= len(data):
+        frames.append((pos, header))
+        pos += header['length']
+        header = _parse_frame_header(data, pos)
+
+    vbr_tag = None
+    if frames:
+        first, first_header = frames[0]
+        if _vbr_frames(data, first, first_header) is not None:
+            for tag in (b'Xing', b'Info', b'VBRI'):
+                if data.find(tag, first, first + first_header['length']) >= 0:
+                    vbr_tag = tag.decode()
+                    break
+    return frames, vbr_tag
+
+
+def _probe_mp3(f, data, file_size):
+    start = _id3v2_size(data)
+    if start + 4 > len(data):
+        # 标签超出缓冲区：从标签之后重新读取
+        f.seek(start)
+        data = f.read(HEAD_BYTES)
+        base = start
+        start = 0
+    else:
+        base = 0
+
+    pos, header = _find_first_frame(data, start)
+    if header is None:
+        return None
+
+    frames = _vbr_frames(data, pos, header)
+    if frames is None:
+        # 恒定码率：由音频字节数推算帧数（扣除末尾的 ID3v1 标签）
+        audio_bytes = file_size - base - pos
+        if file_size >= 128:
+            f.seek(file_size - 128)
+            if f.read(3) == b'TAG':
+                audio_bytes -= 128
+        frame_bytes = header['samples'] / 8 * header['bitrate'] / header['sample_rate']
+        frames = round(audio_bytes / frame_bytes)
+
+    return {
+        'format': 'mp3',
+        'duration': frames * header['samples'] / header['sample_rate'],
+        'sample_rate': header['sample_rate'],
+        'channels': header['channels'],
+        'bitrate': header['bitrate'],
+        'frames': frames,
+    }
+
+
+def _probe_wav(f, file_size):
+    fmt = None
+    pos = 12
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            raw = f.read(16)
+            if len(raw) < 16:
+                return None
+            audio_format, channels, sample_rate, byte_rate, block_align, bits = struct.unpack('<HHIIHH', raw)
+            fmt = {'channels': channels, 'sample_rate': sample_rate, 'byte_rate': byte_rate,
+                   'bits': bits, 'codec': audio_format}
+        elif chunk_id == b'data':
+            if fmt is None or not fmt['byte_rate']:
+                return None
+            # 流式写出的 WAV 可能没有回填大小（0 或 0xFFFFFFFF），以实际文件长度为准
+            data_bytes = min(size, file_size - body) if size else file_size - body
+            return {
+                'format': 'wav',
+                'duration': data_bytes / fmt['byte_rate'],
+                'sample_rate': fmt['sample_rate'],
+                'channels': fmt['channels'],
+                'bits': fmt['bits'],
+                'codec': fmt['codec'],
+                'data_offset': body,
+                'data_bytes': data_bytes,
+            }
+        # 块按偶数字节对齐
+        pos = body + size + (size & 1)
+    return None
+
+
+def probe(path):
+    """
+    探测音频文件的格式与时长
+
+    返回:
+        dict（至少含 format / duration / sample_rate / channels），无法识别时返回 None
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            data = f.read(HEAD_BYTES)
+            if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+                return _probe_wav(f, file_size)
+            return _probe_mp3(f, data, file_size)
+    except (OSError, struct.error):
+        return None
+
+
+def get_audio_duration(path):
+    """音频时长（秒），无法识别时返回 None"""
+    info = probe(path)
+    return info['duration'] if info else None
+
+
+class ProbeCache:
+    """
+    探测结果的旁路缓存
+
+    以 (相对路径, 文件大小, mtime_ns) 为键：三者都未变化时直接复用上次的格式与时长，
+    不再打开文件。路径相对缓存文件所在目录，项目目录整体移动后仍然有效。
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.base = os.path.dirname(self.path)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    @classmethod
+    def for_dir(cls, audio_dir):
+        """音频目录中的默认缓存文件"""
+        return cls(os.path.join(audio_dir, PROBE_CACHE_NAME))
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.base)
+
+    def get(self, path, st):
+        """
+        查找缓存
+
+        返回:
+            (命中, info)；info 可能为 None（上次即无法识别）
+        """
+        entry = self.entries.get(self._key(path))
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            self.hits += 1
+            return True, entry['info']
+        self.misses += 1
+        return False, None
+
+    def put(self, path, st, info):
+        self.entries[self._key(path)] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'info': info}
+        self._dirty = True
+
+    def save(self):
+        """写回缓存（临时文件 + rename），顺带丢弃文件已不存在的条目"""
+        stale = [key for key in self.entries if not os.path.exists(os.path.join(self.base, key))]
+        for key in stale:
+            del self.entries[key]
+        if not (self._dirty or stale):
+            return
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            # 缓存只是加速手段，目录只读等情况下忽略
+            return
+        self._dirty = False
+
+    def summary(self):
+        return f"探测缓存命中 {self.hits}，重新探测 {self.misses}"
+
+
+def probe_many(paths, jobs=DEFAULT_PROBE_JOBS, cache=None):
+    """
+    并发探测多个文件
+
+    参数:
+        paths: 文件路径列表
+        jobs: 线程数（<= 1 时串行）
+        cache: ProbeCache，None 表示不使用缓存
+
+    返回:
+        {路径: info 或 None}（文件不存在或无法识别时为 None）
+    """
+    results = {}
+    pending = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            results[path] = None
+            continue
+        if cache is not None:
+            hit, info = cache.get(path, st)
+            if hit:
+                results[path] = info
+                continue
+        pending.append((path, st))
+
+    if jobs > 1 and len(pending) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            infos = list(pool.map(probe, (path for path, _ in pending)))
+    else:
+        infos = [probe(path) for path, _ in pending]
+
+    for (path, st), info in zip(pending, infos):
+        results[path] = info
+        if cache is not None:
+            cache.put(path, st, info)
+    return results
+
+
+def main():
+    args = sys.argv[1:]
+    duration_only = '--duration' in args
+    paths = [a for a in args if a != '--duration']
+    if not paths:
+        print("Usage: python audio_probe.py [--duration] <audio_file> ...")
+        sys.exit(1)
+
+    ok = True
+    for path in paths:
+        info = probe(path)
+        if info is None:
+            ok = False
+            print(f"{path}: 无法识别", file=sys.stderr)
+        elif duration_only:
+            print(f"{info['duration']:.3f}")
+        else:
+            print(f"{path}: {info['format']}, {info['sample_rate']} Hz, "
+                  f"{info['channels']} ch, {info['duration']:.3f}s")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+配音首尾静音裁剪与停顿检测（合成后处理）
+
+功能：
+- 每个音频只解码一次为 PCM：16-bit WAV 直接读取 data 块，MP3 及需要重采样的 WAV 经 ffmpeg 管道
+  解码为 16-bit 单声道
+- NumPy 向量化计算 RMS 包络（每 20ms 一个值，dBFS），按阈值判定有声 / 静音
+- 裁掉首尾静音，两端各保留 pad 秒余量：WAV 按采样点截取，MP3 按整帧截取，不重新编码
+- 记录内部停顿（不短于 min_pause 秒的静音段），可用于安排转场或换页
+- 同步更新音频目录中的 audio_info.json / timeline.json / audio_manifest.json：
+  duration 改为裁剪后时长，pauses 记录停顿 [起, 止]（秒，相对裁剪后的音频），
+  trim 记录裁掉的头尾秒数，词边界 boundaries 与分句 chunks 的时间同步平移
+
+首尾空白不再计入每幕时长，场景代码按时长等待时也就不再为它渲染和编码画面。
+已裁剪过的文件再次处理时不会改写（首尾剩余静音不超过余量）。
+
+使用：
+    python audio_trim.py ./audio
+    python audio_trim.py ./audio --threshold -40 --pad 0.08 --min-pause 0.3
+    python audio_trim.py ./audio --dry-run        # 只分析并报告，不改动文件
+
+依赖：numpy；MP3 解码与重采样需要 ffmpeg（渲染流程本身也依赖它）
+"""
+
+import os
+import sys
+import json
+import wave
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from audio_probe import probe, mp3_frames, DEFAULT_PROBE_JOBS
+
+
+# 有声判定阈值（dBFS）：RMS 低于该值的窗视为静音
+DEFAULT_THRESHOLD_DB = -45.0
+
+# 裁剪后首尾保留的静音余量（秒），避免切掉字头的气声与尾音
+DEFAULT_PAD = 0.05
+
+# 记录为停顿的最短静音（秒）
+DEFAULT_MIN_PAUSE = 0.25
+
+# RMS 包络的窗长（秒）
+ENVELOPE_WINDOW = 0.02
+
+# 首尾可裁的静音都少于该值时不改写文件（秒）
+MIN_CUT = 0.05
+
+# 需要同步更新的清单：(文件名, 条目列表键, 条目中的音频文件名键)
+INFO_FILES = (
+    ('audio_info.json', 'files', 'file'),
+    ('timeline.json', 'scenes', 'audio_file'),
+    ('audio_manifest.json', 'scenes', 'audio_file'),
+)
+
+
+class AudioDecodeError(Exception):
+    """音频无法解码"""
+
+
+def decode_pcm(path, sample_rate=None):
+    """
+    解码为单声道 float32 PCM（-1 ~ 1）
+
+    参数:
+        sample_rate: 目标采样率，None 表示保持原采样率
+
+    返回:
+        (samples, sample_rate)
+    """
+    info = probe(path)
+    if info is None:
+        raise AudioDecodeError(f"无法识别的音频: {path}")
+
+    if (info['format'] == 'wav' and info.get('codec') == 1 and info.get('bits') == 16
+            and sample_rate in (None, info['sample_rate'])):
+        with open(path, 'rb') as f:
+            f.seek(info['data_offset'])
+            raw = f.read(info['data_bytes'])
+        samples = np.frombuffer(raw[:len(raw) // 2 * 2], dtype='<i2')
+        channels = info['channels']
+        if channels > 1:
+            samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+        return samples.astype(np.float32) / 32768.0, info['sample_rate']
+
+    rate = sample_rate or info['sample_rate']
+    command = ['ffmpeg', '-v', 'error', '-i', path, '-f', 's16le', '-ac', '1', '-ar', str(rate), '-']
+    try:
+        proc = subprocess.run(command, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise AudioDecodeError(f"未找到 ffmpeg，无法解码或重采样 {path}")
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"ffmpeg 解码失败（{path}）: {e.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype='<i2').astype(np.float32) / 32768.0, rate
+
+
+def rms_envelope(samples, sample_rate, window=ENVELOPE_WINDOW):
+    """
+    RMS 包络
+
+    返回:
+        (db, hop)：每窗的 RMS（dBFS）与窗长（采样点数）；末尾不足一窗的部分忽略
+    """
+    hop = max(1, int(round(sample_rate * window)))
+    count = len(samples) // hop
+    frames = samples[:count * hop].reshape(count, hop)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10)), hop
+
+
+def analyze(samples, sample_rate, threshold_db=DEFAULT_THRESHOLD_DB, min_pause=DEFAULT_MIN_PAUSE):
+    """
+    分析有声区间与内部停顿
+
+    返回:
+        {'duration', 'start', 'end', 'pauses'}：start/end 为首个/最后一个有声窗的起止（秒），
+        pauses 为 [[起, 止], ...]；全部静音时 start == end == 0
+    """
+    db, hop = rms_envelope(samples, sample_rate)
+    step = hop / sample_rate
+    duration = len(samples) / sample_rate
+    voiced = db > threshold_db
+    indices = np.flatnonzero(voiced)
+    if indices.size == 0:
+        return {'duration': duration, 'start': 0.0, 'end': 0.0, 'pauses': []}
+
+    first, last = int(indices[0]), int(indices[-1])
+    # 有声区间内的静音段：有声 -> 静音 处开始，静音 -> 有声 处结束（两端都是有声窗，起止成对）
+    edges = np.diff(voiced[first:last + 1].astype(np.int8))
+    starts = np.flatnonzero(edges == -1) + 1
+    ends = np.flatnonzero(edges == 1) + 1
+    keep = (ends - starts) * step >= min_pause
+    pauses = [[round((first + s) * step, 3), round((first + e) * step, 3)]
+              for s, e in zip(starts[keep], ends[keep])]
+    return {'duration': duration, 'start': first * step,
+            'end': min(duration, (last + 1) * step), 'pauses': pauses}
+
+
+def _replace(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _cut_wav(path, info, head, length):
+    """按采样点截取 PCM WAV，返回实际 (裁掉的头部秒数, 保留秒数)"""
+    rate = info['sample_rate']
+    block = info['channels'] * info['bits'] // 8
+    first = int(round(head * rate))
+    count = min(int(round(length * rate)), info['data_bytes'] // block - first)
+    with open(path, 'rb') as f:
+        f.seek(info['data_offset'] + first * block)
+        pcm = f.read(count * block)
+
+    tmp = path + '.tmp'
+    with wave.open(tmp, 'wb') as w:
+        w.setnchannels(info['channels'])
+        w.setsampwidth(info['bits'] // 8)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    os.replace(tmp, path)
+    return first / rate, count / rate
+
+
+def _cut_mp3(path, head, length):
+    """按整帧截取 MP3（不重新编码），返回实际 (裁掉的头部秒数, 保留秒数)；无法安全截取时返回 None"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    frames, vbr_tag = mp3_frames(data)
+    # 变码率文件的帧数记录在信息帧里，截取后无法保持一致，跳过
+    if not frames or vbr_tag in ('Xing', 'VBRI'):
+        return None
+
+    # 保留 ID3v2 标签；恒定码率的 Info 帧一并去掉，时长改由字节数推算
+    prefix = data[:frames[0][0]]
+    if vbr_tag is not None:
+        frames = frames[1:]
+        if not frames:
+            return None
+
+    header = frames[0][1]
+    frame_seconds = header['samples'] / header['sample_rate']
+    first = int(head // frame_seconds)
+    last = min(len(frames), first + int(np.ceil(length / frame_seconds)))
+    body = b''.join(data[pos:pos + h['length']] for pos, h in frames[first:last])
+    _replace(path, prefix + body)
+    return first * frame_seconds, (last - first) * frame_seconds
+
+
+def trim_file(path, threshold_db=DEFAULT_THRESHOLD_DB, pad=DEFAULT_PAD,
+              min_pause=DEFAULT_MIN_PAUSE, dry_run=False):
+    """
+    分析并裁剪单个音频
+
+    返回:
+        {'duration', 'head', 'tail', 'pauses', 'silent'}：duration 为处理后时长，
+        head/tail 为本次裁掉的秒数，pauses 相对处理后的音频
+
+    异常:
+        AudioDecodeError: 无法解码
+    """
+    before = probe(path)
+    samples, rate = decode_pcm(path)
+    result = analyze(samples, rate, threshold_db, min_pause)
+    original = before['duration']
+    outcome = {'duration': original, 'head': 0.0, 'tail': 0.0, 'pauses': result['pauses'],
+               'silent': result['end'] <= result['start']}
+    if outcome['silent']:
+        return outcome
+
+    head = max(0.0, result['start'] - pad)
+    end = min(original, result['end'] + pad)
+    if dry_run:
+        outcome.update(duration=end - head, head=head, tail=original - end,
+                       pauses=[[round(a - head, 3), round(b - head, 3)] for a, b in result['pauses']])
+        return outcome
+    if head < MIN_CUT and original - end < MIN_CUT:
+        return outcome
+
+    if before['format'] == 'wav':
+        cut = _cut_wav(path, before, head, end - head) if before.get('codec') == 1 else None
+    else:
+        cut = _cut_mp3(path, head, end - head)
+    if cut is None:
+        return outcome
+
+    head, _ = cut
+    duration = probe(path)['duration']
+    outcome.update(duration=duration, head=head, tail=max(0.0, original - head - duration),
+                   pauses=[[round(max(0.0, a - head), 3), round(b - head, 3)] for a, b in result['pauses']])
+    return outcome
+
+
+def _shift(offset, duration, head):
+    """区间整体前移 head 秒，被裁掉的部分从时长中扣除，返回 (offset, duration)"""
+    offset -= head
+    if offset < 0:
+        duration = max(0.0, duration + offset)
+        offset = 0.0
+    return round(offset, 3), round(duration, 3)
+
+
+def apply_trim(entry, outcome):
+    """把裁剪结果写入清单条目：时长、停顿、累计裁剪量，词边界与分句平移"""
+    head = outcome['head']
+    entry['duration'] = round(outcome['duration'], 2)
+    entry['pauses'] = outcome['pauses']
+    if head or outcome['tail']:
+        previous = entry.get('trim') or {}
+        entry['trim'] = {'head': round(previous.get('head', 0) + head, 3),
+                         'tail': round(previous.get('tail', 0) + outcome['tail'], 3)}
+    if head:
+        boundaries = entry.get('boundaries')
+        if boundaries:
+            shifted = [_shift(t, d, head) for t, d in zip(boundaries['offsets'], boundaries['durations'])]
+            boundaries['offsets'] = [t for t, _ in shifted]
+            boundaries['durations'] = [d for _, d in shifted]
+        for chunk in entry.get('chunks') or []:
+            chunk['offset'], chunk['duration'] = _shift(chunk['offset'], chunk['duration'], head)
+
+
+def update_info_files(audio_dir, outcomes):
+    """按文件名把裁剪结果同步到音频目录中的各清单，返回更新了的清单文件名"""
+    updated = []
+    for name, list_key, file_key in INFO_FILES:
+        path = os.path.join(audio_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        entries = data.get(list_key) or []
+        touched = False
+        for entry in entries:
+            outcome = outcomes.get(entry.get(file_key))
+            if outcome is not None:
+                apply_trim(entry, outcome)
+                touched = True
+        if not touched:
+            continue
+        if 'total_duration' in data:
+            data['total_duration'] = round(sum(e.get('duration') or 0 for e in entries), 2)
+
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        updated.append(name)
+    return updated
+
+
+def trim_audio_dir(audio_dir, files=None, threshold_db=DEFAULT_THRESHOLD_DB, pad=DEFAULT_PAD,
+                   min_pause=DEFAULT_MIN_PAUSE, jobs=DEFAULT_PROBE_JOBS, dry_run=False):
+    """
+    裁剪音频目录中的音频并更新清单
+
+    参数:
+        files: 要处理的文件名列表，None 表示 audio_info.json / timeline.json 中列出的全部文件
+
+    返回:
+        (outcomes, errors)：{文件名: trim_file 结果}，[错误信息]
+    """
+    if files is None:
+        files = []
+        for name, list_key, file_key in INFO_FILES:
+            try:
+                with open(os.path.join(audio_dir, name), 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get(list_key) or []
+            except (OSError, ValueError):
+                continue
+            files += [e[file_key] for e in entries if e.get(file_key) and e[file_key] not in files]
+
+    def run(name):
+        try:
+            return name, trim_file(os.path.join(audio_dir, name), threshold_db, pad, min_pause, dry_run), None
+        except (AudioDecodeError, OSError) as e:
+            return name, None, str(e)
+
+    existing = [name for name in files if os.path.isfile(os.path.join(audio_dir, name))]
+    # 解码（ffmpeg 子进程）与 NumPy 计算都会释放 GIL，线程即可并行
+    if jobs > 1 and len(existing) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            done = list(pool.map(run, existing))
+    else:
+        done = [run(name) for name in existing]
+
+    outcomes = {name: outcome for name, outcome, _ in done if outcome is not None}
+    errors = [f"{name}: {error}" for name, _, error in done if error is not None]
+    if not dry_run:
+        update_info_files(audio_dir, outcomes)
+    return outcomes, errors
+
+
+def print_report(outcomes, errors):
+    """逐个文件输出裁剪量与停顿数，最后汇总"""
+    saved = 0.0
+    for name in sorted(outcomes):
+        o = outcomes[name]
+        if o['silent']:
+            print(f"  ⚠️ {name}: 全部为静音")
+            continue
+        saved += o['head'] + o['tail']
+        print(f"  {name}: 头 -{o['head']:.2f}s, 尾 -{o['tail']:.2f}s → {o['duration']:.2f}s, "
+              f"停顿 {len(o['pauses'])} 处")
+    for error in errors:
+        print(f"  ✗ {error}")
+    print(f"共裁掉静音 {saved:.2f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='裁剪配音首尾静音，记录内部停顿')
+    parser.add_argument('audio_dir', help='音频目录（含 audio_info.json 或 timeline.json）')
+    parser.add_argument('files', nargs='*', help='只处理这些文件（默认：清单中的全部文件）')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_DB,
+                        help=f'有声判定阈值 dBFS（默认：{DEFAULT_THRESHOLD_DB:g}）')
+    parser.add_argument('--pad', type=float, default=DEFAULT_PAD,
+                        help=f'首尾保留的静音余量秒数（默认：{DEFAULT_PAD:g}）')
+    parser.add_argument('--min-pause', type=float, default=DEFAULT_MIN_PAUSE,
+                        help=f'记录为停顿的最短静音秒数（默认：{DEFAULT_MIN_PAUSE:g}）')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_PROBE_JOBS,
+                        help=f'并发处理数（默认：{DEFAULT_PROBE_JOBS}）')
+    parser.add_argument('--dry-run', action='store_true', help='只分析，不改动音频与清单')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.audio_dir):
+        print(f"Error: 音频目录不存在: {args.audio_dir}")
+        sys.exit(1)
+
+    outcomes, errors = trim_audio_dir(args.audio_dir, args.files or None, args.threshold,
+                                      max(0.0, args.pad), args.min_pause, max(1, args.jobs),
+                                      args.dry_run)
+    if not outcomes and not errors:
+        print("未找到需要处理的音频（请检查清单文件）")
+        sys.exit(1)
+    print_report(outcomes, errors)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
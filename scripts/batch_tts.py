@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+多项目批量 TTS 生成
+
+功能：
+- 扫描目录树（或读取项目列表文件），找出所有待配音项目：
+  含 audio_list.csv 的目录，或含「音频生成清单」的分镜 .md 所在目录
+- 所有项目的全部条目放进同一个有界并发池（--jobs），共享缓存、限流、重试与熔断
+- 某个项目的条目全部完成后立即写出该项目的 audio/audio_info.json，不等其它项目
+- 最后输出总体吞吐：条目/秒、音频秒数/秒
+
+使用：
+    python batch_tts.py ./projects                   # 递归扫描目录树
+    python batch_tts.py proj_a proj_b --jobs 16      # 指定多个项目
+    python batch_tts.py --list projects.txt          # 每行一个项目目录
+    python batch_tts.py ./projects --backend offline:latency=0.5   # 离线压测
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+from tts_engine import run_bounded, ResilientCaller, DEFAULT_JOBS, DEFAULT_RPS, DEFAULT_RETRIES
+from tts_cache import TTSCache, DEFAULT_CACHE_SIZE_MB
+from tts_backends import create_backend, is_transient, TTSBackendError
+from tts_chunks import DEFAULT_CHUNK_CHARS, DEFAULT_CHUNK_GAP
+from generate_tts import (VOICE_MAP, generate_audio, parse_csv, normalize_filenames,
+                          result_item, failure_item, write_audio_info)
+from validate_audio import parse_storyboard
+from storyboard import compile_storyboard
+
+
+# 扫描时跳过的目录
+SKIP_DIRS = {'.git', '__pycache__', 'audio', 'media', '.tts_cache', 'node_modules'}
+
+
+def find_storyboard(project_dir):
+    """项目目录中含「音频生成清单」的分镜文件，没有则返回 None"""
+    for path in sorted(project_dir.glob('*.md')):
+        try:
+            if compile_storyboard(path)['audio_table']:
+                return path
+        except (OSError, UnicodeDecodeError):
+            continue
+    return None
+
+
+def load_project(project_dir):
+    """
+    读取项目条目：优先 audio_list.csv，其次分镜的音频生成清单
+
+    返回:
+        {'dir', 'source', 'entries'}，不是项目时返回 None
+    """
+    csv_path = project_dir / 'audio_list.csv'
+    if csv_path.is_file():
+        entries = parse_csv(str(csv_path))
+        source = csv_path
+    else:
+        source = find_storyboard(project_dir)
+        if source is None:
+            return None
+        audio_list, _ = parse_storyboard(str(source))
+        entries = [{'filename': item['file'], 'text': item['text']}
+                   for item in audio_list if item['file'] and item['text']]
+    return {'dir': project_dir, 'source': source, 'entries': normalize_filenames(entries)}
+
+
+def discover_projects(paths):
+    """递归扫描路径，返回项目列表（按路径排序、去重）"""
+    found = {}
+    for root in paths:
+        root = Path(root)
+        if not root.is_dir():
+            print(f"Warning: 不是目录，跳过: {root}")
+            continue
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.'))
+            project_dir = Path(dirpath).resolve()
+            if project_dir in found:
+                continue
+            project = load_project(project_dir)
+            if project is not None:
+                found[project_dir] = project
+    return [found[key] for key in sorted(found)]
+
+
+def read_project_list(list_path):
+    """读取项目列表文件（每行一个目录，# 开头为注释），相对路径相对于列表文件"""
+    base = Path(list_path).resolve().parent
+    paths = []
+    with open(list_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                paths.append(base / line)
+    return paths
+
+
+async def run_batch(projects, voice='xiaoxiao', jobs=DEFAULT_JOBS, rate='+0%', pitch='+0Hz',
+                    cache=None, backend=None, caller=None,
+                    chunk_chars=DEFAULT_CHUNK_CHARS, chunk_gap=DEFAULT_CHUNK_GAP):
+    """
+    在一个全局并发池中为所有项目生成音频
+
+    每个项目的条目全部完成时立即写出它的 audio_info.json。
+
+    返回:
+        统计 dict：projects / utterances / synthesized / cached / failed / audio_seconds / elapsed
+    """
+    backend = backend or create_backend('edge')
+    caller = caller or ResilientCaller(is_transient=is_transient, concurrency=jobs)
+
+    work = []
+    for project in projects:
+        project['audio_dir'] = project['dir'] / 'audio'
+        project['audio_dir'].mkdir(exist_ok=True)
+        project['results'] = [None] * len(project['entries'])
+        project['remaining'] = len(project['entries'])
+        for index, entry in enumerate(project['entries']):
+            work.append((project, index, entry))
+
+    stats = {'projects': len(projects), 'utterances': len(work), 'synthesized': 0,
+             'cached': 0, 'failed': 0, 'audio_seconds': 0.0, 'elapsed': 0.0}
+
+    def finish(project):
+        pairs = list(zip(project['entries'], project['results']))
+        results = [result_item(e, r) for e, r in pairs if r['success']]
+        failed = [failure_item(e, r) for e, r in pairs if not r['success']]
+        status = f"{len(results)}/{len(pairs)}" + (f"，失败 {len(failed)}" if failed else "")
+        if results:
+            write_audio_info(str(project['audio_dir']), results, failed, voice=voice,
+                             backend=backend.name, rate=rate, pitch=pitch,
+                             chunk_chars=chunk_chars, chunk_gap=chunk_gap)
+        mark = '✗' if failed else '✓'
+        print(f"  {mark} {project['dir']} ({status}, {sum(r['duration'] for r in results):.1f}秒)")
+
+    async def worker(index, item):
+        project, entry_index, entry = item
+        output_path = str(project['audio_dir'] / entry['filename'])
+        result = await generate_audio(entry['text'], output_path, voice, rate, pitch, cache,
+                                      backend, caller, chunk_chars, chunk_gap)
+
+        if not result['success']:
+            stats['failed'] += 1
+        elif result['cached']:
+            stats['cached'] += 1
+        else:
+            stats['synthesized'] += 1
+        stats['audio_seconds'] += result['duration']
+
+        project['results'][entry_index] = result
+        project['remaining'] -= 1
+        if project['remaining'] == 0:
+            finish(project)
+        return result
+
+    start = time.monotonic()
+    await run_bounded(work, worker, jobs=jobs)
+    stats['elapsed'] = time.monotonic() - start
+
+    # 没有条目的项目不会触发完成回调
+    for project in projects:
+        if not project['entries']:
+            print(f"  - {project['dir']} (无条目，跳过)")
+    return stats
+
+
+def print_summary(stats):
+    """输出总体吞吐"""
+    elapsed = max(stats['elapsed'], 1e-9)
+    print("=" * 50)
+    print(f"项目数: {stats['projects']}")
+    print(f"条目数: {stats['utterances']} "
+          f"(合成 {stats['synthesized']}, 缓存 {stats['cached']}, 失败 {stats['failed']})")
+    print(f"音频总时长: {stats['audio_seconds']:.1f} 秒")
+    print(f"耗时: {stats['elapsed']:.2f} 秒")
+    print(f"吞吐: {stats['utterances'] / elapsed:.2f} 条/秒, "
+          f"{stats['audio_seconds'] / elapsed:.2f} 音频秒/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='多项目批量 TTS 生成（全局并发池）',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+    python scripts/batch_tts.py ./projects                # 递归扫描目录树
+    python scripts/batch_tts.py proj_a proj_b --jobs 16   # 指定多个项目
+    python scripts/batch_tts.py --list projects.txt       # 项目列表文件
+        '''
+    )
+    parser.add_argument('paths', nargs='*', help='项目目录或包含多个项目的目录树')
+    parser.add_argument('--list', help='项目列表文件（每行一个目录）')
+    parser.add_argument('--voice', default='xiaoxiao', choices=list(VOICE_MAP.keys()),
+                        help='声音选择（默认：xiaoxiao）')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS * 2,
+                        help=f'全局并发合成数（默认：{DEFAULT_JOBS * 2}）')
+    parser.add_argument('--rate', default='+0%', help='语速（默认：+0%%）')
+    parser.add_argument('--pitch', default='+0Hz', help='音调（默认：+0Hz）')
+    parser.add_argument('--cache-dir', default=str(TTSCache.default_dir()),
+                        help='缓存目录（默认：全局 ~/.cache/tutor/tts）')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f'缓存上限 MB（默认：{DEFAULT_CACHE_SIZE_MB}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用缓存，全部重新合成')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                        help=f'每秒最多发起的 TTS 请求数（默认：{DEFAULT_RPS:g}，0 为不限流）')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'瞬时错误的最大重试次数（默认：{DEFAULT_RETRIES}）')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_CHARS,
+                        help='超过该字数的文本分句并发合成（默认：0 不切分）')
+    parser.add_argument('--chunk-gap', type=float, default=DEFAULT_CHUNK_GAP,
+                        help=f'分句拼接的句间静音秒数（默认：{DEFAULT_CHUNK_GAP:g}）')
+    parser.add_argument('--backend', default='edge',
+                        help='TTS 后端：edge（默认）或 offline[:latency=秒,fail=失败率,...]')
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    if args.list:
+        paths += read_project_list(args.list)
+    if not paths:
+        parser.print_help()
+        sys.exit(1)
+
+    projects = discover_projects(paths)
+    if not projects:
+        print("Error: 未找到任何项目（需要 audio_list.csv 或含音频生成清单的分镜）")
+        sys.exit(1)
+
+    try:
+        backend = create_backend(args.backend)
+    except TTSBackendError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    jobs = max(1, args.jobs)
+    total = sum(len(p['entries']) for p in projects)
+    print(f"\n共 {len(projects)} 个项目, {total} 条 (后端: {backend.name}, 全局并发: {jobs})")
+    for project in projects:
+        print(f"  {project['dir']} ← {project['source'].name} ({len(project['entries'])} 条)")
+    print()
+
+    cache = None if args.no_cache else TTSCache(args.cache_dir, args.cache_size)
+    caller = ResilientCaller(rps=args.rps, retries=args.retries, is_transient=is_transient,
+                             concurrency=jobs)
+
+    print("完成的项目:")
+    stats = asyncio.run(run_batch(projects, args.voice, jobs, args.rate, args.pitch, cache,
+                                  backend, caller, args.chunk, args.chunk_gap))
+
+    if cache is not None:
+        cache.save()
+        print(cache.summary())
+    print_summary(stats)
+
+    sys.exit(1 if stats['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
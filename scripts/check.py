@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 """
 Manim 教学视频代码检查脚本
-验证 script.py 是否包含必要的函数和结构
+验证 script.py 是否包含必要的函数和结构，并在渲染前静态估算每幕动画与音频是否同步，
+同时列出已知会拖慢逐帧渲染的写法（渲染性能检查，只提示不阻止）
 
 使用方法:
-    python scripts/check.py [script_file]
+    python scripts/check.py [script_file] [--audio-dir DIR] [--max-overrun SEC] [--max-deficit SEC]
+                            [--no-sync] [--no-perf]
 
 默认检查 script.py，也可以指定其他文件
+音画同步估算读取脚本所在目录的 audio/audio_info.json（或 timeline.json），见 scene_timing.py
 """
 
 import ast
@@ -14,6 +17,14 @@ import sys
 import os
 from pathlib import Path
 
+from scene_timing import estimate_source, load_audio_durations
+from perf_lint import PerformanceLinter, COST_LABELS
+
+
+# 音画同步容差（秒）：动画比音频长 / 短超过该值时检查失败
+DEFAULT_MAX_OVERRUN = 0.5
+DEFAULT_MAX_DEFICIT = 0.5
+
 
 def safe_print(text):
     """安全打印，处理 Windows 控制台编码问题"""
@@ -30,6 +41,8 @@ def safe_print(text):
             '🔍': '[CHECK]',
             '🎬': '[NEXT]',
             '⛔': '[STOP]',
+            '⏱️': '[SYNC]',
+            '🐢': '[PERF]',
         }
         for old, new in replacements.items():
             text = text.replace(old, new)
@@ -57,12 +70,21 @@ class CodeChecker:
         'TitleSubtitle',
     ]
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, audio_dir=None, max_overrun=DEFAULT_MAX_OVERRUN,
+                 max_deficit=DEFAULT_MAX_DEFICIT, check_sync=True, check_perf=True):
         self.file_path = Path(file_path)
         self.errors = []
         self.warnings = []
         self.tree = None
+        self.source = ''
         self.classes = {}  # 类名 -> 方法列表
+        self.audio_dir = Path(audio_dir) if audio_dir else self.file_path.resolve().parent / 'audio'
+        self.max_overrun = max_overrun
+        self.max_deficit = max_deficit
+        self.sync_enabled = check_sync
+        self.sync = []  # 每幕的时长估算（scene_timing.estimate_source）
+        self.perf_enabled = check_perf
+        self.perf = []  # 渲染性能发现（PerformanceLinter）
 
     def parse(self):
         """解析 Python 文件"""
@@ -74,6 +96,7 @@ class CodeChecker:
             with open(self.file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             self.tree = ast.parse(content)
+            self.source = content
             return True
         except SyntaxError as e:
             self.errors.append(f"语法错误: {e}")
@@ -202,6 +225,60 @@ class CodeChecker:
                 "  示例: self.add_sound('audio/audio_001_开场.wav')"
             )
 
+    def check_sync(self):
+        """静态估算每幕动画时长，与音频时长比较"""
+        audio, audio_source = load_audio_durations(str(self.audio_dir))
+        if not audio:
+            self.warnings.append(
+                f"未找到音频时长（{self.audio_dir}/audio_info.json 或 timeline.json），跳过音画同步估算\n"
+                "  先生成音频，渲染前即可发现动画与读白不同步"
+            )
+            return
+
+        self.sync = estimate_source(self.source, audio)
+        if not self.sync:
+            self.warnings.append(
+                "未识别出分幕结构，跳过音画同步估算\n"
+                "  按 play_scene_N 方法组织，或在 construct 中用「# ===== 第N幕 =====」注释分段"
+            )
+            return
+
+        estimated = {r['scene'] for r in self.sync}
+        for r in self.sync:
+            where = f"第{r['scene']}幕（{r['method']}，第 {r['line']} 行）"
+            if r['audio'] is None:
+                continue
+            delta = r['total'] - r['audio']
+            if delta > self.max_overrun:
+                # 未知部分只会让动画更长，超时的结论仍然成立
+                self.errors.append(
+                    f"{where} 动画 {r['total']:.2f} 秒，比音频 {r['audio']:.2f} 秒长 {delta:.2f} 秒"
+                    f"{'（至少）' if r['unknown'] else ''}\n"
+                    f"  后续各幕的画面会落后于读白，请缩短动画或等待时间"
+                )
+            elif r['unknown']:
+                lines = '、'.join(str(line) for line, _ in r['unknown'][:5])
+                self.warnings.append(
+                    f"{where} 有 {len(r['unknown'])} 处时长无法静态确定（第 {lines} 行），"
+                    f"已知部分 {r['total']:.2f} 秒 / 音频 {r['audio']:.2f} 秒\n"
+                    f"  run_time / wait 使用字面量或音频时长表达式即可参与估算"
+                )
+            elif -delta > self.max_deficit:
+                self.errors.append(
+                    f"{where} 动画 {r['total']:.2f} 秒，比音频 {r['audio']:.2f} 秒短 {-delta:.2f} 秒\n"
+                    f"  读白会延续到下一幕，请在幕末补足等待（如 self.wait_for_audio / self.wait(duration - 已用时间)）"
+                )
+
+        missing = sorted(set(audio) - estimated)
+        if missing:
+            self.warnings.append(
+                f"以下幕有音频但未找到对应动画: {', '.join(f'第{n}幕' for n in missing)}（{audio_source}）"
+            )
+
+    def check_performance(self):
+        """渲染性能检查：逐个创建大量对象、细碎 VGroup、密集虚线、always_redraw 重建重对象"""
+        self.perf = PerformanceLinter(self.tree).run()
+
     def _get_function_description(self, func_name):
         """获取函数描述"""
         descriptions = {
@@ -229,6 +306,10 @@ class CodeChecker:
         self.check_recommended_functions()
         self.check_subtitle_classes()
         self.check_add_sound()
+        if self.sync_enabled:
+            self.check_sync()
+        if self.perf_enabled:
+            self.check_performance()
 
         # 输出结果
         return self.report()
@@ -237,6 +318,23 @@ class CodeChecker:
         """输出检查报告"""
         success = len(self.errors) == 0
 
+        # 音画同步估算
+        if self.sync:
+            safe_print("\n⏱️  音画同步估算 (动画 / 音频):")
+            for r in self.sync:
+                audio = f"{r['audio']:.2f}s" if r['audio'] is not None else "无音频"
+                delta = f" ({r['total'] - r['audio']:+.2f}s)" if r['audio'] is not None else ""
+                unknown = f"，{len(r['unknown'])} 处未知" if r['unknown'] else ""
+                safe_print(f"  第{r['scene']}幕: {r['total']:.2f}s{unknown} / {audio}{delta}")
+
+        # 渲染性能
+        if self.perf:
+            order = {'high': 0, 'medium': 1, 'low': 2}
+            safe_print("\n🐢 渲染性能 (按开销排序，不影响检查结果):")
+            for f in sorted(self.perf, key=lambda f: (order[f['cost']], f['line'])):
+                safe_print(f"  行 {f['line']} [{COST_LABELS[f['cost']]}] {f['message']}")
+                safe_print(f"      建议: {f['hint']}")
+
         # 错误
         if self.errors:
             safe_print("\n❌ 错误 (必须修复):")
@@ -269,16 +367,34 @@ class CodeChecker:
 def main():
     """主函数"""
     # 获取要检查的文件
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and not sys.argv[1].startswith('--'):
         script_file = sys.argv[1]
     else:
         script_file = "script.py"
 
+    # 解析选项
+    audio_dir = None
+    max_overrun = DEFAULT_MAX_OVERRUN
+    max_deficit = DEFAULT_MAX_DEFICIT
+    for i, arg in enumerate(sys.argv):
+        if arg == '--audio-dir' and i + 1 < len(sys.argv):
+            audio_dir = sys.argv[i + 1]
+        if arg in ('--max-overrun', '--max-deficit') and i + 1 < len(sys.argv):
+            try:
+                if arg == '--max-overrun':
+                    max_overrun = float(sys.argv[i + 1])
+                else:
+                    max_deficit = float(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: {arg} 需要数字 (秒): {sys.argv[i + 1]}")
+                sys.exit(1)
+
     # 检查文件路径
     script_path = Path(script_file)
 
     # 运行检查
-    checker = CodeChecker(script_path)
+    checker = CodeChecker(script_path, audio_dir, max_overrun, max_deficit,
+                          check_sync='--no-sync' not in sys.argv, check_perf='--no-perf' not in sys.argv)
     success = checker.run()
 
     # 返回退出码
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+试运行：执行场景的 construct()，不光栅化任何一帧，输出每幕精确时间轴
+
+背景：
+    想知道场景的实际时长、动画数量、assert_geometry 是否通过，原来只能完整渲染一遍。
+    check.py 的音画同步是静态估算，遇到循环、条件、wait_until 等写法只能给出「未知」。
+
+功能：
+- 导入场景类，用 NullRenderer 接管 play / wait / add_sound / add_subcaption：
+  按帧率逐帧推进动画（interpolate、updater、stop_condition 照常执行）并推进 Scene.time，
+  但不调用相机、不生成帧、不写视频；帧数的取整方式与 CairoRenderer 相同，时间轴与真实渲染一致
+- 记录每次 play / wait / add_sound 的起止时间、动画类型、场上对象数（顶层 / 含子对象），
+  以及是否静止等待（没有 updater，manim 只光栅化一帧重复写入；parallel_render.py 据此生成静止分段）
+- 事件按调用栈归入幕：play_scene_N 方法，或 construct 中「# ===== 第N幕 =====」注释划分的段落
+  （与 scene_timing.py 相同的规则）
+- 记录每幕的入口状态摘要（该幕第一个动画开始前场上对象的点集、颜色）、calculate_geometry()
+  返回值的摘要与渲染配置，供分段缓存判断某幕是否需要重新渲染（见 render_cache.py）
+- 每幕时长与音频时长（audio_info.json / timeline.json，没有时取该幕 add_sound 的音频）比较，
+  超出 check.py 的容差、或 construct 抛出异常（如 assert_geometry 失败）时返回非零，
+  可作为渲染前的廉价关卡
+
+使用：
+    python dry_run.py script.py -s MathScene              # 输出每幕时间轴，写入 media/dry_run/MathScene.json
+    python dry_run.py script.py -q l -o timeline.json
+    python render.py --dry-run                            # 流水线中：检查 -> 试运行，不渲染
+
+依赖：manim（在渲染环境中运行）
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import hashlib
+import argparse
+import traceback
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+from audio_probe import get_audio_duration
+from check import DEFAULT_MAX_OVERRUN, DEFAULT_MAX_DEFICIT
+from scene_timing import find_sections, scene_of_method, load_audio_durations
+
+
+# render.py 的质量参数 -> manim 的质量名
+QUALITY_NAMES = {
+    'l': 'low_quality',
+    'm': 'medium_quality',
+    'h': 'high_quality',
+    'k': 'fourk_quality',
+}
+
+# 默认输出目录（相对运行目录，与 manim 的 media/ 并列）
+DEFAULT_OUTPUT_DIR = Path('media') / 'dry_run'
+
+# 状态摘要中浮点数保留的小数位（忽略运算顺序带来的末位误差）
+DIGEST_DECIMALS = 6
+
+
+def _canonical(value):
+    """把几何数据转换为可稳定序列化的结构（numpy 数组、浮点数按 DIGEST_DECIMALS 取整）"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return np.round(value.astype(float), DIGEST_DECIMALS).tolist() if value.dtype.kind in 'fiu' else value.tolist()
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), DIGEST_DECIMALS)
+    if isinstance(value, (int, str, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def value_digest(value):
+    """任意几何数据的摘要"""
+    payload = json.dumps(_canonical(value), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def state_digest(scene):
+    """场上全部对象（含子对象）的摘要：类型、点集、填充 / 描边颜色与宽度，顺序即绘制顺序"""
+    digest = hashlib.sha256()
+    for mob in scene.get_mobject_family_members():
+        digest.update(type(mob).__name__.encode('utf-8'))
+        for attr in ('points', 'fill_rgbas', 'stroke_rgbas', 'stroke_width', 'z_index'):
+            value = getattr(mob, attr, None)
+            if value is not None:
+                digest.update(np.round(np.asarray(value, dtype=float), DIGEST_DECIMALS).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def geometry_digest(scene, module):
+    """calculate_geometry() 返回值的摘要（场景方法或模块函数；不存在或出错时为 None）"""
+    calculate = getattr(scene, 'calculate_geometry', None) or getattr(module, 'calculate_geometry', None)
+    if not callable(calculate):
+        return None
+    try:
+        return value_digest(calculate())
+    except Exception:
+        return None
+
+
+class NullRenderer:
+    """
+    空渲染器：替换场景实例的输出方法，只推进时间并记录事件
+
+    manim 的 Scene.wait / pause / wait_until 都经由 self.play(Wait(...))，
+    因此接管 play 即可覆盖全部时间推进。
+    """
+
+    def __init__(self, scene, filename, sections=None):
+        self.scene = scene
+        self.filename = filename
+        self.sections = sections or []
+        self.frame_rate = scene.renderer.camera.frame_rate
+        self.events = []
+        self._current = object()
+
+    def attach(self):
+        self.scene.renderer.time = 0.0
+        self.scene.play = self.play
+        self.scene.add_sound = self.add_sound
+        self.scene.add_subcaption = self.add_subcaption
+        return self
+
+    @property
+    def time(self):
+        return self.scene.renderer.time
+
+    def advance(self, frames):
+        """推进 frames 帧（与 CairoRenderer.add_frame 的累加方式相同）"""
+        self.scene.renderer.time += frames * (1 / self.frame_rate)
+
+    def locate(self):
+        """
+        调用位置：(幕号, 脚本中的行号)
+
+        行号取调用栈中最内层的脚本帧；幕号优先取外层的 play_scene_N 方法，
+        其次取 construct 当前行所在的「第N幕」段落
+        """
+        frame = sys._getframe(2)
+        chain = []
+        while frame is not None:
+            if frame.f_code.co_filename == self.filename:
+                chain.append((frame.f_code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        if not chain:
+            return None, None
+
+        line = chain[0][1]
+        for name, _ in reversed(chain):
+            scene = scene_of_method(name)
+            if scene is not None:
+                return scene, line
+        for name, lineno in chain:
+            if name == 'construct' and self.sections:
+                current = self.sections[0][1]
+                for start, scene in self.sections:
+                    if start <= lineno:
+                        current = scene
+                return current, line
+        return None, line
+
+    def play(self, *args, subcaption=None, subcaption_duration=None, subcaption_offset=0, **kwargs):
+        scene = self.scene
+        start = self.time
+        number, line = self.locate()
+        scene.compile_animation_data(*args, **kwargs)
+        # 进入新的一幕：记录入口状态（场上对象 + 本次动画的对象，动画开始前）
+        state = None
+        if number != self._current:
+            self._current = number
+            state = state_digest(scene)
+        scene.begin_animations()
+
+        static = bool(scene.is_current_animation_frozen_frame())
+        if static:
+            # 静止等待：CairoRenderer.freeze_current_frame 的帧数
+            self.advance(int(scene.duration / (1 / self.frame_rate)))
+        else:
+            # 与 Scene.play_internal 相同的逐帧推进，只是不渲染
+            for t in np.arange(0, scene.duration, 1 / self.frame_rate):
+                scene.update_to_time(t)
+                self.advance(1)
+                if scene.stop_condition is not None and scene.stop_condition():
+                    break
+            for animation in scene.animations:
+                animation.finish()
+                animation.clean_up_from_scene(scene)
+            scene.update_mobjects(0)
+        scene.renderer.num_plays += 1
+
+        names = [type(animation).__name__ for animation in scene.animations]
+        self.events.append({
+            'type': 'wait' if names == ['Wait'] else 'play',
+            'scene': number,
+            'line': line,
+            'start': round(start, 4),
+            'end': round(self.time, 4),
+            'duration': round(self.time - start, 4),
+            'requested': round(float(scene.duration), 4),
+            'animations': names,
+            'mobjects': len(scene.mobjects),
+            'family': len(scene.get_mobject_family_members()),
+            'static': static,
+        })
+        if state is not None:
+            self.events[-1]['state'] = state
+
+        if subcaption:
+            run_time = self.time - start
+            self.add_subcaption(subcaption, subcaption_duration or run_time, -run_time + subcaption_offset)
+
+    def add_sound(self, sound_file, time_offset=0, gain=None, **kwargs):
+        number, line = self.locate()
+        self.events.append({
+            'type': 'sound',
+            'scene': number,
+            'line': line,
+            'start': round(self.time + time_offset, 4),
+            'file': str(sound_file),
+            'duration': get_audio_duration(str(sound_file)) if os.path.isfile(str(sound_file)) else None,
+            'gain': gain,
+        })
+
+    def add_subcaption(self, content, duration=1, offset=0):
+        number, line = self.locate()
+        self.events.append({
+            'type': 'subcaption',
+            'scene': number,
+            'line': line,
+            'start': round(self.time + offset, 4),
+            'duration': round(duration, 4),
+            'content': content,
+        })
+
+
+def load_scene_class(script, scene_name=None):
+    """按 manim 的方式导入脚本（脚本目录加入 sys.path），返回 (场景类, 模块文件名)"""
+    from manim import Scene
+
+    path = Path(script).absolute()
+    module_name = path.stem
+    spec = importlib.util.spec_from_file_location(module_name, str(path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    sys.path.insert(0, str(path.parent))
+    spec.loader.exec_module(module)
+
+    classes = [obj for obj in vars(module).values()
+               if isinstance(obj, type) and issubclass(obj, Scene) and obj is not Scene
+               and obj.__module__ == module_name]
+    if scene_name:
+        for cls in classes:
+            if cls.__name__ == scene_name:
+                return cls, str(path)
+        raise LookupError(f"脚本中没有场景类 {scene_name}（可用：{', '.join(c.__name__ for c in classes) or '无'}）")
+    if len(classes) != 1:
+        raise LookupError(f"脚本中有 {len(classes)} 个场景类，请用 -s 指定")
+    return classes[0], str(path)
+
+
+def scene_sections(source, class_name):
+    """场景类 construct 中的幕划分（见 scene_timing.find_sections）"""
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ClassDef) and node.name == class_name:
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef) and item.name == 'construct':
+                    return find_sections(item, source)
+    return []
+
+
+def summarize(events, audio=None, max_overrun=DEFAULT_MAX_OVERRUN, max_deficit=DEFAULT_MAX_DEFICIT):
+    """
+    按幕汇总事件
+
+    参数:
+        audio: {幕号: 音频时长}；某幕不在其中时取该幕 add_sound 的音频时长之和
+
+    返回:
+        [{'scene', 'line', 'start', 'end', 'duration', 'plays', 'waits', 'animations',
+          'sounds', 'peak_family', 'entry_state', 'audio', 'delta', 'status'}, ...]
+    """
+    audio = audio or {}
+    scenes = {}
+    for event in events:
+        if event['scene'] is None:
+            continue
+        s = scenes.setdefault(event['scene'], {
+            'scene': event['scene'], 'line': event['line'], 'start': None, 'end': None,
+            'plays': 0, 'waits': 0, 'animations': 0, 'sounds': [], 'peak_family': 0, 'entry_state': None,
+        })
+        if event['type'] == 'sound':
+            s['sounds'].append({'file': event['file'], 'start': event['start'], 'duration': event['duration']})
+            continue
+        if event['type'] not in ('play', 'wait'):
+            continue
+        if s['start'] is None:
+            s['start'] = event['start']
+            s['entry_state'] = event.get('state')
+        s['end'] = event['end']
+        s['plays' if event['type'] == 'play' else 'waits'] += 1
+        s['animations'] += len(event['animations']) if event['type'] == 'play' else 0
+        s['peak_family'] = max(s['peak_family'], event['family'])
+
+    results = []
+    for number in sorted(scenes):
+        s = scenes[number]
+        s['duration'] = round((s['end'] or 0) - (s['start'] or 0), 4)
+        expected = audio.get(number)
+        if expected is None and s['sounds'] and all(x['duration'] for x in s['sounds']):
+            expected = round(sum(x['duration'] for x in s['sounds']), 3)
+        s['audio'] = expected
+        s['delta'] = round(s['duration'] - expected, 4) if expected is not None else None
+        if s['delta'] is None:
+            s['status'] = 'no-audio'
+        elif s['delta'] > max_overrun:
+            s['status'] = 'over'
+        elif -s['delta'] > max_deficit:
+            s['status'] = 'under'
+        else:
+            s['status'] = 'ok'
+        results.append(s)
+    return results
+
+
+def dry_run(script, scene_name=None, quality='h', audio_dir=None,
+            max_overrun=DEFAULT_MAX_OVERRUN, max_deficit=DEFAULT_MAX_DEFICIT):
+    """
+    试运行场景，返回时间轴 dict（见模块说明）；construct 抛出的异常记录在 'error' 中
+
+    异常:
+        ImportError: 未安装 manim
+        LookupError: 找不到场景类
+    """
+    import manim
+    from manim import config
+
+    config.quality = QUALITY_NAMES.get(quality, 'high_quality')
+    config.dry_run = True
+    config.disable_caching = True
+    config.progress_bar = 'none'
+    config.verbosity = 'WARNING'
+
+    started = time.time()
+    cls, filename = load_scene_class(script, scene_name)
+    with open(filename, 'r', encoding='utf-8') as f:
+        sections = scene_sections(f.read(), cls.__name__)
+
+    scene = cls()
+    renderer = NullRenderer(scene, filename, sections).attach()
+    geometry = geometry_digest(scene, sys.modules.get(cls.__module__))
+    error = None
+    try:
+        scene.setup()
+        scene.construct()
+        scene.tear_down()
+    except Exception as e:
+        frames = [f for f in traceback.extract_tb(e.__traceback__) if f.filename == filename]
+        where = f"（第 {frames[-1].lineno} 行）" if frames else ""
+        error = f"{type(e).__name__}: {e}{where}"
+
+    audio_dir = audio_dir or str(Path(filename).parent / 'audio')
+    audio, _ = load_audio_durations(audio_dir)
+    events = renderer.events
+    return {
+        'script': str(script),
+        'scene_class': cls.__name__,
+        'frame_rate': renderer.frame_rate,
+        'config': {
+            'manim': getattr(manim, '__version__', None),
+            'pixel_width': config.pixel_width,
+            'pixel_height': config.pixel_height,
+            'background_color': str(config.background_color),
+        },
+        'geometry': geometry,
+        'duration': round(renderer.time, 4),
+        'plays': sum(1 for e in events if e['type'] == 'play'),
+        'waits': sum(1 for e in events if e['type'] == 'wait'),
+        'sounds': sum(1 for e in events if e['type'] == 'sound'),
+        'elapsed': round(time.time() - started, 2),
+        'error': error,
+        'scenes': summarize(events, audio, max_overrun, max_deficit),
+        'events': events,
+    }
+
+
+def passed(result):
+    """试运行是否通过：没有异常，且各幕与音频的差值都在容差内"""
+    return result['error'] is None and all(s['status'] in ('ok', 'no-audio') for s in result['scenes'])
+
+
+def print_report(result):
+    print(f"场景 {result['scene_class']}: 总时长 {result['duration']:.2f} 秒 @ {result['frame_rate']:g}fps，"
+          f"play {result['plays']} 次，wait {result['waits']} 次，add_sound {result['sounds']} 次"
+          f"（试运行用时 {result['elapsed']:.1f} 秒）")
+    marks = {'ok': '✓', 'over': '✗ 动画偏长', 'under': '✗ 动画偏短', 'no-audio': '-'}
+    for s in result['scenes']:
+        audio = f"{s['audio']:.2f}秒 ({s['delta']:+.2f})" if s['audio'] is not None else "无音频"
+        print(f"  第{s['scene']}幕 [{s['start']:.2f} - {s['end']:.2f}] {s['duration']:.2f}秒 / 音频 {audio}  "
+              f"play {s['plays']}，wait {s['waits']}，对象峰值 {s['peak_family']}  {marks[s['status']]}")
+    if result['error']:
+        print(f"  ✗ construct 异常: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='试运行 Manim 场景（不渲染帧），输出每幕精确时间轴')
+    parser.add_argument('script', help='Manim 脚本')
+    parser.add_argument('-s', '--scene', help='场景类名（脚本中只有一个场景类时可省略）')
+    parser.add_argument('-q', '--quality', default='h', choices=sorted(QUALITY_NAMES),
+                        help='渲染质量，决定帧率（默认：h；脚本中设置的 config.frame_rate 优先）')
+    parser.add_argument('-o', '--output', help='时间轴 JSON 路径（默认：media/dry_run/<场景类名>.json）')
+    parser.add_argument('--audio-dir', help='音频目录（默认：脚本所在目录下的 audio/）')
+    parser.add_argument('--max-overrun', type=float, default=DEFAULT_MAX_OVERRUN,
+                        help=f'动画比音频长的容差，秒（默认：{DEFAULT_MAX_OVERRUN}）')
+    parser.add_argument('--max-deficit', type=float, default=DEFAULT_MAX_DEFICIT,
+                        help=f'动画比音频短的容差，秒（默认：{DEFAULT_MAX_DEFICIT}）')
+    args = parser.parse_args()
+
+    try:
+        result = dry_run(args.script, args.scene, args.quality, args.audio_dir,
+                         args.max_overrun, args.max_deficit)
+    except ImportError as e:
+        print(f"Error: 无法导入 manim（{e}），请在渲染环境中运行: pip install manim")
+        sys.exit(1)
+    except (OSError, LookupError, SyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"{result['scene_class']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print_report(result)
+    print(f"时间轴已写入: {output}")
+    sys.exit(0 if passed(result) else 1)
+
+
+if __name__ == '__main__':
+    main()
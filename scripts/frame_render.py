@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+渲染单个动画的一段帧（长动画按帧并行的工作进程），或静止等待的单帧，或止于第 0 个动画的分段
+
+背景：
+    按幕并行之后，单个 20 多秒的 play()（如 sample 中蒙日定理的证明动画）仍然只能在一个进程里
+    逐帧渲染，成为整部视频的瓶颈。
+
+功能：
+- 以 manim 的正常流程渲染场景，只保留第 N 个动画（-n N），之前的动画以跳过模式执行，
+  得到与串行渲染相同的确定性状态
+- 第 N 个动画照常逐帧推进（interpolate、updater 与串行渲染完全相同），
+  但只光栅化并编码 [起, 止) 范围内的帧；到达终点帧后不再计算该动画后面的帧，
+  下一个 play 开始时显式结束场景（不依赖 upto_animation_number，见 --upto）
+- 输出视频的编码参数与 manim 正常渲染相同，各段可由 parallel_render.py 流复制拼接
+- 核对第 N 个动画与试运行记录的是否相同（动画类型、请求时长、调用行号）：跳过模式下 Scene.time
+  不逐帧推进，依赖时间的写法可能改变 play 的次数，使序号偏移；不一致时以非零退出，不输出错位的帧
+- --still：第 N 个动画是静止等待时，只光栅化这一帧（与 freeze_current_frame 写入视频的帧相同）
+  存为 PNG 后立即结束，由 parallel_render.py 编码成静止分段；同样核对等待时长与调用行号
+- --upto M：按 manim 的正常流程渲染第 N 到第 M 个动画，第 M 个动画之后显式结束场景。
+  manim 0.18 只在 upto_animation_number 为真值时提前结束，manim -n 0,0 会渲染整个场景，
+  parallel_render.py 对止于第 0 个动画的分段改用这种方式
+
+使用（通常由 parallel_render.py 调用）：
+    python frame_render.py script.py -s MathScene -q h -n 42 --frames 0,300 --media-dir /tmp/x -o part_0 \
+        --expect Transform,FadeIn --requested 12.5 --line 87
+    python frame_render.py script.py -s MathScene -q h -n 17 --still --media-dir /tmp/x -o hold_3
+    python frame_render.py script.py -s MathScene -q h -n 0 --upto 0 --media-dir /tmp/x -o segment_000
+
+依赖：manim
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from dry_run import QUALITY_NAMES, load_scene_class
+
+
+class AnimationMismatch(LookupError):
+    """执行到的动画与试运行记录的不一致（动画序号发生了偏移）"""
+
+
+class _StillCaptured(Exception):
+    """静止帧已保存，结束场景"""
+
+
+def frame_count(duration, frame_rate):
+    """动画的帧数：与 Scene.play_internal 的逐帧时间点相同"""
+    return len(np.arange(0, duration, 1 / frame_rate))
+
+
+def script_line(filename):
+    """调用栈中最内层的脚本帧的行号（与 dry_run.NullRenderer.locate 相同的取法）"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_filename == filename:
+            return frame.f_lineno
+        frame = frame.f_back
+    return None
+
+
+def check_animation(animation, expected, filename, names=None, duration=None):
+    """
+    核对第 animation 个动画与试运行记录的是否相同
+
+    参数:
+        expected: {'animations': [类名], 'requested': 秒, 'line': 行号}，缺少的项不核对
+
+    异常:
+        AnimationMismatch: 不一致
+    """
+    if not expected:
+        return
+    actual = {'animations': names, 'requested': None if duration is None else round(float(duration), 4),
+              'line': script_line(filename)}
+    for field in ('animations', 'requested', 'line'):
+        want, got = expected.get(field), actual[field]
+        if want is None or got is None:
+            continue
+        mismatch = abs(want - got) > 1e-3 if field == 'requested' else want != got
+        if mismatch:
+            raise AnimationMismatch(
+                f"第 {animation} 个动画与试运行不一致（{field}: 试运行 {want}，实际 {got}）；"
+                f"跳过模式下 play 的次数发生了变化，请用串行渲染")
+
+
+def stop_after(last):
+    """第 last 个动画结束后结束场景（不依赖 upto_animation_number，见模块说明）"""
+    from manim import Scene
+    from manim.utils.exceptions import EndSceneEarlyException
+
+    original = Scene.play
+
+    def play(scene, *args, **kwargs):
+        if scene.renderer.num_plays > last:
+            raise EndSceneEarlyException()
+        return original(scene, *args, **kwargs)
+
+    Scene.play = play
+
+
+def render_range(script, scene_name, quality, first, last, media_dir, output):
+    """
+    渲染第 first 到第 last 个动画（与 manim -n first,last 相同，但第 last 个之后一定结束）
+
+    异常:
+        ImportError: 未安装 manim
+        LookupError: 找不到场景类
+    """
+    from manim import config
+
+    config.quality = QUALITY_NAMES.get(quality, 'high_quality')
+    config.media_dir = str(media_dir)
+    config.output_file = output
+    config.format = 'mp4'
+    config.progress_bar = 'none'
+    config.verbosity = 'WARNING'
+    config.disable_caching = True
+    config.from_animation_number = first
+    config.upto_animation_number = last
+
+    stop_after(last)
+    cls, _ = load_scene_class(script, scene_name)
+    cls().render()
+
+
+def render_frames(script, scene_name, quality, animation, start, end, media_dir, output, expected=None):
+    """
+    渲染第 animation 个动画的 [start, end) 帧
+
+    参数:
+        expected: 试运行记录的该动画（见 check_animation）
+
+    异常:
+        ImportError: 未安装 manim
+        LookupError: 找不到场景类
+        AnimationMismatch: 第 animation 个动画与试运行记录的不一致
+    """
+    from manim import config, Scene
+
+    config.quality = QUALITY_NAMES.get(quality, 'high_quality')
+    config.media_dir = str(media_dir)
+    config.output_file = output
+    config.format = 'mp4'
+    config.progress_bar = 'none'
+    config.verbosity = 'WARNING'
+    config.disable_caching = True
+    config.from_animation_number = animation
+    config.upto_animation_number = animation
+
+    original = Scene.play_internal
+
+    def play_internal(scene, skip_rendering=False):
+        if scene.renderer.num_plays != animation or scene.renderer.skip_animations:
+            return original(scene, skip_rendering)
+        scene.duration = scene.get_run_time(scene.animations)
+        check_animation(animation, expected, filename,
+                        [type(anim).__name__ for anim in scene.animations], scene.duration)
+        # 与 Scene.play_internal 相同，只是范围外的帧不渲染
+        for index, t in enumerate(np.arange(0, scene.duration, 1 / config.frame_rate)):
+            if index >= end:
+                break
+            scene.update_to_time(t)
+            if index >= start:
+                scene.renderer.render(scene, t, scene.moving_mobjects)
+            if scene.stop_condition is not None and scene.stop_condition():
+                break
+        for anim in scene.animations:
+            anim.finish()
+            anim.clean_up_from_scene(scene)
+        scene.update_mobjects(0)
+        scene.renderer.static_image = None
+
+    Scene.play_internal = play_internal
+    # 在下一个 play 开始时结束（此时本动画的分段文件已由 end_animation 写完）
+    stop_after(animation)
+    cls, filename = load_scene_class(script, scene_name)
+    cls().render()
+
+
+def render_still(script, scene_name, quality, animation, output, expected=None):
+    """
+    把第 animation 个动画（静止等待）的画面存为 PNG
+
+    参数:
+        expected: 试运行记录的该等待（见 check_animation），核对时长与调用行号
+
+    异常:
+        ImportError: 未安装 manim
+        LookupError: 找不到场景类，或第 animation 个动画不是静止等待
+        AnimationMismatch: 第 animation 个动画与试运行记录的不一致
+    """
+    from PIL import Image
+    from manim import config
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    config.quality = QUALITY_NAMES.get(quality, 'high_quality')
+    config.write_to_movie = False
+    config.progress_bar = 'none'
+    config.verbosity = 'WARNING'
+    config.disable_caching = True
+    config.from_animation_number = animation
+    config.upto_animation_number = animation
+
+    def freeze_current_frame(renderer, duration):
+        # CairoRenderer.play 已按静止等待的方式更新了画面，这一帧即视频中重复的帧
+        if renderer.num_plays == animation and not renderer.skip_animations:
+            check_animation(animation, expected, filename, duration=duration)
+            Image.fromarray(renderer.get_frame()).save(output)
+            raise _StillCaptured()
+
+    CairoRenderer.freeze_current_frame = freeze_current_frame
+    stop_after(animation)
+    cls, filename = load_scene_class(script, scene_name)
+    try:
+        cls().render()
+    except _StillCaptured:
+        return
+    raise LookupError(f"第 {animation} 个动画不是静止等待")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='渲染单个动画的一段帧（按帧并行的工作进程）')
+    parser.add_argument('script', help='Manim 脚本')
+    parser.add_argument('-s', '--scene', help='场景类名')
+    parser.add_argument('-q', '--quality', default='h', choices=sorted(QUALITY_NAMES), help='渲染质量（默认：h）')
+    parser.add_argument('-n', '--animation', type=int, required=True, help='动画序号（从 0 开始，wait 也计数）')
+    parser.add_argument('--frames', help='帧范围 起,止（不含止）')
+    parser.add_argument('--still', action='store_true', help='只把该静止等待的画面存为 PNG')
+    parser.add_argument('--upto', type=int, help='渲染第 N 到第 UPTO 个动画（整段，不切帧）')
+    parser.add_argument('--expect', help='试运行记录的动画类名，逗号分隔（不一致时退出）')
+    parser.add_argument('--requested', type=float, help='试运行记录的请求时长（秒）')
+    parser.add_argument('--line', type=int, help='试运行记录的调用行号')
+    parser.add_argument('--media-dir', required=True, help='manim 输出目录')
+    parser.add_argument('-o', '--output', required=True, help='输出文件名（不含扩展名）')
+    args = parser.parse_args()
+    expected = {
+        'animations': args.expect.split(',') if args.expect else None,
+        'requested': args.requested,
+        'line': args.line,
+    }
+
+    if args.still:
+        try:
+            Path(args.media_dir).mkdir(parents=True, exist_ok=True)
+            render_still(args.script, args.scene, args.quality, args.animation,
+                         Path(args.media_dir) / f"{args.output}.png", expected)
+        except ImportError as e:
+            print(f"Error: 无法导入 manim（{e}），请在渲染环境中运行: pip install manim")
+            sys.exit(1)
+        except (OSError, LookupError, SyntaxError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
+    if args.upto is not None:
+        try:
+            render_range(args.script, args.scene, args.quality, args.animation, args.upto,
+                         args.media_dir, args.output)
+        except ImportError as e:
+            print(f"Error: 无法导入 manim（{e}），请在渲染环境中运行: pip install manim")
+            sys.exit(1)
+        except (OSError, LookupError, SyntaxError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
+    if not args.frames:
+        print("Error: 需要 --frames、--still 或 --upto")
+        sys.exit(1)
+    try:
+        start, end = (int(x) for x in args.frames.split(','))
+    except ValueError:
+        print(f"Error: 无效的帧范围: {args.frames}")
+        sys.exit(1)
+
+    try:
+        render_frames(args.script, args.scene, args.quality, args.animation, start, end,
+                      args.media_dir, args.output, expected)
+    except ImportError as e:
+        print(f"Error: 无法导入 manim（{e}），请在渲染环境中运行: pip install manim")
+        sys.exit(1)
+    except (OSError, LookupError, SyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,14 @@ TTS 生成脚本
 
 功能：
 - 从 CSV 文件读取对白列表
-- 使用 Edge TTS (xiaoxiao 语音) 生成音频
+- 使用 Edge TTS (xiaoxiao 语音) 生成音频，支持 --jobs 并发合成
+- 内容寻址缓存：未改动的文本直接复用上次结果
+- 可切换 TTS 后端（--backend offline 为无网络的确定性替身，用于压测）
+- 令牌桶限流、瞬时错误指数退避重试、连续失败熔断；报告每条的尝试次数
+- 长文本可按句切分并发合成再拼接（--chunk），块偏移记录在 audio_info.json
+- 合成时的词边界时间戳（offsets/durations/tokens）写入 audio_info.json，可按读白精确对齐画面
+- 可选裁掉首尾静音并记录内部停顿（--trim，见 audio_trim.py）
+- 可选规范化为真正的 PCM WAV 供 manim add_sound 使用（--pcm，见 audio_pcm.py）
 - 输出到指定目录
 - 生成 audio_info.json 供验证脚本使用
 
@@ -15,6 +22,11 @@ CSV 格式：
 
 使用：
     python generate_tts.py audio_list.csv ./audio --voice xiaoxiao
+    python generate_tts.py audio_list.csv ./audio --jobs 8   # 8 条并发合成
+    python generate_tts.py audio_list.csv ./audio --cache-dir ./.tts_cache   # 项目内缓存
+    python generate_tts.py audio_list.csv ./audio --chunk 60   # 超过 60 字的文本分句并发合成
+    python generate_tts.py audio_list.csv ./audio --trim       # 裁掉首尾静音，记录停顿
+    python generate_tts.py audio_list.csv ./audio --pcm        # 另存 PCM WAV 到 audio/pcm/
 
 支持的声音：
     xiaoxiao (晓晓，女声，默认)
@@ -30,13 +42,12 @@ import json
 import asyncio
 from pathlib import Path
 
-# 检查 edge-tts
-try:
-    import edge_tts
-except ImportError:
-    print("Error: edge-tts 未安装")
-    print("请运行: uv pip install edge-tts")
-    sys.exit(1)
+from tts_engine import (run_bounded, ResilientCaller, CallFailed,
+                        DEFAULT_JOBS, DEFAULT_RPS, DEFAULT_RETRIES)
+from tts_cache import TTSCache, cache_key, remove_output, DEFAULT_CACHE_SIZE_MB
+from tts_backends import (create_backend, is_transient, TTSBackendError,
+                          compact_boundaries, expand_boundaries)
+from tts_chunks import chunk_format, synthesize_chunked, DEFAULT_CHUNK_CHARS, DEFAULT_CHUNK_GAP
 
 
 # 声音映射表
@@ -50,7 +61,9 @@ VOICE_MAP = {
 }
 
 
-async def generate_audio(text, output_path, voice='xiaoxiao'):
+async def generate_audio(text, output_path, voice='xiaoxiao', rate='+0%', pitch='+0Hz', cache=None,
+                         backend=None, caller=None, chunk_chars=DEFAULT_CHUNK_CHARS,
+                         chunk_gap=DEFAULT_CHUNK_GAP):
     """
     生成单条音频
 
@@ -58,43 +71,58 @@ async def generate_audio(text, output_path, voice='xiaoxiao'):
         text: 文本内容
         output_path: 输出文件路径
         voice: 声音名称
+        rate: 语速，如 '+10%'
+        pitch: 音调，如 '-5Hz'
+        cache: TTSCache 实例，None 表示不使用缓存
+        backend: TTS 后端（tts_backends），None 表示 Edge TTS
+        caller: ResilientCaller（限流/重试/熔断），None 表示使用默认参数
+        chunk_chars: 超过该长度的文本按句切分并发合成，0 表示不切分
+        chunk_gap: 分句拼接时的块间静音（秒）
 
     返回:
-        (success, duration)
+        dict: {'success': bool, 'duration': 秒, 'error': 错误信息或 None,
+               'cached': bool, 'attempts': 实际调用 TTS 的次数, 'boundaries': 边界事件列表,
+               'chunks': 分句信息 [{'offset', 'duration', 'text'}]（未切分时为空）}
     """
     voice_id = VOICE_MAP.get(voice, VOICE_MAP['xiaoxiao'])
+    backend = backend or create_backend('edge')
+    caller = caller or ResilientCaller(is_transient=is_transient)
+    key = cache_key(text, voice_id, rate, pitch,
+                    chunk_format(backend.output_format, text, chunk_chars, chunk_gap))
+    attempts = 0
 
     try:
-        communicate = edge_tts.Communicate(text, voice_id)
-        await communicate.save(output_path)
-
-        # 获取时长
-        duration = await get_audio_duration(output_path)
-        return True, duration
+        # 缓存命中：直接落地文件，时长取自缓存元数据
+        if cache is not None:
+            hit = cache.fetch(key, output_path)
+            if hit is not None:
+                return {'success': True, 'duration': hit['duration'], 'error': None,
+                        'cached': True, 'attempts': 0,
+                        'boundaries': expand_boundaries(hit.get('boundaries')),
+                        'chunks': hit.get('chunks', [])}
+
+        # 流式合成：音频块到达即写盘，时长由流推出，不再二次读取文件
+        remove_output(output_path)
+        synthesis, attempts = await synthesize_chunked(
+            backend, caller, text, voice_id, output_path, rate, pitch, chunk_chars, chunk_gap)
+        duration = synthesis['duration']
+        chunks = synthesis['chunks'] if len(synthesis['chunks']) > 1 else []
+
+        if cache is not None and duration > 0:
+            cache.store(key, output_path, duration, voice=voice_id, text=text[:50], chunks=chunks,
+                        boundaries=compact_boundaries(synthesis['boundaries']))
+        return {'success': True, 'duration': duration, 'error': None,
+                'cached': False, 'attempts': attempts, 'boundaries': synthesis['boundaries'],
+                'chunks': chunks}
+    except CallFailed as e:
+        # 不留下半截文件，验证阶段会明确报告缺失
+        remove_output(output_path)
+        return {'success': False, 'duration': 0, 'error': str(e), 'cached': False,
+                'attempts': e.attempts, 'boundaries': [], 'chunks': []}
     except Exception as e:
-        print(f"  Error generating {output_path}: {e}")
-        return False, 0
-
-
-async def get_audio_duration(audio_path):
-    """获取音频时长"""
-    try:
-        from mutagen.mp3 import MP3
-        audio = MP3(audio_path)
-        return audio.info.length
-    except:
-        pass
-
-    try:
-        import wave
-        with wave.open(audio_path, 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            return frames / float(rate)
-    except:
-        pass
-
-    return 0
+        remove_output(output_path)
+        return {'success': False, 'duration': 0, 'error': str(e), 'cached': False,
+                'attempts': attempts, 'boundaries': [], 'chunks': []}
 
 
 def parse_csv(csv_path):
@@ -168,8 +196,17 @@ def parse_csv(csv_path):
     return []
 
 
-async def generate_all(csv_path, output_dir, voice='xiaoxiao'):
-    """批量生成音频"""
+async def generate_all(csv_path, output_dir, voice='xiaoxiao', jobs=DEFAULT_JOBS,
+                       rate='+0%', pitch='+0Hz', cache=None, backend=None, caller=None,
+                       chunk_chars=DEFAULT_CHUNK_CHARS, chunk_gap=DEFAULT_CHUNK_GAP):
+    """
+    批量生成音频
+
+    最多 jobs 条并发合成；audio_info.json 与控制台报告均保持 CSV 顺序。
+    chunk_chars > 0 时，超长文本按句切分并发合成，块偏移记录在对应条目的 chunks 中。
+    传入 cache 时，未改动的文本直接复用缓存，只合成有变化的条目。
+    TTS 调用经 caller 限流、重试、熔断；重试后仍失败的条目记录在 audio_info.json 的 failed 中。
+    """
     # 解析 CSV
     entries = parse_csv(csv_path)
     if not entries:
@@ -177,68 +214,127 @@ async def generate_all(csv_path, output_dir, voice='xiaoxiao'):
 
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
+    normalize_filenames(entries)
 
-    # 生成音频
     results = []
+    failed = []
     total = len(entries)
+    backend = backend or create_backend('edge')
+    caller = caller or ResilientCaller(is_transient=is_transient)
 
-    print(f"\n开始生成音频 (声音: {voice})...")
+    print(f"\n开始生成音频 (声音: {voice}, 后端: {backend.name}, 并发: {jobs})...")
     print("="*50)
 
-    for i, entry in enumerate(entries, 1):
+    async def worker(index, entry):
+        output_path = os.path.join(output_dir, entry['filename'])
+        return await generate_audio(entry['text'], output_path, voice, rate, pitch, cache, backend, caller,
+                                    chunk_chars, chunk_gap)
+
+    def report(index, entry, result):
         filename = entry['filename']
         text = entry['text']
 
-        # 确保文件扩展名正确
-        if not filename.endswith(('.wav', '.mp3')):
-            filename += '.wav'
-
-        output_path = os.path.join(output_dir, filename)
-
-        print(f"[{i}/{total}] {filename}")
+        print(f"[{index + 1}/{total}] {filename}")
         print(f"    文本: {text[:50]}{'...' if len(text) > 50 else ''}")
 
-        success, duration = await generate_audio(text, output_path, voice)
-
-        if success:
-            # 从文件名提取幕号
-            scene_num = extract_scene_number(filename)
-            results.append({
-                'scene': scene_num,
-                'file': filename,
-                'text': text,
-                'duration': round(duration, 2)
-            })
+        if result['success']:
+            duration = result['duration']
+            results.append(result_item(entry, result))
+            if result['cached']:
+                source = " (缓存)"
+            elif result['attempts'] > 1:
+                source = f" (第 {result['attempts']} 次尝试成功)"
+            else:
+                source = ""
+            if result['chunks']:
+                source += f" [分 {len(result['chunks'])} 句合成]"
             try:
-                print(f"    ✓ 时长: {duration:.2f}s")
+                print(f"    ✓ 时长: {duration:.2f}s{source}")
             except UnicodeEncodeError:
-                print(f"    [OK] 时长: {duration:.2f}s")
+                print(f"    [OK] 时长: {duration:.2f}s{source}")
         else:
+            failed.append(failure_item(entry, result))
+            print(f"    Error: {result['error']}")
             try:
-                print(f"    ✗ 失败")
+                print(f"    ✗ 失败 (尝试 {result['attempts']} 次)")
             except UnicodeEncodeError:
-                print(f"    [FAIL] 失败")
+                print(f"    [FAIL] 失败 (尝试 {result['attempts']} 次)")
 
         print()
 
-    # 生成 audio_info.json
-    if results:
-        info = {
-            'files': results,
-            'total_duration': sum(r['duration'] for r in results),
-            'count': len(results),
-            'voice': voice
-        }
+    await run_bounded(entries, worker, jobs=jobs, on_done=report)
+
+    if cache is not None:
+        cache.save()
+        print(cache.summary())
 
-        info_path = os.path.join(output_dir, 'audio_info.json')
-        with open(info_path, 'w', encoding='utf-8') as f:
-            json.dump(info, f, ensure_ascii=False, indent=2)
+    if failed:
+        print(f"失败 {len(failed)} 条（重试后仍失败，可修复后重新运行，成功条目会命中缓存）:")
+        for item in failed:
+            print(f"  - {item['file']}: {item['error']}")
+        print()
 
+    # 生成 audio_info.json
+    if results:
+        info_path = write_audio_info(output_dir, results, failed, voice=voice, backend=backend.name,
+                                     rate=rate, pitch=pitch, chunk_chars=chunk_chars, chunk_gap=chunk_gap)
         print(f"已生成: {info_path}")
 
     return len(results) == len(entries)
 
 
+def normalize_filenames(entries):
+    """确保文件扩展名正确（无扩展名时补 .wav）"""
+    for entry in entries:
+        if not entry['filename'].endswith(('.wav', '.mp3')):
+            entry['filename'] += '.wav'
+    return entries
+
+
+def result_item(entry, result):
+    """成功条目在 audio_info.json files 中的记录"""
+    item = {
+        # 从文件名提取幕号
+        'scene': extract_scene_number(entry['filename']),
+        'file': entry['filename'],
+        'text': entry['text'],
+        'duration': round(result['duration'], 2),
+        'attempts': result['attempts']
+    }
+    if result['chunks']:
+        item['chunks'] = result['chunks']
+    boundaries = compact_boundaries(result['boundaries'])
+    if boundaries:
+        item['boundaries'] = boundaries
+    return item
+
+
+def failure_item(entry, result):
+    """失败条目在 audio_info.json failed 中的记录"""
+    return {
+        'scene': extract_scene_number(entry['filename']),
+        'file': entry['filename'],
+        'error': result['error'],
+        'attempts': result['attempts']
+    }
+
+
+def write_audio_info(output_dir, results, failed, **settings):
+    """写入 audio_info.json（settings 为声音、后端、语速等生成参数），返回文件路径"""
+    info = {
+        'files': results,
+        'failed': failed,
+        'total_duration': sum(r['duration'] for r in results),
+        'count': len(results),
+        **settings
+    }
+
+    info_path = os.path.join(output_dir, 'audio_info.json')
+    with open(info_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info_path
+
+
 def extract_scene_number(filename):
     """从文件名提取幕号"""
     # 支持格式: audio_001_xxx.wav, scene_01_xxx.wav, 001_xxx.wav
@@ -259,6 +355,23 @@ def main():
         print("")
         print("选项:")
         print("  --voice VOICE 声音选择 (默认: xiaoxiao)")
+        print(f"  --jobs N      并发合成数 (默认: {DEFAULT_JOBS}, 1 为串行)")
+        print("  --rate RATE   语速 (默认: +0%)")
+        print("  --pitch PITCH 音调 (默认: +0Hz)")
+        print("  --cache-dir DIR  缓存目录 (默认: 全局 ~/.cache/tutor/tts，可指定项目内目录)")
+        print(f"  --cache-size MB  缓存上限 (默认: {DEFAULT_CACHE_SIZE_MB} MB，超出按 LRU 淘汰)")
+        print("  --no-cache    不使用缓存，全部重新合成")
+        print(f"  --rps N       每秒最多发起的 TTS 请求数 (默认: {DEFAULT_RPS:g}, 0 为不限流)")
+        print(f"  --retries N   瞬时错误的最大重试次数 (默认: {DEFAULT_RETRIES})")
+        print("  --chunk N     超过 N 字的文本在句末标点处切分，并发合成后拼接 (默认: 0 不切分)")
+        print(f"  --chunk-gap SEC  分句拼接的句间静音 (默认: {DEFAULT_CHUNK_GAP:g} 秒)")
+        print("  --trim        合成后裁掉首尾静音，并在 audio_info.json 中记录内部停顿 (需要 numpy)")
+        print("  --trim-threshold DB  静音判定阈值 (默认: -45 dBFS)")
+        print("  --pcm         合成后解码为 PCM WAV 存入 audio/pcm/（按内容哈希缓存），供 add_sound 使用")
+        print("  --sample-rate N  PCM WAV 采样率 (默认: 48000)")
+        print("  --backend SPEC   TTS 后端 (默认: edge)")
+        print("                   offline[:latency=秒,fail=失败率,cps=每秒字数,format=mp3|wav,seed=N]")
+        print("                   offline 为本地确定性替身，无需网络，用于压测")
         print("")
         print("可用声音:")
         for k, v in VOICE_MAP.items():
@@ -267,6 +380,10 @@ def main():
         print("示例:")
         print("  python generate_tts.py audio_list.csv ./audio")
         print("  python generate_tts.py audio_list.csv ./audio --voice yunyang")
+        print("  python generate_tts.py audio_list.csv ./audio --jobs 8")
+        print("  python generate_tts.py audio_list.csv ./audio --cache-dir ./.tts_cache")
+        print("  python generate_tts.py audio_list.csv ./audio --chunk 60 --chunk-gap 0.3")
+        print("  python generate_tts.py audio_list.csv ./audio --backend offline:latency=0.5,fail=0.1")
         sys.exit(1)
 
     csv_path = sys.argv[1]
@@ -274,9 +391,74 @@ def main():
 
     # 解析选项
     voice = 'xiaoxiao'
+    jobs = DEFAULT_JOBS
+    rate = '+0%'
+    pitch = '+0Hz'
+    cache_dir = TTSCache.default_dir()
+    cache_size = DEFAULT_CACHE_SIZE_MB
+    use_cache = '--no-cache' not in sys.argv
+    backend_spec = 'edge'
+    rps = DEFAULT_RPS
+    retries = DEFAULT_RETRIES
+    chunk_chars = DEFAULT_CHUNK_CHARS
+    chunk_gap = DEFAULT_CHUNK_GAP
+    trim = '--trim' in sys.argv
+    trim_threshold = None
+    pcm = '--pcm' in sys.argv
+    sample_rate = None
     for i, arg in enumerate(sys.argv):
         if arg == '--voice' and i + 1 < len(sys.argv):
             voice = sys.argv[i + 1]
+        if arg == '--jobs' and i + 1 < len(sys.argv):
+            try:
+                jobs = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                print(f"Error: --jobs 需要整数: {sys.argv[i + 1]}")
+                sys.exit(1)
+        if arg == '--rate' and i + 1 < len(sys.argv):
+            rate = sys.argv[i + 1]
+        if arg == '--pitch' and i + 1 < len(sys.argv):
+            pitch = sys.argv[i + 1]
+        if arg in ('--rps', '--retries') and i + 1 < len(sys.argv):
+            try:
+                if arg == '--rps':
+                    rps = float(sys.argv[i + 1])
+                else:
+                    retries = max(0, int(sys.argv[i + 1]))
+            except ValueError:
+                print(f"Error: {arg} 需要数字: {sys.argv[i + 1]}")
+                sys.exit(1)
+        if arg in ('--chunk', '--chunk-gap') and i + 1 < len(sys.argv):
+            try:
+                if arg == '--chunk':
+                    chunk_chars = max(0, int(sys.argv[i + 1]))
+                else:
+                    chunk_gap = max(0.0, float(sys.argv[i + 1]))
+            except ValueError:
+                print(f"Error: {arg} 需要数字: {sys.argv[i + 1]}")
+                sys.exit(1)
+        if arg == '--trim-threshold' and i + 1 < len(sys.argv):
+            try:
+                trim_threshold = float(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --trim-threshold 需要数字 (dBFS): {sys.argv[i + 1]}")
+                sys.exit(1)
+        if arg == '--sample-rate' and i + 1 < len(sys.argv):
+            try:
+                sample_rate = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --sample-rate 需要整数: {sys.argv[i + 1]}")
+                sys.exit(1)
+        if arg == '--backend' and i + 1 < len(sys.argv):
+            backend_spec = sys.argv[i + 1]
+        if arg == '--cache-dir' and i + 1 < len(sys.argv):
+            cache_dir = sys.argv[i + 1]
+        if arg == '--cache-size' and i + 1 < len(sys.argv):
+            try:
+                cache_size = float(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --cache-size 需要数字 (MB): {sys.argv[i + 1]}")
+                sys.exit(1)
 
     # 检查文件
     if not os.path.exists(csv_path):
@@ -286,10 +468,42 @@ def main():
     print(f"CSV 文件: {csv_path}")
     print(f"输出目录: {output_dir}")
     print(f"使用声音: {voice}")
+    print(f"TTS 后端: {backend_spec}")
+    print(f"并发数量: {jobs}")
+    print(f"限流重试: {rps:g} 次/秒, 最多重试 {retries} 次")
+    print(f"TTS 缓存: {cache_dir if use_cache else '关闭'}")
+    if chunk_chars:
+        print(f"分句合成: 超过 {chunk_chars} 字切分, 句间静音 {chunk_gap:g} 秒")
     print("")
 
+    cache = TTSCache(cache_dir, cache_size) if use_cache else None
+
+    try:
+        backend = create_backend(backend_spec)
+    except TTSBackendError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # 分句并发时请求数可能超过条目数，同时进行中的请求也限制在 jobs 以内
+    caller = ResilientCaller(rps=rps, retries=retries, is_transient=is_transient, concurrency=jobs)
+
     # 运行
-    success = asyncio.run(generate_all(csv_path, output_dir, voice))
+    success = asyncio.run(generate_all(csv_path, output_dir, voice, jobs, rate, pitch, cache, backend, caller,
+                                       chunk_chars, chunk_gap))
+
+    # 裁剪首尾静音（缓存中保存的是未裁剪的原始结果，每次生成后重新裁剪）
+    if trim and os.path.exists(os.path.join(output_dir, 'audio_info.json')):
+        from audio_trim import trim_audio_dir, print_report, DEFAULT_THRESHOLD_DB
+        print("\n裁剪首尾静音...")
+        outcomes, errors = trim_audio_dir(
+            output_dir, threshold_db=DEFAULT_THRESHOLD_DB if trim_threshold is None else trim_threshold)
+        print_report(outcomes, errors)
+
+    # 解码为 PCM WAV（在裁剪之后：内容变了缓存键也随之变化）
+    if pcm and os.path.exists(os.path.join(output_dir, 'audio_info.json')):
+        from audio_pcm import normalize_audio_dir, print_report, DEFAULT_SAMPLE_RATE
+        statuses, errors = normalize_audio_dir(output_dir, sample_rate=sample_rate or DEFAULT_SAMPLE_RATE)
+        print_report(statuses, errors)
 
     if success:
         try:
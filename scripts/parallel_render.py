@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+按幕并行渲染，无损拼接
+
+背景：
+    manim 在一个进程里逐幕串行渲染，只用一个核；渲染机有几十个核。
+
+功能：
+- 先试运行（dry_run.py，不渲染帧）得到每次 play / wait 的序号与所属幕，
+  把动画序号按幕切成连续区间（幕前、幕间未归属的动画并入相邻的幕）
+- 每幕一个 manim 进程：manim -n 起,止 只渲染该区间，之前的动画以跳过模式执行
+  （照常计算几何、构造对象、执行动画的最终状态，不光栅化），因此每个进程从该幕需要的状态开始；
+  各进程使用独立的 media 目录，互不争用 partial_movie_files
+  （止于第 0 个动画的分段改由 frame_render.py --upto 渲染：manim 0.18 的 -n 0,0 会渲染整个场景）
+- 单个 play() 超过 --split 秒（默认 10 秒）时按帧再切成若干块，每块由 frame_render.py 渲染：
+  同样以跳过模式重建状态，动画逐帧推进但只光栅化本块的帧；块数不超过进程数，每块至少 2 秒
+- 超过 --hold 秒（默认 2 秒）的静止等待（没有 updater 的 wait，wait_for_audio 等补齐音频时长的等待）
+  单独成段：frame_render.py --still 只光栅化这一帧，ffmpeg 按与 manim 相同的编码参数
+  （libx264、yuv420p、crf 23）把它编码成所需帧数的静止视频，渲染与编码时间只随运动的帧数增长
+- 进程并发数默认等于 CPU 核数，时长最长的段先开始（静止分段最后）
+- 各段编码参数相同，ffmpeg concat 分离器直接流复制拼接，不重新编码，帧序与串行渲染一致
+- add_sound 的声音不随分段写入（跳过模式下的时间戳不可靠），按试运行记录的时间点统一混入成片
+- 各段按指纹缓存在 media/render_cache/（见 render_cache.py）：未变化的幕直接复用上次编码的视频，
+  只渲染变化的幕；--no-cache 全部重新渲染
+- 成片写到与 manim 相同的位置（media/videos/<脚本名>/<分辨率>/<场景类名>.mp4），
+  render.py 的拷贝步骤无需区分
+
+注意：
+    跳过模式下每个 play 只按 run_time 一步推进到终点，Scene.time 不逐帧推进（add_frame 在跳过时
+    直接返回，不累加时间；stop_condition 提前结束的等待也不会按实际帧数计时）。
+    依赖 updater 逐帧累积、或依赖 Scene.time 做分支的写法（如 wait_until_narration），分段渲染前后
+    的状态、甚至 play 的次数都可能与串行渲染不同；这类场景请用串行渲染（render.py 不加 -j）。
+    按帧切块与静止分段的工作进程会核对第 N 个动画与试运行记录的是否相同，每段渲染后再用 ffprobe
+    核对帧数与试运行一致，序号偏移时报错而不是拼出错位的帧。
+
+使用：
+    python parallel_render.py script.py -s MathScene -q h -j 32
+    python parallel_render.py script.py -j 32 --split 5       # 超过 5 秒的单个动画按帧切块
+    python parallel_render.py script.py --hold 0              # 静止等待也逐帧编码
+    python render.py -j 32                       # 流水线中使用
+
+依赖：manim、ffmpeg（含 ffprobe）
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from dry_run import dry_run
+from frame_render import frame_count
+from render_cache import SegmentCache, segment_keys
+
+
+# 默认并发进程数
+DEFAULT_RENDER_JOBS = os.cpu_count() or 1
+
+# 单个动画超过该时长（秒）时按帧切块并行渲染，0 表示不切
+DEFAULT_SPLIT_SECONDS = 10.0
+# 每块的最短时长（秒）：块太小时每个进程重建状态的开销占比过高
+MIN_CHUNK_SECONDS = 2.0
+
+# 静止等待超过该时长（秒）时单独成段，只渲染一帧，0 表示不拆
+DEFAULT_HOLD_SECONDS = 2.0
+# 静止分段的编码参数：与 manim 写 mp4 的默认参数相同，才能与其他分段流复制拼接
+HOLD_ENCODE_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '23']
+
+# 按帧渲染的工作进程脚本
+FRAME_RENDER_SCRIPT = Path(__file__).parent / 'frame_render.py'
+
+
+def plan_segments(timeline):
+    """
+    按幕把动画序号切成连续区间
+
+    参数:
+        timeline: dry_run() 的返回值
+
+    返回:
+        [{'index', 'scene', 'first', 'last', 'start', 'end', 'duration', 'frame_rate'}, ...]，按播放顺序
+    """
+    segments = []
+    plays = [e for e in timeline['events'] if e['type'] in ('play', 'wait')]
+    for number, event in enumerate(plays):
+        current = segments[-1] if segments else None
+        if current is not None and event['scene'] in (None, current['scene']):
+            current['last'] = number
+            current['end'] = event['end']
+        elif current is not None and current['scene'] is None:
+            # 第一幕之前的动画并入第一幕
+            current.update(scene=event['scene'], last=number, end=event['end'])
+        else:
+            segments.append({'index': len(segments), 'scene': event['scene'], 'first': number,
+                             'last': number, 'start': event['start'], 'end': event['end']})
+    for segment in segments:
+        segment['duration'] = round(segment['end'] - segment['start'], 4)
+        segment['frame_rate'] = timeline['frame_rate']
+    return segments
+
+
+def expectation(event):
+    """试运行记录的动画，供工作进程核对（见 frame_render.check_animation）"""
+    return {'animations': event['animations'], 'requested': event['requested'], 'line': event.get('line')}
+
+
+def expect_args(segment):
+    """expectation() 对应的 frame_render.py 参数"""
+    expect = segment.get('expect')
+    if not expect:
+        return []
+    args = ['--expect', ','.join(expect['animations']), '--requested', str(expect['requested'])]
+    if expect.get('line') is not None:
+        args += ['--line', str(expect['line'])]
+    return args
+
+
+def split_long(segments, timeline, jobs, split_seconds=DEFAULT_SPLIT_SECONDS):
+    """
+    把超过 split_seconds 的单个 play() 从所在分段中拆出，按帧切成若干块
+
+    返回:
+        新的分段列表（按播放顺序重新编号）；帧块带 'frames': [起, 止)，
+        以及 'expect': 试运行记录的该动画（工作进程据此核对序号没有偏移）
+    """
+    if not split_seconds or jobs < 2:
+        return segments
+    plays = [e for e in timeline['events'] if e['type'] in ('play', 'wait')]
+    fps = timeline['frame_rate']
+
+    def piece(segment, first, last):
+        return dict(segment, first=first, last=last, start=plays[first]['start'], end=plays[last]['end'],
+                    duration=round(plays[last]['end'] - plays[first]['start'], 4))
+
+    result = []
+    for segment in segments:
+        first = segment['first']
+        for number in range(segment['first'], segment['last'] + 1):
+            event = plays[number]
+            if event['type'] != 'play' or event['duration'] < split_seconds:
+                continue
+            if number > first:
+                result.append(piece(segment, first, number - 1))
+            frames = frame_count(event['requested'], fps)
+            chunks = max(1, min(jobs, int(event['duration'] // MIN_CHUNK_SECONDS)))
+            bounds = [round(frames * i / chunks) for i in range(chunks + 1)]
+            for a, b in zip(bounds, bounds[1:]):
+                result.append(dict(piece(segment, number, number), frames=[a, b], expect=expectation(event),
+                                   start=round(event['start'] + a / fps, 4),
+                                   end=round(event['start'] + b / fps, 4),
+                                   duration=round((b - a) / fps, 4)))
+            first = number + 1
+        if first <= segment['last']:
+            result.append(piece(segment, first, segment['last']))
+
+    for index, segment in enumerate(result):
+        segment['index'] = index
+    return result
+
+
+def split_holds(segments, timeline, hold_seconds=DEFAULT_HOLD_SECONDS):
+    """
+    把超过 hold_seconds 的静止等待从所在分段中拆出
+
+    返回:
+        新的分段列表（按播放顺序重新编号）；静止分段带 'hold': 帧数与 'expect'
+    """
+    if not hold_seconds:
+        return segments
+    plays = [e for e in timeline['events'] if e['type'] in ('play', 'wait')]
+    fps = timeline['frame_rate']
+
+    def piece(segment, first, last):
+        return dict(segment, first=first, last=last, start=plays[first]['start'], end=plays[last]['end'],
+                    duration=round(plays[last]['end'] - plays[first]['start'], 4))
+
+    result = []
+    for segment in segments:
+        if segment.get('frames'):
+            result.append(segment)
+            continue
+        first = segment['first']
+        for number in range(segment['first'], segment['last'] + 1):
+            event = plays[number]
+            if not event.get('static') or event['duration'] < hold_seconds:
+                continue
+            if number > first:
+                result.append(piece(segment, first, number - 1))
+            result.append(dict(piece(segment, number, number), hold=int(round(event['duration'] * fps)),
+                               expect=expectation(event)))
+            first = number + 1
+        if first <= segment['last']:
+            result.append(piece(segment, first, segment['last']))
+
+    for index, segment in enumerate(result):
+        segment['index'] = index
+    return result
+
+
+def segment_name(segment):
+    return f"segment_{segment['index']:03d}"
+
+
+def render_segment(script, scene_class, quality, segment, work_dir):
+    """
+    渲染一个区间
+
+    返回:
+        (segment, 视频路径 或 None, 错误信息 或 None)
+    """
+    media_dir = Path(work_dir) / segment_name(segment)
+    if segment.get('hold'):
+        return render_hold(script, scene_class, quality, segment, work_dir)
+    if segment.get('frames'):
+        cmd = [
+            sys.executable, str(FRAME_RENDER_SCRIPT), str(script), '-s', scene_class, '-q', quality,
+            '-n', str(segment['first']), '--frames', ','.join(str(f) for f in segment['frames']),
+            '--media-dir', str(media_dir), '-o', segment_name(segment), *expect_args(segment),
+        ]
+    elif segment['last'] == 0:
+        # manim 0.18 不把 -n 0,0 的终点当回事（upto 为 0 时不提前结束），改由工作进程显式结束
+        cmd = [
+            sys.executable, str(FRAME_RENDER_SCRIPT), str(script), '-s', scene_class, '-q', quality,
+            '-n', '0', '--upto', '0', '--media-dir', str(media_dir), '-o', segment_name(segment),
+        ]
+    else:
+        cmd = [
+            'manim', '-q', quality, '--format', 'mp4', '--progress_bar', 'none',
+            '-n', f"{segment['first']},{segment['last']}",
+            '--media_dir', str(media_dir),
+            '-o', segment_name(segment),
+            str(script), scene_class,
+        ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        return segment, None, "未找到 manim 命令"
+    if result.returncode != 0:
+        tail = (result.stderr or result.stdout).strip().splitlines()[-5:]
+        return segment, None, '\n'.join(tail)
+
+    videos = [p for p in (media_dir / 'videos').rglob(f"{segment_name(segment)}.mp4")
+              if 'partial_movie_files' not in p.parts]
+    if not videos:
+        return segment, None, f"未找到输出视频（{media_dir}）"
+    return segment, videos[0], None
+
+
+def render_hold(script, scene_class, quality, segment, work_dir):
+    """
+    渲染静止分段：只光栅化一帧，再编码成 segment['hold'] 帧的视频
+
+    返回:
+        (segment, 视频路径 或 None, 错误信息 或 None)
+    """
+    media_dir = Path(work_dir) / segment_name(segment)
+    cmd = [
+        sys.executable, str(FRAME_RENDER_SCRIPT), str(script), '-s', scene_class, '-q', quality,
+        '-n', str(segment['first']), '--still', '--media-dir', str(media_dir), '-o', segment_name(segment),
+        *expect_args(segment),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        tail = (result.stderr or result.stdout).strip().splitlines()[-5:]
+        return segment, None, '\n'.join(tail)
+
+    still = media_dir / f"{segment_name(segment)}.png"
+    video = media_dir / f"{segment_name(segment)}.mp4"
+    try:
+        encode = subprocess.run(
+            ['ffmpeg', '-y', '-v', 'error', '-loop', '1', '-framerate', f"{segment['frame_rate']:g}",
+             '-i', str(still), '-frames:v', str(segment['hold']), *HOLD_ENCODE_ARGS, '-an', str(video)],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return segment, None, "未找到 ffmpeg 命令"
+    if encode.returncode != 0:
+        return segment, None, encode.stderr.strip() or "静止分段编码失败"
+    return segment, video, None
+
+
+def expected_frames(segment):
+    """按试运行的时间轴，该分段应有的帧数"""
+    if segment.get('frames'):
+        return segment['frames'][1] - segment['frames'][0]
+    if segment.get('hold'):
+        return segment['hold']
+    return int(round(segment['duration'] * segment['frame_rate']))
+
+
+def video_frames(video):
+    """视频流的帧数（ffprobe 逐包计数，不解码）"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+         '-show_entries', 'stream=nb_read_packets', '-of', 'csv=p=0', str(video)],
+        capture_output=True, text=True, check=True
+    )
+    return int(result.stdout.strip().split(',')[0])
+
+
+def check_frames(segment, video):
+    """
+    核对分段的帧数与试运行是否一致：跳过模式下 play 的次数可能变化（见模块说明），
+    manim -n 起,止 渲染的区间随之错位，只能从输出的帧数发现
+
+    返回:
+        错误信息 或 None
+    """
+    try:
+        actual = video_frames(video)
+    except FileNotFoundError:
+        return "未找到 ffprobe 命令"
+    except (subprocess.CalledProcessError, ValueError, IndexError):
+        return f"无法读取帧数（{video}）"
+    expected = expected_frames(segment)
+    if actual != expected:
+        return (f"帧数 {actual} 与试运行的 {expected} 不一致（动画 {segment['first']}-{segment['last']}）；"
+                f"跳过模式下 play 的次数发生了变化，请用串行渲染")
+    return None
+
+
+def concat_segments(videos, output, work_dir):
+    """流复制拼接（只取视频流，不重新编码）"""
+    list_file = Path(work_dir) / 'segments.txt'
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for video in videos:
+            f.write(f"file '{Path(video).absolute()}'\n")
+    subprocess.run(
+        ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', str(list_file),
+         '-map', '0:v', '-c', 'copy', str(output)],
+        check=True
+    )
+
+
+def mix_sounds(video, sounds, output):
+    """
+    按时间点把声音混入视频（视频流复制）
+
+    参数:
+        sounds: [{'file', 'start', 'gain'}, ...]，start 为成片中的秒数
+    """
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-i', str(video)]
+    chains = []
+    for i, sound in enumerate(sounds, 1):
+        cmd += ['-i', sound['file']]
+        chain = f"[{i}:a]adelay={int(round(sound['start'] * 1000))}:all=1"
+        if sound.get('gain'):
+            chain += f",volume={sound['gain']}dB"
+        chains.append(f"{chain}[a{i}]")
+    labels = ''.join(f"[a{i}]" for i in range(1, len(sounds) + 1))
+    # 声音结束后补静音，由 -shortest 截到视频长度
+    chains.append(f"{labels}amix=inputs={len(sounds)}:normalize=0:dropout_transition=0,apad[a]")
+    cmd += ['-filter_complex', ';'.join(chains), '-map', '0:v', '-map', '[a]',
+            '-c:v', 'copy', '-c:a', 'aac', '-shortest', str(output)]
+    subprocess.run(cmd, check=True)
+
+
+def output_path(script, timeline):
+    """成片路径：与 manim 串行渲染的输出位置相同（media/videos/<脚本名>/<高度>p<帧率>/）"""
+    resolution = f"{timeline['config']['pixel_height']}p{timeline['frame_rate']:g}"
+    return Path('media') / 'videos' / Path(script).stem / resolution / f"{timeline['scene_class']}.mp4"
+
+
+def render_parallel(script, scene_class, quality='h', jobs=DEFAULT_RENDER_JOBS, keep=False,
+                    cache_dir=None, use_cache=True, split_seconds=DEFAULT_SPLIT_SECONDS,
+                    hold_seconds=DEFAULT_HOLD_SECONDS):
+    """
+    按幕并行渲染并拼接（未变化的幕从分段缓存复用）
+
+    返回:
+        (成片路径 或 None, [错误信息])
+    """
+    timeline = dry_run(script, scene_class, quality)
+    if timeline['error']:
+        return None, [f"试运行失败: {timeline['error']}"]
+    scene_class = timeline['scene_class']
+    segments = split_long(plan_segments(timeline), timeline, jobs, split_seconds)
+    segments = split_holds(segments, timeline, hold_seconds)
+    if not segments:
+        return None, ["场景中没有动画"]
+
+    print(f"分段: {len(segments)} 段，{timeline['plays'] + timeline['waits']} 个动画，"
+          f"总时长 {timeline['duration']:.2f} 秒，最多 {jobs} 个并发进程")
+    for segment in segments:
+        label = f"第{segment['scene']}幕" if segment['scene'] is not None else "未分幕"
+        frames = f"，帧 {segment['frames'][0]}-{segment['frames'][1] - 1}" if segment.get('frames') else ""
+        if segment.get('hold'):
+            frames = f"，静止 {segment['hold']} 帧"
+        print(f"  {segment_name(segment)}: {label}，动画 {segment['first']}-{segment['last']}{frames}，"
+              f"{segment['duration']:.2f} 秒")
+
+    with open(script, 'r', encoding='utf-8') as f:
+        keys = segment_keys(f.read(), timeline, segments, quality)
+    cache = SegmentCache(cache_dir or SegmentCache.default_dir()) if use_cache else None
+
+    work_dir = tempfile.mkdtemp(prefix='tutor_render_')
+    try:
+        videos, pending = {}, []
+        for segment, key in zip(segments, keys):
+            cached = Path(work_dir) / f"{segment_name(segment)}.mp4"
+            if cache is not None and cache.fetch(key, cached):
+                videos[segment['index']] = cached
+            else:
+                pending.append(segment)
+        if cache is not None:
+            print(f"{cache.summary()}，需要渲染 {len(pending)} 段")
+
+        # 每个任务是独立的 manim 进程，线程只负责等待；静止分段只渲染一帧，放在最后
+        ordered = sorted(pending, key=lambda s: (bool(s.get('hold')), -s['duration']))
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            done = list(pool.map(lambda s: render_segment(script, scene_class, quality, s, work_dir), ordered))
+
+        done = [(s, video, error or check_frames(s, video)) for s, video, error in done]
+        errors = [f"{segment_name(s)}: {error}" for s, _, error in done if error]
+        if errors:
+            return None, errors
+        for segment, video, _ in done:
+            videos[segment['index']] = video
+            if cache is not None:
+                cache.store(keys[segment['index']], video)
+        if cache is not None:
+            cache.prune()
+        videos = [videos[segment['index']] for segment in segments]
+
+        output = output_path(script, timeline)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        sounds = [e for e in timeline['events'] if e['type'] == 'sound' and os.path.isfile(e['file'])]
+        if sounds:
+            joined = Path(work_dir) / 'joined.mp4'
+            concat_segments(videos, joined, work_dir)
+            mix_sounds(joined, sounds, output)
+        else:
+            concat_segments(videos, output, work_dir)
+        return output, []
+    except (OSError, subprocess.CalledProcessError) as e:
+        return None, [f"拼接失败: {e}"]
+    finally:
+        if keep:
+            print(f"分段文件保留在: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按幕并行渲染 Manim 场景，流复制拼接')
+    parser.add_argument('script', help='Manim 脚本')
+    parser.add_argument('-s', '--scene', help='场景类名（脚本中只有一个场景类时可省略）')
+    parser.add_argument('-q', '--quality', default='h', choices=['l', 'm', 'h', 'k'],
+                        help='渲染质量（默认：h）')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_RENDER_JOBS,
+                        help=f'并发 manim 进程数（默认：CPU 核数 {DEFAULT_RENDER_JOBS}）')
+    parser.add_argument('--split', type=float, default=DEFAULT_SPLIT_SECONDS,
+                        help=f'单个动画超过该秒数时按帧切块并行（默认：{DEFAULT_SPLIT_SECONDS:g}，0 不切）')
+    parser.add_argument('--hold', type=float, default=DEFAULT_HOLD_SECONDS,
+                        help=f'静止等待超过该秒数时只渲染一帧（默认：{DEFAULT_HOLD_SECONDS:g}，0 逐帧编码）')
+    parser.add_argument('--keep', action='store_true', help='保留分段文件（调试用）')
+    parser.add_argument('--cache-dir', help='分段缓存目录（默认：media/render_cache）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用分段缓存，全部重新渲染')
+    args = parser.parse_args()
+
+    try:
+        output, errors = render_parallel(args.script, args.scene, args.quality, args.jobs, args.keep,
+                                         args.cache_dir, not args.no_cache, args.split, args.hold)
+    except ImportError as e:
+        print(f"Error: 无法导入 manim（{e}），请在渲染环境中运行: pip install manim")
+        sys.exit(1)
+    except (OSError, LookupError, SyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for error in errors:
+        print(f"❌ {error}")
+    if output is None:
+        sys.exit(1)
+    print(f"✅ 成片: {output}")
+
+
+if __name__ == '__main__':
+    main()
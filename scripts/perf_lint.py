@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+渲染性能检查：找出已知会拖慢逐帧渲染的 Manim 写法（静态分析，不导入 manim、不执行脚本）
+
+功能：
+- 循环 / 推导式中逐个创建 Dot、Text 等对象（按循环次数估算数量）
+- 由大量小点组成的 VGroup（应改为一条 VMobject 曲线）
+- num_dashes 很大的 DashedVMobject
+- always_redraw 中每帧重建文字、公式、虚线等重对象
+- *[FadeOut(mob) for mob in self.mobjects] 逐个对象生成动画
+- 每条发现给出行号、开销等级（高/中/低）与改写建议；只作提示，不影响 check.py 的检查结果
+
+使用：
+    from perf_lint import PerformanceLinter, COST_LABELS
+
+    for f in PerformanceLinter(ast.parse(source)).run():
+        f['line'], f['rule'], COST_LABELS[f['cost']], f['message'], f['hint']
+
+命令行：
+    python perf_lint.py script.py
+"""
+
+import ast
+import sys
+import argparse
+
+
+# 逐个创建时的相对开销（Dot = 1）：文字要排版并解析 SVG，公式还要调用 LaTeX
+MOBJECT_WEIGHTS = {
+    'Dot': 1, 'SmallDot': 1, 'Dot3D': 2, 'Circle': 1, 'Line': 1, 'Arrow': 2,
+    'DecimalNumber': 10, 'Integer': 10, 'Text': 10, 'MarkupText': 10, 'Paragraph': 10,
+    'MathTex': 15, 'Tex': 15, 'SingleStringMathTex': 15,
+}
+# 组成「细碎 VGroup」的小对象
+TINY_MOBJECTS = {'Dot', 'SmallDot', 'Dot3D'}
+# always_redraw 中每帧重建代价高的对象
+HEAVY_BUILDERS = {'Text', 'MarkupText', 'Paragraph', 'MathTex', 'Tex', 'SingleStringMathTex',
+                  'DecimalNumber', 'Integer', 'DashedVMobject', 'SVGMobject', 'ImageMobject'}
+
+# 开销等级阈值（数量 × 相对开销）
+COST_HIGH = 300
+COST_MEDIUM = 100
+COST_LOW = 50
+# 细碎 VGroup 的对象数阈值
+TINY_GROUP_HIGH = 200
+TINY_GROUP_MEDIUM = 50
+# DashedVMobject 的 num_dashes 阈值（manim 默认 15）
+DASHES_HIGH = 100
+DASHES_MEDIUM = 40
+
+COST_LABELS = {'high': '高', 'medium': '中', 'low': '低'}
+
+
+def cost_class(score):
+    """按开销分数定级，低于下限时返回 None（不报告）"""
+    if score >= COST_HIGH:
+        return 'high'
+    if score >= COST_MEDIUM:
+        return 'medium'
+    if score >= COST_LOW:
+        return 'low'
+    return None
+
+
+def _callee(node):
+    """调用的名字：Dot(...) -> 'Dot'，np.linspace(...) -> 'linspace'"""
+    if isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Name):
+            return node.func.id
+        if isinstance(node.func, ast.Attribute):
+            return node.func.attr
+    return None
+
+
+class PerformanceLinter:
+    """
+    渲染性能检查：找出已知会拖慢逐帧渲染的 Manim 写法
+
+    - 循环 / 推导式中逐个创建 Dot、Text 等对象（按循环次数估算数量）
+    - 由大量小点组成的 VGroup（应改为一条 VMobject 曲线）
+    - num_dashes 很大的 DashedVMobject
+    - always_redraw 中每帧重建文字、公式、虚线等重对象
+    - *[FadeOut(mob) for mob in self.mobjects] 逐个对象生成动画
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.findings = []
+        self.methods = {}
+        self._reported = set()
+
+    def add(self, node, rule, cost, message, hint):
+        if cost is None or (node.lineno, rule) in self._reported:
+            return
+        self._reported.add((node.lineno, rule))
+        self.findings.append({'line': node.lineno, 'rule': rule, 'cost': cost,
+                              'message': message, 'hint': hint})
+
+    def discard(self, line, rule):
+        self._reported.add((line, rule))
+        self.findings = [f for f in self.findings if (f['line'], f['rule']) != (line, rule)]
+
+    def run(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.ClassDef):
+                for item in node.body:
+                    if isinstance(item, ast.FunctionDef):
+                        self.methods[item.name] = item
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.FunctionDef):
+                self.scan_function(node)
+        self.findings.sort(key=lambda f: f['line'])
+        return self.findings
+
+    # ---------- 数量估算 ----------
+
+    def number(self, node, scope):
+        """整数常量 / 局部已知数值"""
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.Name):
+            return scope['numbers'].get(node.id)
+        if isinstance(node, ast.BinOp):
+            left, right = self.number(node.left, scope), self.number(node.right, scope)
+            if left is not None and right is not None:
+                try:
+                    return {ast.Add: left + right, ast.Sub: left - right, ast.Mult: left * right,
+                            ast.FloorDiv: left // right if right else None}.get(type(node.op))
+                except TypeError:
+                    return None
+        return None
+
+    def size(self, node, scope):
+        """可迭代对象的元素个数，无法估算时返回 None"""
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            return len(node.elts)
+        if isinstance(node, ast.Dict):
+            return len(node.keys)
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return len(node.value)
+        if isinstance(node, ast.Name):
+            return scope['sizes'].get(node.id)
+        name = _callee(node)
+        if name in ('items', 'keys', 'values') and isinstance(node.func, ast.Attribute):
+            return self.size(node.func.value, scope)
+        if name in ('enumerate', 'reversed', 'list', 'tuple', 'sorted') and node.args:
+            return self.size(node.args[0], scope)
+        if name == 'zip' and node.args:
+            sizes = [self.size(a, scope) for a in node.args]
+            return None if None in sizes else min(sizes)
+        if name == 'range':
+            args = [self.number(a, scope) for a in node.args]
+            if None in args or not args:
+                return None
+            try:
+                return len(range(*[int(a) for a in args]))
+            except (ValueError, TypeError):
+                return None
+        if name in ('linspace', 'arange'):
+            count = node.args[2] if len(node.args) > 2 else None
+            for keyword in node.keywords:
+                if keyword.arg == 'num':
+                    count = keyword.value
+            if name == 'linspace':
+                value = self.number(count, scope) if count is not None else 50
+                return int(value) if value is not None else None
+            args = [self.number(a, scope) for a in node.args]
+            if None in args or not args:
+                return None
+            start, stop, step = (args + [1])[:3] if len(args) > 1 else (0, args[0], 1)
+            return max(0, int((stop - start) / step)) if step else None
+        if isinstance(node, (ast.ListComp, ast.GeneratorExp, ast.SetComp)):
+            return self.comprehension_size(node, scope)
+        return None
+
+    def comprehension_size(self, node, scope):
+        total = 1
+        for generator in node.generators:
+            n = self.size(generator.iter, scope)
+            if n is None:
+                return None
+            total *= n
+        return total
+
+    # ---------- 扫描 ----------
+
+    def scan_function(self, func):
+        scope = {'numbers': {}, 'sizes': {}, 'groups': {}, 'built': {}}
+        defaults = func.args.defaults
+        params = func.args.args[len(func.args.args) - len(defaults):]
+        for param, default in zip(params, defaults):
+            if isinstance(default, ast.Constant) and isinstance(default.value, (int, float)):
+                scope['numbers'][param.arg] = default.value
+        self.scan_block(func.body, scope, 1, False)
+        for name, group in scope['groups'].items():
+            self.report_group(group)
+
+    def scan_block(self, statements, scope, mult, in_loop):
+        for stmt in statements:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if isinstance(stmt, (ast.For, ast.AsyncFor)):
+                self.scan_expr(stmt.iter, scope, mult, in_loop)
+                n = self.size(stmt.iter, scope)
+                self.scan_block(stmt.body, scope, mult * n if mult and n is not None else None, True)
+                self.scan_block(stmt.orelse, scope, mult, in_loop)
+            elif isinstance(stmt, ast.While):
+                self.scan_expr(stmt.test, scope, mult, in_loop)
+                self.scan_block(stmt.body, scope, None, True)
+            elif isinstance(stmt, ast.If):
+                self.scan_expr(stmt.test, scope, mult, in_loop)
+                self.scan_block(stmt.body, scope, mult, in_loop)
+                self.scan_block(stmt.orelse, scope, mult, in_loop)
+            elif isinstance(stmt, (ast.With, ast.Try)):
+                for block in ('body', 'orelse', 'finalbody'):
+                    self.scan_block(getattr(stmt, block, []), scope, mult, in_loop)
+                for handler in getattr(stmt, 'handlers', []):
+                    self.scan_block(handler.body, scope, mult, in_loop)
+            else:
+                if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+                    self.track_assign(stmt.targets[0], stmt.value, scope, in_loop)
+                self.track_growth(stmt, scope, mult)
+                for child in ast.iter_child_nodes(stmt):
+                    self.scan_expr(child, scope, mult, in_loop)
+
+    def track_assign(self, target, value, scope, in_loop):
+        if not isinstance(target, ast.Name):
+            return
+        name = target.id
+        number = self.number(value, scope)
+        if number is not None and not in_loop:
+            scope['numbers'][name] = number
+        if _callee(value) in MOBJECT_WEIGHTS:
+            # 记住变量由哪个构造调用得到（dot = Dot(...); group.add(dot)）
+            scope['built'][name] = value
+        if _callee(value) == 'VGroup' and not in_loop:
+            count = 0
+            tiny = False
+            for arg in value.args:
+                if isinstance(arg, ast.Starred) and isinstance(arg.value, (ast.ListComp, ast.GeneratorExp)):
+                    if _callee(arg.value.elt) in TINY_MOBJECTS:
+                        n = self.comprehension_size(arg.value, scope)
+                        count = None if n is None or count is None else count + n
+                        tiny = True
+                        self.discard(arg.value.elt.lineno, 'loop-mobject')
+            scope['groups'][name] = {'node': value, 'name': name, 'count': count if tiny else 0, 'tiny': tiny}
+        elif isinstance(value, ast.List) and not value.elts:
+            scope['sizes'][name] = 0
+        else:
+            size = self.size(value, scope)
+            if size is not None:
+                scope['sizes'][name] = size
+            else:
+                scope['sizes'].pop(name, None)
+
+    def track_growth(self, stmt, scope, mult):
+        """list.append / VGroup.add 在循环中累计的元素个数"""
+        if not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)
+                and isinstance(stmt.value.func, ast.Attribute)
+                and isinstance(stmt.value.func.value, ast.Name)):
+            return
+        call = stmt.value
+        name = call.func.value.id
+        if call.func.attr == 'append' and name in scope['sizes']:
+            scope['sizes'][name] = scope['sizes'][name] + mult if mult else None
+            if scope['sizes'][name] is None:
+                scope['sizes'].pop(name)
+        elif call.func.attr == 'add' and name in scope['groups']:
+            group = scope['groups'][name]
+            added = call.args[0] if call.args else None
+            if isinstance(added, ast.Name):
+                added = scope['built'].get(added.id)
+            if _callee(added) in TINY_MOBJECTS:
+                group['tiny'] = True
+                group['count'] = group['count'] + mult if mult and group['count'] is not None else None
+                # 归入细碎 VGroup 的发现，不再单独报告逐个创建
+                self.discard(added.lineno, 'loop-mobject')
+
+    def scan_expr(self, node, scope, mult, in_loop):
+        """扫描表达式（推导式按元素个数放大乘数）"""
+        if isinstance(node, ast.Lambda):
+            return
+        if isinstance(node, (ast.ListComp, ast.GeneratorExp, ast.SetComp, ast.DictComp)):
+            n = self.comprehension_size(node, scope)
+            inner = mult * n if mult and n is not None else None
+            for generator in node.generators:
+                self.scan_expr(generator.iter, scope, mult, in_loop)
+            elts = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+            for elt in elts:
+                self.scan_expr(elt, scope, inner, True)
+            return
+        if isinstance(node, ast.Call):
+            self.check_call(node, scope, mult, in_loop)
+        for child in ast.iter_child_nodes(node):
+            self.scan_expr(child, scope, mult, in_loop)
+
+    def check_call(self, node, scope, mult, in_loop):
+        name = _callee(node)
+
+        if name in MOBJECT_WEIGHTS and in_loop and (node.lineno, 'loop-mobject') not in self._reported:
+            weight = MOBJECT_WEIGHTS[name]
+            if mult is not None:
+                cost = cost_class(mult * weight)
+                amount = f"约 {mult} 个"
+            else:
+                # 次数未知：只提示文字/公式这类单个就很重的对象
+                cost = 'low' if weight >= 10 else None
+                amount = "数量未知"
+            hint = ("文字改为循环外创建一次、循环内 copy()，或合并成一个 Text / VGroup 整体排版"
+                    if weight >= 10 else "合并为一个对象（如 VMobject 曲线、PMobject 点云）或减少数量")
+            self.add(node, 'loop-mobject', cost, f"循环中逐个创建 {name}（{amount}）", hint)
+
+        if name == 'DashedVMobject':
+            dashes = 15
+            for keyword in node.keywords:
+                if keyword.arg == 'num_dashes':
+                    dashes = self.number(keyword.value, scope)
+            if len(node.args) > 1:
+                dashes = self.number(node.args[1], scope)
+            if dashes is not None:
+                total = dashes * (mult or 1)
+                cost = 'high' if total >= DASHES_HIGH else 'medium' if total >= DASHES_MEDIUM else None
+                self.add(node, 'dashes', cost, f"DashedVMobject 共 {total} 段虚线，每段都是独立子对象",
+                         "减小 num_dashes（默认 15），或用 DashedLine / 低透明度实线代替")
+
+        if name == 'always_redraw' and node.args:
+            heavy = self.heavy_builder(node.args[0])
+            if heavy:
+                self.add(node, 'always-redraw', 'high',
+                         f"always_redraw 每帧重建 {heavy}",
+                         "改用 add_updater 只更新位置/数值（如 DecimalNumber.set_value），重对象在外部创建一次")
+
+        for arg in node.args:
+            if (isinstance(arg, ast.Starred) and isinstance(arg.value, (ast.ListComp, ast.GeneratorExp))
+                    and _callee(arg.value.elt) in ('FadeOut', 'FadeIn', 'Uncreate')
+                    and any(isinstance(g.iter, ast.Attribute) and g.iter.attr == 'mobjects'
+                            for g in arg.value.generators)):
+                self.add(arg, 'fade-all', 'low',
+                         f"对 self.mobjects 逐个生成 {_callee(arg.value.elt)} 动画，每帧逐个插值",
+                         f"{_callee(arg.value.elt)}(Group(*self.mobjects)) 作为一个动画")
+
+    def heavy_builder(self, builder):
+        """always_redraw 的构造函数中重建的重对象名，轻量时返回 None"""
+        if isinstance(builder, ast.Lambda):
+            body = builder.body
+        elif isinstance(builder, ast.Attribute) and builder.attr in self.methods:
+            body = self.methods[builder.attr]
+        elif isinstance(builder, ast.Name):
+            body = next((n for n in ast.walk(self.tree)
+                         if isinstance(n, ast.FunctionDef) and n.name == builder.id), None)
+        else:
+            body = None
+        if body is None:
+            return None
+        for sub in ast.walk(body):
+            name = _callee(sub)
+            if name in HEAVY_BUILDERS:
+                return name
+            if isinstance(sub, (ast.ListComp, ast.GeneratorExp, ast.For)):
+                return "循环生成的多个对象"
+            if (isinstance(sub, ast.Call) and isinstance(sub.func, ast.Attribute)
+                    and isinstance(sub.func.value, ast.Name) and sub.func.value.id == 'self'
+                    and sub.func.attr in self.methods and sub.func.attr != getattr(body, 'name', None)):
+                inner = self.heavy_builder(sub.func)
+                if inner:
+                    return inner
+        return None
+
+    def report_group(self, group):
+        if not group['tiny']:
+            return
+        count = group['count']
+        if count is None:
+            cost, amount = 'medium', "数量未知"
+        else:
+            cost = 'high' if count >= TINY_GROUP_HIGH else 'medium' if count >= TINY_GROUP_MEDIUM else None
+            amount = f"约 {count} 个"
+        self.add(group['node'], 'tiny-vgroup', cost,
+                 f"VGroup {group['name']} 由大量小点组成（{amount}），每帧逐个描边填充",
+                 "用一条曲线代替：VMobject().set_points_smoothly(points) 或 ParametricFunction")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列出已知会拖慢逐帧渲染的 Manim 写法')
+    parser.add_argument('script', help='Manim 脚本')
+    args = parser.parse_args()
+
+    try:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    findings = PerformanceLinter(tree).run()
+    if not findings:
+        print("未发现已知的渲染性能问题")
+        return
+    for f in findings:
+        print(f"行 {f['line']} [{COST_LABELS[f['cost']]}] {f['message']}")
+        print(f"    建议: {f['hint']}")
+
+
+if __name__ == '__main__':
+    main()
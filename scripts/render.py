@@ -2,6 +2,7 @@
 """
 Manim 教学视频渲染脚本
 完整流程: 检查代码 -> 渲染视频
+试运行: 检查代码 -> 执行 construct() 但不渲染帧，输出每幕时间轴（见 dry_run.py）
 
 使用方法:
     python scripts/render.py [options]
@@ -12,13 +13,20 @@ Manim 教学视频渲染脚本
     -q, --quality   渲染质量: l(ow)/m(edium)/h(igh)/k(4k) (默认: high)
     -p, --preview   渲染后预览 (默认: 开启)
     --no-check      跳过代码检查 (不推荐)
+    --dry-run       只试运行，不渲染：输出每幕精确时间轴，assert 失败或音画不同步时返回非零
+    -j, --jobs      按幕并行渲染的进程数，流复制拼接 (默认: 1，串行；见 parallel_render.py)
+    --incremental   按幕分段渲染，未变化的幕复用上次的分段视频 (-j 大于 1 时总是如此；见 render_cache.py)
 
 示例:
     python scripts/render.py                    # 默认渲染 script.py
     python scripts/render.py -f my_script.py    # 渲染指定文件
     python scripts/render.py -q k               # 4K质量渲染
+    python scripts/render.py --dry-run          # 试运行，几秒内得到每幕时间轴
+    python scripts/render.py -j 32              # 32 个进程按幕并行渲染
+    python scripts/render.py --incremental      # 只重新渲染改动过的幕
 """
 
+import os
 import subprocess
 import sys
 import argparse
@@ -39,17 +47,33 @@ class RenderPipeline:
         '4k': '2160p60',
     }
 
+    # 分辨率 -> manim 的 -q 参数
+    QUALITY_FLAGS = {
+        '480p15': 'l',
+        '720p30': 'm',
+        '1080p60': 'h',
+        '2160p60': 'k',
+    }
+
     def __init__(self, script_file='script.py', scene_name='MathScene',
-                 quality='high', preview=True, skip_check=False):
+                 quality='high', preview=True, skip_check=False, dry_run=False,
+                 jobs=1, incremental=False):
         self.script_file = Path(script_file)
         self.scene_name = scene_name
         self.quality = self.QUALITY_MAP.get(quality, '1080p60')
         self.preview = preview
         self.skip_check = skip_check
+        self.dry_run = dry_run
+        self.jobs = max(1, jobs)
+        self.incremental = incremental or self.jobs > 1
 
         # 检查脚本路径
         self.script_dir = Path(__file__).parent.parent
         self.check_script = self.script_dir / 'scripts' / 'check.py'
+        self.dry_run_script = self.script_dir / 'scripts' / 'dry_run.py'
+        self.parallel_script = self.script_dir / 'scripts' / 'parallel_render.py'
+        self.timeline_file = self.script_dir / 'media' / 'dry_run' / f'{self.scene_name}.json'
+        self.steps = 2
 
     def run_check(self):
         """第一步: 运行代码检查"""
@@ -57,7 +81,7 @@ class RenderPipeline:
             print("⚠️  跳过代码检查 (不推荐)")
             return True
 
-        print("🔍 步骤 1/2: 代码结构检查")
+        print(f"🔍 步骤 1/{self.steps}: 代码结构检查")
         print("=" * 50)
 
         if not self.check_script.exists():
@@ -77,7 +101,7 @@ class RenderPipeline:
 
     def run_render(self):
         """第二步: 运行 Manim 渲染"""
-        print("\n🎬 步骤 2/2: 渲染视频")
+        print(f"\n🎬 步骤 2/{self.steps}: 渲染视频")
         print("=" * 50)
 
         if not self.script_file.exists():
@@ -88,7 +112,7 @@ class RenderPipeline:
         cmd = ['manim']
 
         # 质量参数
-        cmd.extend(['-q', self.quality[0]])  # l/m/h/k
+        cmd.extend(['-q', self.QUALITY_FLAGS[self.quality]])  # l/m/h/k
 
         # 预览参数
         if self.preview:
@@ -110,8 +134,52 @@ class RenderPipeline:
             print(f"❌ 渲染失败: {e}")
             return False
 
+    def run_render_parallel(self):
+        """第二步（分段）: 按幕并行渲染，复用未变化的幕，流复制拼接"""
+        print(f"\n🎬 步骤 2/{self.steps}: 按幕分段渲染（{self.jobs} 个进程）")
+        print("=" * 50)
+
+        if not self.script_file.exists():
+            print(f"❌ 脚本文件不存在: {self.script_file}")
+            return False
+
+        cmd = [
+            sys.executable, str(self.parallel_script), str(self.script_file),
+            '-s', self.scene_name,
+            '-q', self.QUALITY_FLAGS[self.quality],
+            '-j', str(self.jobs),
+        ]
+        try:
+            result = subprocess.run(cmd, cwd=self.script_dir)
+            return result.returncode == 0
+        except Exception as e:
+            print(f"❌ 渲染失败: {e}")
+            return False
+
+    def run_dry_run(self):
+        """试运行: 执行 construct() 但不渲染帧，输出每幕时间轴"""
+        print(f"\n🧪 步骤 2/{self.steps}: 试运行（不渲染帧）")
+        print("=" * 50)
+
+        if not self.script_file.exists():
+            print(f"❌ 脚本文件不存在: {self.script_file}")
+            return False
+
+        cmd = [
+            sys.executable, str(self.dry_run_script), str(self.script_file),
+            '-s', self.scene_name,
+            '-q', self.QUALITY_FLAGS[self.quality],
+            '-o', str(self.timeline_file),
+        ]
+        try:
+            result = subprocess.run(cmd, cwd=self.script_dir)
+            return result.returncode == 0
+        except Exception as e:
+            print(f"❌ 试运行失败: {e}")
+            return False
+
     def copy_to_root(self):
-        """第三步: 拷贝视频到根目录"""
+        """第三步: 拷贝视频到根目录，返回拷贝后的路径（未找到或失败时为 None）"""
         print("\n📁 拷贝视频到根目录")
         print("=" * 50)
 
@@ -120,7 +188,7 @@ class RenderPipeline:
 
         if not media_dir.exists():
             print(f"⚠️  媒体目录不存在: {media_dir}")
-            return
+            return None
 
         # 按分辨率优先级查找
         possible_paths = [
@@ -144,10 +212,24 @@ class RenderPipeline:
                 shutil.copy2(video_src, video_dst)
                 print(f"✅ 视频已拷贝: {video_dst}")
                 print(f"   源文件: {video_src}")
+                return video_dst
             except Exception as e:
                 print(f"⚠️  拷贝失败: {e}")
         else:
             print("⚠️  未找到生成的视频文件")
+        return None
+
+    def open_preview(self, video):
+        """用系统默认播放器打开视频（分段模式下替代 manim -p）"""
+        try:
+            if sys.platform == 'win32':
+                os.startfile(video)
+            elif sys.platform == 'darwin':
+                subprocess.Popen(['open', str(video)])
+            else:
+                subprocess.Popen(['xdg-open', str(video)])
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  无法打开预览: {e}")
 
     def run(self):
         """运行完整流程"""
@@ -157,6 +239,10 @@ class RenderPipeline:
         print(f"脚本文件: {self.script_file}")
         print(f"场景类名: {self.scene_name}")
         print(f"渲染质量: {self.quality}")
+        if self.incremental and not self.dry_run:
+            print(f"分段渲染: {self.jobs} 个进程，复用未变化的幕")
+        if self.dry_run:
+            print("模式: 试运行（不渲染）")
         print("=" * 50 + "\n")
 
         # 步骤1: 检查
@@ -165,13 +251,31 @@ class RenderPipeline:
             print("   请修复错误后重试，或使用 --no-check 跳过检查（不推荐）")
             return False
 
-        # 步骤2: 渲染
-        if not self.run_render():
+        # 试运行: 只执行 construct，不渲染
+        if self.dry_run:
+            if not self.run_dry_run():
+                print("\n⛔ 试运行未通过（construct 异常或音画不同步），详见上方输出。")
+                return False
+            print("\n" + "=" * 50)
+            print(f"✅ 试运行通过，时间轴: {self.timeline_file}")
+            print("=" * 50)
+            return True
+
+        # 步骤2: 渲染（分段模式下按幕并行并复用缓存）
+        rendered = self.run_render_parallel() if self.incremental else self.run_render()
+        if not rendered:
             print("\n⛔ 渲染失败。")
             return False
 
         # 步骤3: 拷贝
-        self.copy_to_root()
+        video = self.copy_to_root()
+
+        # 分段模式不经过 manim -p，拼接完成后在这里打开成片
+        if self.incremental and self.preview:
+            if video is not None:
+                self.open_preview(video)
+            else:
+                print("⚠️  未找到成片，跳过预览")
 
         print("\n" + "=" * 50)
         print("✅ 渲染完成！")
@@ -192,6 +296,9 @@ def main():
     python scripts/render.py -s MyScene         # 指定场景类名
     python scripts/render.py -q k               # 4K质量渲染
     python scripts/render.py --no-check         # 跳过检查（不推荐）
+    python scripts/render.py --dry-run          # 试运行：不渲染帧，输出每幕时间轴
+    python scripts/render.py -j 32              # 按幕并行渲染（32 个进程）
+    python scripts/render.py --incremental      # 只重新渲染改动过的幕
         '''
     )
 
@@ -233,6 +340,25 @@ def main():
         help='跳过代码检查 (不推荐)'
     )
 
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='只试运行 construct()（不渲染帧），输出每幕时间轴到 media/dry_run/'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='按幕并行渲染的 manim 进程数，分段流复制拼接 (默认: 1，串行)'
+    )
+
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='按幕分段渲染，未变化的幕复用 media/render_cache 中的分段 (-j 大于 1 时总是开启)'
+    )
+
     args = parser.parse_args()
 
     # 处理 --no-preview
@@ -244,7 +370,10 @@ def main():
         scene_name=args.scene,
         quality=args.quality,
         preview=preview,
-        skip_check=args.no_check
+        skip_check=args.no_check,
+        dry_run=args.dry_run,
+        jobs=args.jobs,
+        incremental=args.incremental
     )
 
     # 运行
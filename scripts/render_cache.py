@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+分段渲染缓存：只重新渲染变化的幕
+
+背景：
+    改了某一幕的一行代码，整部视频的每一幕都要按最终质量重新渲染。
+
+功能：
+- 为每一幕计算指纹，包含：
+  - 代码：该幕的 play_scene_N 方法（或 construct 中该幕的段落）及其调用的本类方法、模块函数
+    （按调用关系传递展开），加上模块 / 类级别的常量、construct 中的公共部分及其调用的辅助方法
+    （同样传递展开，如 define_elements）；
+    按 AST 规范化后计算，只改注释或空行不会失效
+  - calculate_geometry() 的返回值摘要（试运行时计算）
+  - 该幕入口状态摘要：第一个动画开始前场上对象的点集与颜色（前面各幕的改动会经此传递）
+  - 该幕每次 play / wait 的动画类型与帧对齐后的时长、音频时长
+  - 渲染配置：质量、帧率、分辨率、背景色、manim 版本
+- 没有分幕结构（无 play_scene_N 方法、无「第N幕」注释）或不属于任何一幕的分段，
+  代码部分取整个脚本的指纹：任何代码改动都会重新渲染
+- 指纹相同的分段直接复用上次编码的视频，只渲染变化的幕，再流复制拼接（见 parallel_render.py）
+- 缓存放在运行目录的 media/render_cache/（分段视频只对本项目有用），按最近使用时间淘汰
+
+使用：
+    from render_cache import SegmentCache, segment_keys
+
+    keys = segment_keys(source, timeline, segments, quality)
+    cache = SegmentCache(SegmentCache.default_dir())
+    if not cache.fetch(keys[0], dest):
+        ...渲染...
+        cache.store(keys[0], dest)
+    cache.prune()
+
+命令行（列出各幕指纹，便于排查为什么某一幕没有命中）：
+    python render_cache.py script.py -s MathScene
+"""
+
+import os
+import ast
+import json
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+
+from scene_timing import find_sections, scene_of_method
+
+
+# 缓存上限（MB），超出时按最近使用时间淘汰
+DEFAULT_RENDER_CACHE_MB = 4096
+
+# 指纹格式版本：指纹组成变化时递增，使旧缓存全部失效
+FINGERPRINT_VERSION = 3
+
+
+def _digest(parts):
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _called_names(nodes, methods, functions):
+    """语句中调用的本类方法（self.xxx(...)）与模块函数名"""
+    found = set()
+    for node in nodes:
+        for sub in ast.walk(node):
+            if not isinstance(sub, ast.Call):
+                continue
+            func = sub.func
+            if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+                    and func.value.id == 'self' and func.attr in methods):
+                found.add(('method', func.attr))
+            elif isinstance(func, ast.Name) and func.id in functions:
+                found.add(('function', func.id))
+    return found
+
+
+def _helpers(nodes, methods, functions):
+    """传递展开的辅助方法 / 函数：{('method' | 'function', 名称): 节点}，不含其他幕的方法"""
+    result = {}
+    pending = _called_names(nodes, methods, functions)
+    while pending:
+        kind, name = pending.pop()
+        if (kind, name) in result or (kind == 'method' and scene_of_method(name) is not None):
+            continue
+        node = methods[name] if kind == 'method' else functions[name]
+        result[(kind, name)] = node
+        pending |= _called_names([node], methods, functions)
+    return result
+
+
+def code_fingerprints(source, class_name):
+    """
+    各幕代码指纹
+
+    返回:
+        {幕号: sha256}；无法识别分幕结构时返回 {}（由 module_fingerprint() 兜底）
+    """
+    tree = ast.parse(source)
+    functions = {n.name: n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    classes = {n.name: n for n in tree.body if isinstance(n, ast.ClassDef)}
+    if class_name not in classes:
+        return {}
+
+    # 本类及同文件中的基类的方法（子类覆盖基类）
+    methods, class_level = {}, []
+    chain, cls = [], classes[class_name]
+    while cls is not None and cls not in chain:
+        chain.append(cls)
+        bases = [b.id for b in cls.bases if isinstance(b, ast.Name) and b.id in classes]
+        cls = classes[bases[0]] if bases else None
+    for cls in reversed(chain):
+        for item in cls.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods[item.name] = item
+            else:
+                class_level.append(item)
+
+    shared = [ast.unparse(n) for n in tree.body if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef,
+                                                                      ast.ClassDef))]
+    shared += [ast.unparse(n) for n in class_level]
+
+    units, common = {}, []
+    for name, method in methods.items():
+        scene = scene_of_method(name)
+        if scene is not None:
+            units.setdefault(scene, []).append(method)
+    construct = methods.get('construct')
+    if units:
+        if construct is not None:
+            common.append(construct)
+    elif construct is not None:
+        # 按「第N幕」注释划分的段落；第一个标记之前的语句属于公共部分
+        sections = find_sections(construct, source)
+        for stmt in construct.body:
+            current = None
+            for line, scene in sections:
+                if line <= stmt.lineno:
+                    current = scene
+            if current is None:
+                common.append(stmt)
+            else:
+                units.setdefault(current, []).append(stmt)
+    # 公共部分调用的辅助方法（如 construct 中的 define_elements）同样影响每一幕
+    shared += [ast.unparse(n) for n in common]
+    shared += [f"{kind}:{name}:{ast.unparse(node)}"
+               for (kind, name), node in sorted(_helpers(common, methods, functions).items())]
+
+    fingerprints = {}
+    for scene, nodes in units.items():
+        helpers = _helpers(nodes, methods, functions)
+        fingerprints[scene] = _digest({
+            'shared': shared,
+            'scene': [ast.unparse(n) for n in nodes],
+            'helpers': {f"{kind}:{name}": ast.unparse(node) for (kind, name), node in sorted(helpers.items())},
+        })
+    return fingerprints
+
+
+def module_fingerprint(source):
+    """整个脚本（模块与全部类）的代码指纹：没有分幕指纹的分段用它，任何代码改动都会失效"""
+    return _digest({'module': ast.unparse(ast.parse(source))})
+
+
+def segment_keys(source, timeline, segments, quality):
+    """
+    各分段的缓存键
+
+    参数:
+        timeline: dry_run() 的返回值
+        segments: parallel_render.plan_segments() 的返回值
+
+    返回:
+        [sha256, ...]，与 segments 一一对应
+    """
+    code = code_fingerprints(source, timeline['scene_class'])
+    whole = module_fingerprint(source)
+    plays = [e for e in timeline['events'] if e['type'] in ('play', 'wait')]
+    audio = {s['scene']: s['audio'] for s in timeline['scenes']}
+
+    keys = []
+    for segment in segments:
+        # 从所在幕的入口开始（按帧切开的长动画、幕中间开始的分段都取该幕入口状态及之前的动画）
+        entry = segment['first']
+        while entry > 0 and 'state' not in plays[entry]:
+            entry -= 1
+        events = plays[entry:segment['last'] + 1]
+        sounds = [e for e in timeline['events']
+                  if e['type'] == 'sound' and segment['start'] <= e['start'] < segment['end']]
+        keys.append(_digest({
+            'version': FINGERPRINT_VERSION,
+            'code': code.get(segment['scene']) or whole,
+            'geometry': timeline.get('geometry'),
+            'entry_state': events[0].get('state'),
+            'frames': segment.get('frames'),
+            'hold': segment.get('hold'),
+            'events': [[e['type'], e['animations'], e['duration']] for e in events],
+            'audio': audio.get(segment['scene']),
+            'sounds': [[os.path.basename(e['file']), round(e['start'] - segment['start'], 3), e['duration']]
+                       for e in sounds],
+            'config': dict(timeline.get('config') or {}, quality=quality, frame_rate=timeline['frame_rate']),
+        }))
+    return keys
+
+
+class SegmentCache:
+    """分段视频缓存：<cache_dir>/ab/<键>.mp4，以 mtime 作为最近使用时间"""
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_RENDER_CACHE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def default_dir():
+        """项目缓存目录：运行目录下的 media/render_cache"""
+        return Path('media') / 'render_cache'
+
+    def _blob_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.mp4"
+
+    def fetch(self, key, dest):
+        """命中时把缓存视频落地到 dest（硬链接，失败则复制）并返回 True"""
+        blob = self._blob_path(key)
+        if not blob.is_file():
+            self.misses += 1
+            return False
+        if os.path.lexists(dest):
+            os.remove(dest)
+        try:
+            os.link(blob, dest)
+        except OSError:
+            shutil.copyfile(blob, dest)
+        os.utime(blob)
+        self.hits += 1
+        return True
+
+    def store(self, key, src):
+        """存入缓存（复制，临时文件 + rename）"""
+        blob = self._blob_path(key)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(blob.name + '.tmp')
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, blob)
+
+    def prune(self):
+        """超过上限时按 mtime 从旧到新删除，返回删除的文件数"""
+        files = []
+        for path in self.cache_dir.glob('*/*.mp4'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def summary(self):
+        """命中统计文本"""
+        return f"分段缓存命中 {self.hits}，未命中 {self.misses}（{self.cache_dir}）"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列出各幕的代码指纹（分段渲染缓存）')
+    parser.add_argument('script', help='Manim 脚本')
+    parser.add_argument('-s', '--scene', default='MathScene', help='场景类名（默认：MathScene）')
+    args = parser.parse_args()
+
+    with open(args.script, 'r', encoding='utf-8') as f:
+        source = f.read()
+    fingerprints = code_fingerprints(source, args.scene)
+    if not fingerprints:
+        print(f"未识别出 {args.scene} 的分幕结构，按整个脚本计算指纹: {module_fingerprint(source)[:16]}")
+        return
+    for scene in sorted(fingerprints):
+        print(f"第{scene}幕: {fingerprints[scene][:16]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,667 @@
+#!/usr/bin/env python3
+"""
+静态估算每幕动画时长（不导入 manim、不执行脚本）
+
+功能：
+- 在 AST 上逐语句解释 play_scene_* 方法（或 construct 中按「第N幕」注释划分的段落）：
+  累加 self.play(...) 的 run_time 与 self.wait(...) 的时长
+- 时长表达式做常量求值：字面量、局部变量、类/模块常量、四则运算、max/min 等；
+  读取音频时长的写法（get_scene_duration / add_scene_audio / AUDIO_TIMINGS.get(...)）
+  代入该幕的实际音频时长，因此 self.wait(duration - 4) 也能算出来
+- 同类中的辅助方法（wait_for_audio、show_subtitle_with_audio 等）按实参展开后计入
+- if 条件可求值时只走对应分支；for 循环遍历字面量列表 / range 时按次数展开
+- 求不出的时长记为「未知」并给出行号，不猜测
+- 与 audio/audio_info.json 或 timeline.json 中的音频时长比较，给出每幕的差值
+
+使用：
+    from scene_timing import estimate_file, load_audio_durations
+
+    audio = load_audio_durations('audio')
+    for scene in estimate_file('script.py', audio):
+        scene['scene'], scene['total'], scene['unknown'], scene['audio']
+
+命令行：
+    python scene_timing.py script.py [--audio-dir audio]
+"""
+
+import os
+import re
+import ast
+import sys
+import json
+import argparse
+from pathlib import Path
+
+from storyboard import chinese_number
+
+
+# manim 默认值：play() 中动画的 run_time、wait() 的时长、LaggedStart 的 lag_ratio
+DEFAULT_RUN_TIME = 1.0
+DEFAULT_WAIT_TIME = 1.0
+DEFAULT_LAG_RATIO = 0.05
+
+# 读取当前幕音频时长的方法名（返回该幕音频时长）
+AUDIO_METHODS = {'get_scene_duration', 'add_scene_audio', 'get_audio_duration'}
+# 名称中含这些词的字典视为「幕 -> 音频时长」表（AUDIO_TIMINGS.get(...) / self.audio_timings[...]）
+AUDIO_TABLE_HINTS = ('timing', 'durations')
+
+# 单个循环最多展开的次数，超过时按未知处理
+MAX_LOOP_ITERATIONS = 1000
+# 辅助方法最大展开深度
+MAX_INLINE_DEPTH = 8
+
+# construct 中的幕标记注释：# ========== 第一幕：开场 ==========
+_SECTION_COMMENT = re.compile(r'#.*?第\s*([零〇一二两三四五六七八九十百千\d]+)\s*幕')
+_PLAY_SCENE = re.compile(r'^play_scene_(\d+)')
+
+
+class _Unknown:
+    """无法静态求值"""
+
+    def __repr__(self):
+        return 'UNKNOWN'
+
+
+UNKNOWN = _Unknown()
+
+
+class _Return(Exception):
+    """辅助方法中的 return"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Timer:
+    """一幕的计时：已知总时长 + 未知时长的位置"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.unknown = []
+
+    def add(self, seconds, node, source):
+        if seconds is UNKNOWN or not isinstance(seconds, (int, float)):
+            self.unknown.append((node.lineno, _snippet(node, source)))
+        elif seconds > 0:
+            self.total += seconds
+
+    def fork(self):
+        return Timer()
+
+
+def _snippet(node, source):
+    text = ast.get_source_segment(source, node) or ast.unparse(node)
+    text = ' '.join(text.split())
+    return text if len(text) <= 60 else text[:57] + '...'
+
+
+def _is_self_call(node, names=None):
+    """self.xxx(...) 调用（names 给出时限定方法名）"""
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == 'self'
+            and (names is None or node.func.attr in names))
+
+
+def _call_name(node):
+    """调用的函数名（Foo(...) / obj.foo(...) -> 'Foo' / 'foo'）"""
+    if not isinstance(node, ast.Call):
+        return None
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _names_of(node):
+    """表达式中出现的名字（含 self.xxx 的 xxx）"""
+    names = set()
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Name):
+            names.add(sub.id)
+        elif isinstance(sub, ast.Attribute):
+            names.add(sub.attr)
+    return names
+
+
+def _is_audio_table(node):
+    return any(hint in name.lower() for name in _names_of(node) for hint in AUDIO_TABLE_HINTS)
+
+
+def _assigned_names(statements):
+    names = set()
+    for stmt in statements:
+        for sub in ast.walk(stmt):
+            if isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Store):
+                names.add(sub.id)
+    return names
+
+
+def _constants(body):
+    """模块 / 类体中的常量赋值（NAME = 字面量）"""
+    values = {}
+    for stmt in body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            try:
+                values[stmt.targets[0].id] = ast.literal_eval(stmt.value)
+            except (ValueError, SyntaxError, TypeError):
+                continue
+    return values
+
+
+_BINOPS = {
+    ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b, ast.FloorDiv: lambda a, b: a // b, ast.Mod: lambda a, b: a % b,
+    ast.Pow: lambda a, b: a ** b,
+}
+_COMPARES = {
+    ast.Lt: lambda a, b: a < b, ast.LtE: lambda a, b: a <= b, ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b, ast.Eq: lambda a, b: a == b, ast.NotEq: lambda a, b: a != b,
+    ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b,
+}
+_BUILTINS = {
+    'max': max, 'min': min, 'abs': abs, 'round': round, 'float': float, 'int': int,
+    'len': len, 'sum': sum, 'list': list, 'tuple': tuple,
+}
+
+
+class SceneInterpreter:
+    """在一个场景类的 AST 上估算时长"""
+
+    def __init__(self, class_node, source, module_constants, audio):
+        self.source = source
+        self.audio = audio
+        self.methods = {n.name: n for n in class_node.body if isinstance(n, ast.FunctionDef)}
+        self.constants = dict(module_constants)
+        self.constants.update(_constants(class_node.body))
+        self.scene = None
+        self.depth = 0
+
+    # ---------- 表达式 ----------
+
+    def audio_duration(self):
+        if self.scene is None:
+            return UNKNOWN
+        return self.audio.get(self.scene, UNKNOWN)
+
+    def evaluate(self, node, env, timer):
+        try:
+            return self._evaluate(node, env, timer)
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError, KeyError, IndexError,
+                AttributeError, RecursionError):
+            return UNKNOWN
+
+    def _evaluate(self, node, env, timer):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id in env:
+                return env[node.id]
+            return self.constants.get(node.id, UNKNOWN)
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name) and node.value.id == 'self':
+                return self.constants.get(node.attr, UNKNOWN)
+            return UNKNOWN
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            items = [self.evaluate(e, env, timer) for e in node.elts]
+            return UNKNOWN if any(i is UNKNOWN for i in items) else list(items)
+        if isinstance(node, ast.BinOp):
+            left = self.evaluate(node.left, env, timer)
+            right = self.evaluate(node.right, env, timer)
+            if left is UNKNOWN or right is UNKNOWN or type(node.op) not in _BINOPS:
+                return UNKNOWN
+            return _BINOPS[type(node.op)](left, right)
+        if isinstance(node, ast.UnaryOp):
+            value = self.evaluate(node.operand, env, timer)
+            if value is UNKNOWN:
+                return UNKNOWN
+            if isinstance(node.op, ast.USub):
+                return -value
+            if isinstance(node.op, ast.UAdd):
+                return +value
+            if isinstance(node.op, ast.Not):
+                return not value
+            return UNKNOWN
+        if isinstance(node, ast.Compare):
+            left = self.evaluate(node.left, env, timer)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self.evaluate(comparator, env, timer)
+                if left is UNKNOWN or right is UNKNOWN or type(op) not in _COMPARES:
+                    return UNKNOWN
+                if not _COMPARES[type(op)](left, right):
+                    return False
+                left = right
+            return True
+        if isinstance(node, ast.BoolOp):
+            values = [self.evaluate(v, env, timer) for v in node.values]
+            if any(v is UNKNOWN for v in values):
+                return UNKNOWN
+            return all(values) if isinstance(node.op, ast.And) else any(values)
+        if isinstance(node, ast.IfExp):
+            test = self.evaluate(node.test, env, timer)
+            if test is UNKNOWN:
+                return UNKNOWN
+            return self.evaluate(node.body if test else node.orelse, env, timer)
+        if isinstance(node, ast.Subscript):
+            if _is_audio_table(node.value):
+                return self.audio_duration()
+            container = self.evaluate(node.value, env, timer)
+            index = self.evaluate(node.slice, env, timer)
+            if container is UNKNOWN or index is UNKNOWN:
+                return UNKNOWN
+            return container[index]
+        if isinstance(node, ast.Call):
+            return self.evaluate_call(node, env, timer)
+        return UNKNOWN
+
+    def evaluate_call(self, node, env, timer):
+        name = _call_name(node)
+        # 读取当前幕音频时长
+        if _is_self_call(node, AUDIO_METHODS):
+            return self.audio_duration()
+        if (name == 'get' and isinstance(node.func, ast.Attribute)
+                and _is_audio_table(node.func.value)):
+            return self.audio_duration()
+        # 本类中的辅助方法：展开执行（计时计入当前幕）
+        if _is_self_call(node) and name in self.methods:
+            return self.inline(self.methods[name], node, env, timer)
+        if isinstance(node.func, ast.Name) and name == 'range':
+            args = [self.evaluate(a, env, timer) for a in node.args]
+            if any(a is UNKNOWN for a in args) or len(range(*args)) > MAX_LOOP_ITERATIONS:
+                return UNKNOWN
+            return list(range(*args))
+        if isinstance(node.func, ast.Name) and name in _BUILTINS and not node.keywords:
+            args = [self.evaluate(a, env, timer) for a in node.args]
+            if any(a is UNKNOWN for a in args):
+                return UNKNOWN
+            return _BUILTINS[name](*args)
+        return UNKNOWN
+
+    def bind(self, method, call, env, timer):
+        """把调用的实参绑定到方法形参，返回方法体的初始环境"""
+        params = method.args.args[1:]  # 去掉 self
+        defaults = method.args.defaults
+        bound = {}
+        for param, default in zip(params[len(params) - len(defaults):], defaults):
+            bound[param.arg] = self.evaluate(default, {}, timer)
+        for param, default in zip(method.args.kwonlyargs, method.args.kw_defaults):
+            bound[param.arg] = self.evaluate(default, {}, timer) if default is not None else UNKNOWN
+        for param, arg in zip(params, call.args):
+            bound[param.arg] = UNKNOWN if isinstance(arg, ast.Starred) else self.evaluate(arg, env, timer)
+        for keyword in call.keywords:
+            if keyword.arg is not None:
+                bound[keyword.arg] = self.evaluate(keyword.value, env, timer)
+        for param in params + method.args.kwonlyargs:
+            bound.setdefault(param.arg, UNKNOWN)
+        return bound
+
+    def inline(self, method, call, env, timer):
+        """展开执行辅助方法，返回其返回值"""
+        if self.depth >= MAX_INLINE_DEPTH:
+            timer.add(UNKNOWN, call, self.source)
+            return UNKNOWN
+        self.depth += 1
+        try:
+            self.execute(method.body, self.bind(method, call, env, timer), timer)
+        except _Return as r:
+            return r.value
+        finally:
+            self.depth -= 1
+        return None
+
+    # ---------- 动画时长 ----------
+
+    def animation_time(self, node, env, timer):
+        """play() 的一个参数（动画）的时长"""
+        if isinstance(node, ast.Starred):
+            value = node.value
+            if isinstance(value, (ast.ListComp, ast.GeneratorExp)):
+                return self.animation_time(value.elt, env, timer)
+            if isinstance(value, (ast.List, ast.Tuple)):
+                times = [self.animation_time(e, env, timer) for e in value.elts]
+                return UNKNOWN if UNKNOWN in times else max(times, default=0.0)
+            return UNKNOWN
+        if not isinstance(node, ast.Call):
+            # mob.animate.xxx()、变量中的动画等：按默认时长
+            return DEFAULT_RUN_TIME
+        for keyword in node.keywords:
+            if keyword.arg == 'run_time':
+                return self.evaluate(keyword.value, env, timer)
+
+        name = _call_name(node)
+        if _is_self_call(node) and name in self.methods:
+            # 返回动画的辅助方法（如 self.fade_in(mob, run_time=0.5)）：对 return 表达式求时长
+            method = self.methods[name]
+            returns = [s for s in method.body if isinstance(s, ast.Return) and s.value is not None]
+            if len(returns) == 1:
+                return self.animation_time(returns[0].value, self.bind(method, node, env, timer), timer)
+            return UNKNOWN
+        if name == 'Wait':
+            return self.evaluate(node.args[0], env, timer) if node.args else DEFAULT_WAIT_TIME
+        if name in ('Succession', 'AnimationGroup', 'LaggedStart'):
+            if any(isinstance(a, ast.Starred) and not isinstance(a.value, (ast.List, ast.Tuple))
+                   for a in node.args):
+                return UNKNOWN
+            children = []
+            for arg in node.args:
+                if isinstance(arg, ast.Starred):
+                    children += [self.animation_time(e, env, timer) for e in arg.value.elts]
+                else:
+                    children.append(self.animation_time(arg, env, timer))
+            if UNKNOWN in children or not children:
+                return UNKNOWN if UNKNOWN in children else 0.0
+            if name == 'Succession':
+                return sum(children)
+            if name == 'AnimationGroup':
+                return max(children)
+            lag = DEFAULT_LAG_RATIO
+            for keyword in node.keywords:
+                if keyword.arg == 'lag_ratio':
+                    lag = self.evaluate(keyword.value, env, timer)
+            if lag is UNKNOWN:
+                return UNKNOWN
+            longest = max(children)
+            return longest * (1 + lag * (len(children) - 1))
+        return DEFAULT_RUN_TIME
+
+    def play_time(self, call, env, timer):
+        for keyword in call.keywords:
+            if keyword.arg == 'run_time':
+                return self.evaluate(keyword.value, env, timer)
+        times = [self.animation_time(a, env, timer) for a in call.args]
+        if UNKNOWN in times:
+            return UNKNOWN
+        return max(times, default=DEFAULT_RUN_TIME)
+
+    def wait_time(self, call, env, timer):
+        if call.args:
+            return self.evaluate(call.args[0], env, timer)
+        for keyword in call.keywords:
+            if keyword.arg == 'duration':
+                return self.evaluate(keyword.value, env, timer)
+        return DEFAULT_WAIT_TIME
+
+    # ---------- 语句 ----------
+
+    def execute(self, statements, env, timer):
+        for stmt in statements:
+            self.statement(stmt, env, timer)
+
+    def statement(self, stmt, env, timer):
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+            call = stmt.value
+            if _is_self_call(call, {'play'}):
+                timer.add(self.play_time(call, env, timer), call, self.source)
+            elif _is_self_call(call, {'wait'}):
+                timer.add(self.wait_time(call, env, timer), call, self.source)
+            else:
+                self.evaluate(call, env, timer)
+        elif isinstance(stmt, ast.Assign):
+            value = self.evaluate(stmt.value, env, timer)
+            for target in stmt.targets:
+                self.assign(target, value, env)
+        elif isinstance(stmt, (ast.AnnAssign, ast.AugAssign)) and stmt.value is not None:
+            value = self.evaluate(stmt.value, env, timer)
+            if isinstance(stmt, ast.AugAssign):
+                current = self.evaluate(stmt.target, env, timer)
+                op = _BINOPS.get(type(stmt.op))
+                value = UNKNOWN if UNKNOWN in (current, value) or op is None else op(current, value)
+            self.assign(stmt.target, value, env)
+        elif isinstance(stmt, ast.If):
+            test = self.evaluate(stmt.test, env, timer)
+            if test is not UNKNOWN:
+                self.execute(stmt.body if test else stmt.orelse, env, timer)
+            else:
+                self.branch(stmt, [stmt.body, stmt.orelse], env, timer)
+        elif isinstance(stmt, ast.For):
+            self.loop(stmt, env, timer)
+        elif isinstance(stmt, ast.While):
+            self.branch(stmt, [stmt.body, []], env, timer)
+        elif isinstance(stmt, (ast.With, ast.AsyncWith)):
+            self.execute(stmt.body, env, timer)
+        elif isinstance(stmt, ast.Try):
+            self.execute(stmt.body + stmt.orelse + stmt.finalbody, env, timer)
+        elif isinstance(stmt, ast.Return):
+            raise _Return(self.evaluate(stmt.value, env, timer) if stmt.value is not None else None)
+
+    def assign(self, target, value, env):
+        if isinstance(target, ast.Name):
+            env[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            values = value if isinstance(value, (list, tuple)) and len(value) == len(target.elts) else None
+            for i, element in enumerate(target.elts):
+                self.assign(element, values[i] if values is not None else UNKNOWN, env)
+
+    def branch(self, stmt, bodies, env, timer):
+        """条件不确定：各分支计时一致时采用，否则记为未知"""
+        results = []
+        returned = []
+        for body in bodies:
+            scratch, forked = dict(env), timer.fork()
+            try:
+                self.execute(body, scratch, forked)
+            except _Return as r:
+                # 提前返回（如辅助方法中的特殊情况处理）只结束该分支
+                returned.append(r.value)
+            results.append((scratch, forked))
+        first = results[0][1]
+        if all(t.total == first.total and not t.unknown for _, t in results):
+            timer.total += first.total
+        else:
+            timer.add(UNKNOWN, stmt, self.source)
+        for name in _assigned_names([s for body in bodies for s in body]):
+            values = [e.get(name, UNKNOWN) for e, _ in results]
+            env[name] = values[0] if all(v == values[0] for v in values) else UNKNOWN
+        if len(returned) == len(bodies):
+            raise _Return(returned[0] if all(v == returned[0] for v in returned) else UNKNOWN)
+
+    def loop(self, stmt, env, timer):
+        iterable = self.evaluate(stmt.iter, env, timer)
+        if isinstance(iterable, str):
+            iterable = list(iterable)
+        elif isinstance(iterable, dict):
+            iterable = list(iterable)
+        if not isinstance(iterable, (list, tuple)) or len(iterable) > MAX_LOOP_ITERATIONS:
+            # 次数未知：循环体不含计时才不影响结果
+            forked = timer.fork()
+            scratch = dict(env)
+            self.assign(stmt.target, UNKNOWN, scratch)
+            self.execute(stmt.body, scratch, forked)
+            if forked.total or forked.unknown:
+                timer.add(UNKNOWN, stmt, self.source)
+            for name in _assigned_names(stmt.body) | _assigned_names([stmt]):
+                env[name] = UNKNOWN
+            return
+        for item in iterable:
+            self.assign(stmt.target, item, env)
+            self.execute(stmt.body, env, timer)
+        self.execute(stmt.orelse, env, timer)
+
+    # ---------- 分幕 ----------
+
+    def run_method(self, method, scene):
+        """估算一个 play_scene_* 方法"""
+        self.scene = scene
+        timer = Timer()
+        env = {a.arg: UNKNOWN for a in method.args.args[1:]}
+        try:
+            self.execute(method.body, env, timer)
+        except _Return:
+            pass
+        return timer
+
+    def run_sections(self, construct, sections):
+        """
+        按幕标记估算 construct
+
+        参数:
+            sections: [(行号, 幕号), ...]，按行号排序
+
+        返回:
+            {幕号: Timer}（第一个标记之前的语句计入第一幕）
+        """
+        timers = {}
+        env = {}
+        for stmt in construct.body:
+            current = sections[0][1]
+            for line, scene in sections:
+                if line <= stmt.lineno:
+                    current = scene
+            self.scene = current
+            timer = timers.setdefault(current, Timer())
+            try:
+                self.statement(stmt, env, timer)
+            except _Return:
+                break
+        return timers
+
+
+def find_sections(construct, source):
+    """
+    construct 中的幕划分：「第N幕」注释，或顶层的 self.add_scene_audio(N) 调用
+
+    返回:
+        [(行号, 幕号), ...]，同一幕只取第一次出现
+    """
+    lines = source.splitlines()
+    found = []
+    for lineno in range(construct.lineno, (construct.end_lineno or construct.lineno) + 1):
+        match = _SECTION_COMMENT.search(lines[lineno - 1])
+        if match and lines[lineno - 1].strip().startswith('#'):
+            try:
+                found.append((lineno, chinese_number(match.group(1))))
+            except ValueError:
+                continue
+    for stmt in construct.body:
+        if (isinstance(stmt, ast.Expr) and _is_self_call(stmt.value, {'add_scene_audio'})
+                and stmt.value.args and isinstance(stmt.value.args[0], ast.Constant)
+                and isinstance(stmt.value.args[0].value, int)):
+            found.append((stmt.lineno, stmt.value.args[0].value))
+
+    sections, seen = [], set()
+    for line, scene in sorted(found):
+        if scene not in seen:
+            seen.add(scene)
+            sections.append((line, scene))
+    return sections
+
+
+def scene_of_method(name):
+    """play_scene_N 方法对应的幕号，其他方法返回 None"""
+    match = _PLAY_SCENE.match(name)
+    return int(match.group(1)) if match else None
+
+
+def _is_scene_class(node):
+    for base in node.bases:
+        name = base.id if isinstance(base, ast.Name) else getattr(base, 'attr', '')
+        if name.endswith('Scene'):
+            return True
+    return False
+
+
+def estimate_source(source, audio=None):
+    """
+    估算源码中各幕的动画时长
+
+    参数:
+        audio: {幕号: 音频时长}，用于代入读取音频时长的表达式与比较
+
+    返回:
+        [{'class', 'scene', 'method', 'line', 'total', 'unknown': [(行号, 代码)], 'audio'}, ...]
+    """
+    audio = audio or {}
+    tree = ast.parse(source)
+    module_constants = _constants(tree.body)
+    results = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or not _is_scene_class(node):
+            continue
+        interpreter = SceneInterpreter(node, source, module_constants, audio)
+        scene_methods = []
+        for name, method in interpreter.methods.items():
+            scene = scene_of_method(name)
+            if scene is not None:
+                scene_methods.append((scene, method))
+
+        if scene_methods:
+            for scene, method in sorted(scene_methods, key=lambda x: x[0]):
+                timer = interpreter.run_method(method, scene)
+                results.append(_result(node.name, scene, method.name, method.lineno, timer, audio))
+        elif 'construct' in interpreter.methods:
+            construct = interpreter.methods['construct']
+            sections = find_sections(construct, source)
+            if not sections:
+                continue
+            lines = dict((scene, line) for line, scene in sections)
+            for scene, timer in interpreter.run_sections(construct, sections).items():
+                results.append(_result(node.name, scene, 'construct', lines[scene], timer, audio))
+    return results
+
+
+def _result(class_name, scene, method, line, timer, audio):
+    return {
+        'class': class_name, 'scene': scene, 'method': method, 'line': line,
+        'total': round(timer.total, 3), 'unknown': timer.unknown, 'audio': audio.get(scene),
+    }
+
+
+def estimate_file(path, audio=None):
+    with open(path, 'r', encoding='utf-8') as f:
+        return estimate_source(f.read(), audio)
+
+
+def load_audio_durations(audio_dir):
+    """
+    各幕音频时长：优先 audio_info.json（同一幕多个文件时相加），其次 timeline.json
+
+    返回:
+        ({幕号: 秒}, 来源文件路径)；都没有时返回 ({}, None)
+    """
+    info_path = os.path.join(audio_dir, 'audio_info.json')
+    timeline_path = os.path.join(audio_dir, 'timeline.json')
+    for path, list_key, scene_keys in ((info_path, 'files', ('scene',)),
+                                       (timeline_path, 'scenes', ('scene_num', 'index'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get(list_key) or []
+        except (OSError, ValueError, AttributeError):
+            continue
+        durations = {}
+        for entry in entries:
+            scene = next((entry[k] for k in scene_keys if entry.get(k)), None)
+            if scene and entry.get('duration'):
+                durations[scene] = round(durations.get(scene, 0) + entry['duration'], 3)
+        if durations:
+            return durations, path
+    return {}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='静态估算每幕动画时长，并与音频时长比较')
+    parser.add_argument('script', help='Manim 脚本')
+    parser.add_argument('--audio-dir', help='音频目录（默认：脚本所在目录下的 audio/）')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args()
+
+    audio_dir = args.audio_dir or str(Path(args.script).resolve().parent / 'audio')
+    audio, _ = load_audio_durations(audio_dir)
+    try:
+        results = estimate_file(args.script, audio)
+    except (OSError, SyntaxError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for r in results:
+        audio_text = f"{r['audio']:.2f}秒" if r['audio'] is not None else "无音频"
+        unknown = f"，{len(r['unknown'])} 处未知" if r['unknown'] else ""
+        print(f"第{r['scene']}幕 ({r['method']}:{r['line']}): 动画 {r['total']:.2f}秒{unknown} / 音频 {audio_text}")
+        for line, code in r['unknown']:
+            print(f"    行 {line}: {code}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+分镜脚本编译器
+
+功能：
+- 单遍扫描分镜 Markdown，生成结构化中间表示（IR），所有工具共用：
+  幕号、标题、目标时长、画面、字幕、读白、音频时机、情感、动画时间点、音频生成清单
+- 幕号支持任意中文数字（一、十一、二十三、一百零五）和阿拉伯数字
+- 音频生成清单按表头识别列（有「实际时长」列时优先于「时长」），并记录每行所在行号，便于原位回填
+- IR 以内容哈希缓存（$XDG_CACHE_HOME/tutor/storyboard），分镜不变时各工具直接读取缓存
+
+IR 结构：
+    {
+      'version': IR_VERSION, 'hash': 内容 sha256, 'title': 文档标题,
+      'scenes': [{
+          'num': 幕号, 'title': 标题, 'target_duration': 秒或 None, 'line': 标题行号（从 0 起）,
+          'visual': 画面, 'subtitle': 字幕, 'voiceover': 读白, 'audio_cue': 音频时机,
+          'emotion': 情感, 'purpose': 目的,
+          'animation': [{'time': 秒, 'text': 描述, 'exit': 是否为退场标记}, ...]
+      }, ...],
+      'audio_table': {
+          'line': 表头行号, 'header': [列名...], 'columns': {'scene': 列序号, 'file': ..., 'text': ...,
+                      'duration': ..., 'speaker': ..., 'emotion': ...},
+          'rows': [{'line': 行号, 'cells': [...], 'scene', 'file', 'text', 'duration', 'speaker', 'emotion'}, ...]
+      } 或 None
+    }
+
+使用：
+    from storyboard import compile_storyboard
+
+    ir = compile_storyboard('分镜.md')
+    for scene in ir['scenes']:
+        scene['num'], scene['title'], scene['voiceover']
+
+命令行：
+    python storyboard.py 分镜.md            # 打印摘要
+    python storyboard.py 分镜.md --json     # 输出完整 IR
+    python storyboard.py --find .           # 在目录中查找分镜文件（供 render.sh 使用）
+"""
+
+import os
+import re
+import sys
+import json
+import copy
+import hashlib
+from pathlib import Path
+
+
+# IR 格式版本：解析规则变化时递增，旧缓存自动失效
+IR_VERSION = 1
+
+# 中文数字
+_CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+              '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_CN_UNITS = {'十': 10, '百': 100, '千': 1000}
+
+# 幕标题：### 第十一幕：标题（12 秒）
+_SCENE_HEADING = re.compile(
+    r'^###\s*第\s*([零〇一二两三四五六七八九十百千\d]+)\s*幕\s*[:：]?\s*(.*?)\s*'
+    r'(?:[（(]\s*约?\s*([\d.]+)\s*(?:秒|s)\s*[）)])?\s*$')
+# 字段：**读白**: 内容
+_FIELD = re.compile(r'^\*\*(.+?)\*\*\s*[:：]?\s*(.*)$')
+# 动画时间点：- 1.5s: 描述
+_TIMING = re.compile(r'^[-*]\s*([\d.]+)\s*(?:s|秒)\s*[:：]\s*(.*)$')
+
+# 字段名 -> IR 键
+_FIELDS = {
+    '画面': 'visual', '字幕': 'subtitle', '读白': 'voiceover', '音频时机': 'audio_cue',
+    '情感': 'emotion', '目的': 'purpose', '动画': 'animation',
+}
+
+# 音频生成清单表头 -> 列键（越靠前优先级越高）
+_AUDIO_COLUMNS = {
+    'scene': ['幕号', '幕', '序号'],
+    'file': ['文件名', '文件'],
+    'text': ['读白文本', '读白', '文本', '对白'],
+    'duration': ['实际时长', '时长'],
+    'speaker': ['说话人', '声音'],
+    'emotion': ['情感'],
+}
+
+
+def chinese_number(text):
+    """中文或阿拉伯数字 -> int（'十一' -> 11，'一百零五' -> 105），无法解析时抛出 ValueError"""
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    if not text:
+        raise ValueError("空数字")
+    total = 0
+    digit = None
+    for c in text:
+        if c in _CN_DIGITS:
+            digit = _CN_DIGITS[c]
+        elif c in _CN_UNITS:
+            total += (1 if digit is None else digit) * _CN_UNITS[c]
+            digit = None
+        else:
+            raise ValueError(f"无法解析的数字: {text}")
+    return total + (digit or 0)
+
+
+def parse_seconds(text):
+    """'8' / '8.5s' / '8 秒' -> float；空白或占位（'__秒'）返回 None"""
+    text = (text or '').replace('秒', '').replace('s', '').strip()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _unquote(text):
+    text = text.strip()
+    for left, right in (('"', '"'), ('“', '”'), ('「', '」')):
+        if len(text) >= 2 and text.startswith(left) and text.endswith(right):
+            return text[1:-1].strip()
+    return text
+
+
+def split_row(line):
+    """表格行 -> 单元格列表（保留空单元格，列位置不会错位）"""
+    cells = [c.strip() for c in line.strip().split('|')]
+    if cells and cells[0] == '':
+        cells = cells[1:]
+    if cells and cells[-1] == '':
+        cells = cells[:-1]
+    return cells
+
+
+def replace_cell(line, index, value):
+    """
+    替换表格行第 index 个单元格的内容，其余字符（空白、对齐、换行符）原样保留
+
+    单元格不足时在行尾补齐。
+    """
+    body = line.rstrip('\r\n')
+    ending = line[len(body):]
+    parts = body.split('|')
+    lead = 1 if body.lstrip().startswith('|') else 0
+    trail = 1 if body.rstrip().endswith('|') and len(parts) > lead + 1 else 0
+    cells = parts[lead:len(parts) - trail]
+    while len(cells) <= index:
+        cells.append(' ')
+    old = cells[index]
+    left = old[:len(old) - len(old.lstrip())] or ' '
+    right = old[len(old.rstrip()):] or ' '
+    cells[index] = f"{left}{value}{right}"
+    return '|'.join(parts[:lead] + cells + parts[len(parts) - trail:]) + ending
+
+
+def _is_separator(line):
+    return bool(re.match(r'^\|?\s*:?-{3,}', line.strip()))
+
+
+def _finish_field(scene, name, inline, lines):
+    """把收集到的字段内容写入幕"""
+    key = _FIELDS.get(name)
+    if key is None or scene is None:
+        return
+    if key == 'animation':
+        marks = []
+        for line in lines:
+            match = _TIMING.match(line)
+            if match:
+                text = match.group(2).strip()
+                marks.append({'time': float(match.group(1)), 'text': text,
+                              'exit': text.startswith('→') or '退场' in text})
+        scene['animation'] = marks
+        return
+
+    parts = [inline] if inline else []
+    for line in lines:
+        # 读白/字幕中的列表项、示例行是写作提示，不是正文
+        if key in ('voiceover', 'subtitle') and (line.startswith('-') or line.startswith('示例')):
+            continue
+        parts.append(line)
+    if key in ('voiceover', 'subtitle'):
+        value = ' '.join(_unquote(p) for p in parts if p and not p.startswith('示例')).strip()
+    else:
+        value = '\n'.join(parts).strip()
+    scene[key] = value
+
+
+def _parse_audio_table(lines, start):
+    """
+    解析从 start 行开始的音频生成清单
+
+    返回:
+        (table, end)：end 为清单之后第一行（下一个标题）的行号
+    """
+    table = None
+    i = start - 1
+    while i + 1 < len(lines):
+        i += 1
+        line = lines[i].strip()
+        if line.startswith('#'):
+            return table, i
+        if not line.startswith('|') or _is_separator(line):
+            continue
+        cells = split_row(line)
+        if table is None:
+            header = cells
+            columns = {}
+            for key, names in _AUDIO_COLUMNS.items():
+                for name in names:
+                    if name in header:
+                        columns[key] = header.index(name)
+                        break
+            # 没有可识别的表头时按旧的固定列序：幕号 | 文件名 | 读白文本 | 时长 | 说话人 | 情感
+            if 'scene' not in columns:
+                columns = {'scene': 0, 'file': 1, 'text': 2, 'duration': 3, 'speaker': 4, 'emotion': 5}
+                table = {'line': None, 'header': [], 'columns': columns, 'rows': []}
+            else:
+                table = {'line': i, 'header': header, 'columns': columns, 'rows': []}
+                continue
+
+        columns = table['columns']
+
+        def cell(key, cells=cells, columns=columns):
+            idx = columns.get(key)
+            return cells[idx] if idx is not None and idx < len(cells) else ''
+
+        scene = cell('scene')
+        if not scene.isdigit():
+            continue
+        table['rows'].append({
+            'line': i,
+            'cells': cells,
+            'scene': int(scene),
+            'file': cell('file'),
+            'text': _unquote(cell('text')),
+            'duration': parse_seconds(cell('duration')),
+            'speaker': cell('speaker') or 'xiaoxiao',
+            'emotion': cell('emotion') or '平和',
+        })
+    return table, len(lines)
+
+
+def parse_storyboard_text(content):
+    """单遍解析分镜内容，返回 IR（不含缓存信息）"""
+    lines = content.split('\n')
+    ir = {'version': IR_VERSION, 'title': '', 'scenes': [], 'audio_table': None}
+
+    scene = None
+    field, inline, field_lines = None, '', []
+
+    def flush_field():
+        nonlocal field, inline, field_lines
+        if field is not None:
+            _finish_field(scene, field, inline, field_lines)
+        field, inline, field_lines = None, '', []
+
+    i = -1
+    while i + 1 < len(lines):
+        i += 1
+        line = lines[i].strip()
+
+        if line.startswith('# ') and not ir['title']:
+            ir['title'] = line[2:].strip()
+            continue
+
+        match = _SCENE_HEADING.match(line)
+        if match:
+            flush_field()
+            try:
+                num = chinese_number(match.group(1))
+            except ValueError:
+                num = len(ir['scenes']) + 1
+            title = match.group(2).strip()
+            scene = {
+                'num': num, 'title': title, 'line': i,
+                'target_duration': float(match.group(3)) if match.group(3) else None,
+                'visual': '', 'subtitle': '', 'voiceover': '', 'audio_cue': '',
+                'emotion': '', 'purpose': '', 'animation': [],
+            }
+            ir['scenes'].append(scene)
+            continue
+
+        if line.startswith('## ') or line.startswith('### '):
+            flush_field()
+            scene = None
+            if '音频生成清单' in line:
+                # 清单表格直接在此消费，主循环从其后的标题继续
+                ir['audio_table'], end = _parse_audio_table(lines, i + 1)
+                i = end - 1
+            continue
+
+        if line == '---':
+            flush_field()
+            continue
+
+        match = _FIELD.match(line)
+        if match and scene is not None:
+            flush_field()
+            field, inline = match.group(1).strip(), match.group(2).strip()
+            continue
+
+        if field is not None and line:
+            field_lines.append(line)
+
+    flush_field()
+    return ir
+
+
+def default_cache_dir():
+    """IR 缓存目录：$XDG_CACHE_HOME/tutor/storyboard，默认 ~/.cache/tutor/storyboard"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'tutor' / 'storyboard'
+
+
+# 进程内缓存：长时间运行的工具（如监视模式）不必重复读取缓存文件
+_memo = {}
+
+
+def compile_storyboard(path, cache_dir=None, use_cache=True):
+    """
+    编译分镜文件为 IR
+
+    参数:
+        path: 分镜 Markdown 路径
+        cache_dir: IR 缓存目录，None 表示默认目录
+        use_cache: False 时总是重新解析（仍会写入缓存）
+
+    返回:
+        IR dict，额外包含 'source'（文件路径）与 'hash'（内容 sha256）
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    key = f"v{IR_VERSION}-{digest}"
+
+    ir = _memo.get(key) if use_cache else None
+    cache_file = Path(cache_dir or default_cache_dir()) / f"{key}.json"
+    if ir is None and use_cache:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                ir = json.load(f)
+        except (OSError, ValueError):
+            ir = None
+
+    if ir is None:
+        ir = parse_storyboard_text(raw.decode('utf-8-sig'))
+        ir['hash'] = digest
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_name(cache_file.name + '.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(ir, f, ensure_ascii=False)
+            os.replace(tmp, cache_file)
+        except OSError:
+            # 缓存不可写时不影响编译结果
+            pass
+
+    _memo[key] = ir
+    result = copy.deepcopy(ir)
+    result['source'] = str(path)
+    return result
+
+
+def find_storyboard(directory='.'):
+    """
+    在目录中查找分镜文件
+
+    优先文件名含"分镜"/"storyboard"且能编译出幕的 .md，其次任意含幕的 .md；找不到时返回 None
+    """
+    candidates = sorted(Path(directory).glob('*.md'))
+    named = [p for p in candidates if '分镜' in p.name or 'storyboard' in p.name.lower()]
+    for path in named + [p for p in candidates if p not in named]:
+        try:
+            if compile_storyboard(path)['scenes']:
+                return path
+        except (OSError, UnicodeDecodeError):
+            continue
+    return None
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python storyboard.py <分镜.md> [--json] | --find [目录]")
+        sys.exit(1)
+
+    if args[0] == '--find':
+        path = find_storyboard(args[1] if len(args) > 1 else '.')
+        if path is None:
+            sys.exit(1)
+        print(path)
+        return
+
+    ir = compile_storyboard(args[0])
+    if '--json' in args:
+        print(json.dumps(ir, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{ir['title'] or args[0]}  (sha256 {ir['hash'][:12]})")
+    for scene in ir['scenes']:
+        target = f"{scene['target_duration']:g}秒" if scene['target_duration'] else "未标注"
+        print(f"  第{scene['num']}幕 {scene['title']} ({target}, 读白 {len(scene['voiceover'])} 字, "
+              f"动画时间点 {len(scene['animation'])} 个)")
+    table = ir['audio_table']
+    if table:
+        print(f"  音频生成清单: {len(table['rows'])} 行")
+
+
+if __name__ == '__main__':
+    main()
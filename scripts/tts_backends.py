@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+TTS 后端
+
+功能：
+- 统一的流式 TTS 后端接口：stream(text, voice_id, rate, pitch) 逐块产出音频与边界事件
+- synthesize()：音频块到达即写盘，时长由流本身推出（不再二次读文件/探测）
+- edge：微软 Edge TTS（在线，默认）
+- offline：本地确定性替身，无需网络，用于压测并发、缓存和端到端吞吐
+
+流事件格式（与 edge_tts 一致）：
+    {'type': 'audio', 'data': bytes}
+    {'type': 'WordBoundary', 'offset': 100ns 单位, 'duration': 100ns 单位, 'text': str}
+
+边界事件写入 JSON 时用 compact_boundaries() 转为并列数组：
+    {'offsets': [秒...], 'durations': [秒...], 'tokens': [词...]}
+
+时长：
+    两个后端输出的都是恒定码率流（24kHz 48kbps MP3 / 24kHz 16bit PCM），
+    时长 = 音频字节数 / 每秒字节数，精确到帧；再与最后一个边界事件的结束时间取大者。
+
+offline 后端：
+- 按"每秒字数"模型估算时长，标点处插入停顿
+- 输出合法的 MP3（静音帧，与 Edge TTS 同为 24kHz 48kbps 单声道）或 WAV（音节状的正弦音）
+- 可配置人工延迟和失败率；延迟和失败只由 (seed, 文本, 第几次调用) 决定，与调度顺序无关
+
+后端描述串（--backend）：
+    edge
+    offline
+    offline:latency=0.5,fail=0.1,cps=4.5,format=wav,seed=7
+
+使用：
+    backend = create_backend('offline:latency=0.2')
+    result = await backend.synthesize(text, voice_id, 'audio/audio_001.mp3')
+    result['duration'], result['boundaries']
+"""
+
+import sys
+import math
+import array
+import struct
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+
+from tts_engine import EDGE_OUTPUT_FORMAT
+
+
+# 标点停顿（秒，+0% 语速）：offline 后端的时长模型与 tts_fit.py 的语速拟合共用
+PUNCTUATION_PAUSES = {
+    '，': 0.25, ',': 0.25, '、': 0.2, '：': 0.3, ':': 0.3,
+    '。': 0.45, '！': 0.45, '？': 0.45, '；': 0.35,
+    '.': 0.45, '!': 0.45, '?': 0.45, ';': 0.35,
+}
+
+
+class TTSBackendError(Exception):
+    """后端合成失败"""
+
+
+class TransientTTSError(TTSBackendError):
+    """瞬时错误（网络、限流、服务端异常），可以重试"""
+
+
+def is_transient(error):
+    """判断异常是否值得重试"""
+    return isinstance(error, (TransientTTSError, asyncio.TimeoutError, ConnectionError))
+
+
+# 边界事件时间单位：100 纳秒
+TICKS_PER_SECOND = 10_000_000
+
+
+def compact_boundaries(boundaries):
+    """
+    边界事件 -> 紧凑的并列数组（秒，保留 3 位小数），用于写入 JSON
+
+    返回:
+        {'offsets': [...], 'durations': [...], 'tokens': [...]}，无事件时返回 None
+    """
+    if not boundaries:
+        return None
+    return {
+        'offsets': [round(b['offset'] / TICKS_PER_SECOND, 3) for b in boundaries],
+        'durations': [round(b['duration'] / TICKS_PER_SECOND, 3) for b in boundaries],
+        'tokens': [b['text'] for b in boundaries],
+    }
+
+
+def expand_boundaries(compact):
+    """compact_boundaries 的逆变换（时间换回 100ns 单位）"""
+    if not compact:
+        return []
+    return [
+        {'offset': round(o * TICKS_PER_SECOND), 'duration': round(d * TICKS_PER_SECOND), 'text': t}
+        for o, d, t in zip(compact['offsets'], compact['durations'], compact['tokens'])
+    ]
+
+# MPEG-2 Layer III, 24kHz, 48kbps, 单声道（Edge TTS 的输出格式）：每帧 576 个采样、144 字节
+MP3_SAMPLE_RATE = 24000
+MP3_FRAME_SAMPLES = 576
+MP3_FRAME_HEADER = bytes([0xFF, 0xF3, 0x64, 0xC4])
+MP3_FRAME_BYTES = 144
+
+
+def mp3_silence(seconds, minimum=0):
+    """静音 MP3 帧序列：全零 side info 的帧解码为静音"""
+    frames = max(minimum, math.ceil(seconds * MP3_SAMPLE_RATE / MP3_FRAME_SAMPLES))
+    frame = MP3_FRAME_HEADER + bytes(MP3_FRAME_BYTES - len(MP3_FRAME_HEADER))
+    return frame * frames
+
+
+def wav_header(pcm_bytes, sample_rate):
+    """16bit 单声道 PCM 的 44 字节 WAV 头"""
+    header = b'RIFF' + struct.pack('<I', 36 + pcm_bytes) + b'WAVE'
+    header += b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, sample_rate, 2 * sample_rate, 2, 16)
+    header += b'data' + struct.pack('<I', pcm_bytes)
+    return header
+
+
+class TTSBackend(ABC):
+    """TTS 后端基类：子类实现 stream() 与 silence()，并给出恒定码率流的每秒字节数"""
+
+    name = ''
+    # 实际输出格式描述，参与缓存键计算（不同后端/参数的结果不会串用）
+    output_format = ''
+    # 音频流每秒字节数（恒定码率）
+    bytes_per_second = 6000
+    # 流开头的非音频数据字节数（如 WAV 头）
+    header_bytes = 0
+
+    @abstractmethod
+    async def stream(self, text, voice_id, rate='+0%', pitch='+0Hz'):
+        """逐块产出音频与边界事件（异步生成器）"""
+
+    @abstractmethod
+    def silence(self, seconds):
+        """与该后端流格式一致的静音数据（不含文件头），用于拼接分句"""
+
+    def file_header(self, payload_bytes):
+        """拼接后文件的文件头（恒定码率裸流无需文件头）"""
+        return b''
+
+    def stream_duration(self, audio_bytes, boundaries):
+        """由流的字节数和边界事件推出时长（秒）"""
+        duration = max(0, audio_bytes - self.header_bytes) / self.bytes_per_second
+        if boundaries:
+            last = boundaries[-1]
+            duration = max(duration, (last['offset'] + last['duration']) / TICKS_PER_SECOND)
+        return duration
+
+    async def synthesize(self, text, voice_id, output_path, rate='+0%', pitch='+0Hz'):
+        """
+        合成 text，音频块到达即写入 output_path
+
+        返回:
+            dict: {'duration': 秒, 'boundaries': [{'offset', 'duration', 'text'}, ...]}
+        """
+        audio_bytes = 0
+        boundaries = []
+        with open(output_path, 'wb') as f:
+            async for chunk in self.stream(text, voice_id, rate, pitch):
+                if chunk['type'] == 'audio':
+                    f.write(chunk['data'])
+                    audio_bytes += len(chunk['data'])
+                elif chunk['type'] in ('WordBoundary', 'SentenceBoundary'):
+                    boundaries.append({
+                        'offset': chunk['offset'],
+                        'duration': chunk['duration'],
+                        'text': chunk['text'],
+                    })
+        if audio_bytes == 0:
+            raise TransientTTSError("未收到音频数据")
+        return {
+            'duration': self.stream_duration(audio_bytes, boundaries),
+            'boundaries': boundaries,
+        }
+
+
+class EdgeTTSBackend(TTSBackend):
+    """微软 Edge TTS（需要网络），输出 24kHz 48kbps 单声道 MP3"""
+
+    name = 'edge'
+    output_format = EDGE_OUTPUT_FORMAT
+    bytes_per_second = 48000 // 8
+
+    def __init__(self):
+        try:
+            import edge_tts
+        except ImportError:
+            raise TTSBackendError("edge-tts 未安装，请运行: uv pip install edge-tts")
+        self._edge_tts = edge_tts
+
+    def silence(self, seconds):
+        return mp3_silence(seconds)
+
+    def _communicate(self, text, voice_id, rate, pitch):
+        try:
+            # edge-tts 7.x 默认只产出 SentenceBoundary，显式要求词级边界
+            return self._edge_tts.Communicate(text, voice_id, rate=rate, pitch=pitch,
+                                              boundary='WordBoundary')
+        except TypeError:
+            # edge-tts 6.x 没有 boundary 参数，默认即为 WordBoundary
+            return self._edge_tts.Communicate(text, voice_id, rate=rate, pitch=pitch)
+
+    async def stream(self, text, voice_id, rate='+0%', pitch='+0Hz'):
+        try:
+            communicate = self._communicate(text, voice_id, rate, pitch)
+            async for chunk in communicate.stream():
+                yield chunk
+        except (ValueError, TypeError):
+            # 参数错误（如声音 ID、语速格式无效），重试无意义
+            raise
+        except Exception as e:
+            # edge_tts / aiohttp 的网络、限流、无音频返回等异常
+            raise TransientTTSError(f"{type(e).__name__}: {e}") from e
+
+
+class OfflineTTSBackend(TTSBackend):
+    """本地确定性 TTS 替身"""
+
+    name = 'offline'
+
+    SAMPLE_RATE = MP3_SAMPLE_RATE
+    WAV_HEADER_BYTES = 44
+    # 每个音频块的大小（字节）
+    CHUNK_BYTES = 4096
+
+    # 标点停顿（秒）
+    PAUSES = PUNCTUATION_PAUSES
+    # 首尾静音（秒）
+    EDGE_SILENCE = 0.1
+
+    def __init__(self, chars_per_second=4.5, latency=0.0, failure_rate=0.0,
+                 fmt='mp3', seed=0):
+        if fmt not in ('mp3', 'wav'):
+            raise TTSBackendError(f"offline 后端不支持格式: {fmt}（可选 mp3/wav）")
+        self.chars_per_second = float(chars_per_second)
+        self.latency = float(latency)
+        self.failure_rate = float(failure_rate)
+        self.fmt = fmt
+        self.seed = seed
+        self.output_format = f"offline-{fmt}-cps{self.chars_per_second:g}"
+        if fmt == 'mp3':
+            self.bytes_per_second = MP3_FRAME_BYTES * self.SAMPLE_RATE / MP3_FRAME_SAMPLES
+        else:
+            self.bytes_per_second = 2 * self.SAMPLE_RATE
+            self.header_bytes = self.WAV_HEADER_BYTES
+        self._calls = {}
+
+    @staticmethod
+    def parse_rate(rate):
+        """'+10%' -> 1.1"""
+        try:
+            return max(0.1, 1 + float(str(rate).strip().rstrip('%')) / 100)
+        except ValueError:
+            return 1.0
+
+    def timeline(self, text, rate='+0%'):
+        """
+        按每秒字数模型排布音节
+
+        返回:
+            (tokens, duration)：tokens 为 [(字, 开始秒, 时长秒), ...]
+        """
+        speed = self.parse_rate(rate)
+        syllable = 1 / self.chars_per_second / speed
+        t = self.EDGE_SILENCE
+        tokens = []
+        for c in text:
+            if c.isspace():
+                continue
+            if c in self.PAUSES:
+                t += self.PAUSES[c] / speed
+            else:
+                tokens.append((c, t, syllable))
+                t += syllable
+        return tokens, t + self.EDGE_SILENCE
+
+    def estimate_duration(self, text, rate='+0%'):
+        """按每秒字数模型估算时长（秒）"""
+        return self.timeline(text, rate)[1]
+
+    def _draw(self, text, attempt, salt):
+        """确定性的 [0, 1) 随机数"""
+        digest = hashlib.sha256(f"{self.seed}|{salt}|{attempt}|{text}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2**64
+
+    async def stream(self, text, voice_id, rate='+0%', pitch='+0Hz'):
+        attempt = self._calls.get(text, 0)
+        self._calls[text] = attempt + 1
+
+        if self.latency > 0:
+            # 延迟在 [0.5, 1.5) 倍之间抖动
+            await asyncio.sleep(self.latency * (0.5 + self._draw(text, attempt, 'latency')))
+
+        if self._draw(text, attempt, 'fail') < self.failure_rate:
+            raise TransientTTSError(f"offline 后端模拟失败 (第 {attempt + 1} 次调用)")
+
+        tokens, duration = self.timeline(text, rate)
+        for token, start, length in tokens:
+            yield {
+                'type': 'WordBoundary',
+                'offset': round(start * TICKS_PER_SECOND),
+                'duration': round(length * TICKS_PER_SECOND),
+                'text': token,
+            }
+
+        data = self._mp3_bytes(duration) if self.fmt == 'mp3' else self._wav_bytes(tokens, duration)
+        for i in range(0, len(data), self.CHUNK_BYTES):
+            yield {'type': 'audio', 'data': data[i:i + self.CHUNK_BYTES]}
+            # 让出事件循环，模拟逐块到达
+            await asyncio.sleep(0)
+
+    def silence(self, seconds):
+        if self.fmt == 'mp3':
+            return mp3_silence(seconds)
+        return bytes(2 * round(seconds * self.SAMPLE_RATE))
+
+    def file_header(self, payload_bytes):
+        return wav_header(payload_bytes, self.SAMPLE_RATE) if self.fmt == 'wav' else b''
+
+    def _mp3_bytes(self, duration):
+        """静音 MP3（时长取整到帧，至少一帧）"""
+        return mp3_silence(duration, minimum=1)
+
+    def _wav_bytes(self, tokens, duration):
+        """16bit 单声道 WAV：每个字一个正弦音节（220Hz + 汉宁包络），其余静音"""
+        total = round(duration * self.SAMPLE_RATE)
+        samples = array.array('h', bytes(2 * total))
+
+        cache = {}
+        for _, start, length in tokens:
+            n = round(length * self.SAMPLE_RATE)
+            if n not in cache:
+                cache[n] = array.array('h', (
+                    int(8000 * math.sin(2 * math.pi * 220 * i / self.SAMPLE_RATE)
+                        * (0.5 - 0.5 * math.cos(2 * math.pi * i / n)))
+                    for i in range(n)
+                ))
+            begin = round(start * self.SAMPLE_RATE)
+            samples[begin:begin + n] = cache[n][:max(0, total - begin)]
+
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        pcm = samples.tobytes()
+        return wav_header(len(pcm), self.SAMPLE_RATE) + pcm
+
+
+BACKENDS = {
+    'edge': EdgeTTSBackend,
+    'offline': OfflineTTSBackend,
+}
+
+# 描述串中的简写 -> 构造参数
+_OFFLINE_OPTIONS = {
+    'cps': ('chars_per_second', float),
+    'latency': ('latency', float),
+    'fail': ('failure_rate', float),
+    'format': ('fmt', str),
+    'seed': ('seed', int),
+}
+
+
+def create_backend(spec='edge'):
+    """
+    根据描述串创建后端
+
+    参数:
+        spec: 'edge' / 'offline' / 'offline:latency=0.5,fail=0.1,cps=4.5,format=wav,seed=7'
+
+    异常:
+        TTSBackendError: 未知后端、参数错误或依赖缺失
+    """
+    name, _, options = (spec or 'edge').partition(':')
+    name = name.strip().lower()
+    if name not in BACKENDS:
+        raise TTSBackendError(f"未知 TTS 后端: {name}（可选: {', '.join(BACKENDS)}）")
+
+    if name == 'edge':
+        if options:
+            raise TTSBackendError("edge 后端不接受参数")
+        return EdgeTTSBackend()
+
+    kwargs = {}
+    for item in filter(None, (part.strip() for part in options.split(','))):
+        key, _, value = item.partition('=')
+        if key not in _OFFLINE_OPTIONS:
+            raise TTSBackendError(f"offline 后端未知参数: {key}（可选: {', '.join(_OFFLINE_OPTIONS)}）")
+        arg, convert = _OFFLINE_OPTIONS[key]
+        try:
+            kwargs[arg] = convert(value)
+        except ValueError:
+            raise TTSBackendError(f"offline 后端参数值无效: {item}")
+    return OfflineTTSBackend(**kwargs)
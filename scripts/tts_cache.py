@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+TTS 内容寻址缓存
+
+功能：
+- 以 (规范化文本, 声音 ID, 语速, 音调, 输出格式) 的哈希为键缓存合成结果
+- 命中时硬链接（失败则复制）到 audio/ 目录，时长直接取自缓存元数据
+- 按总大小做 LRU 淘汰
+
+缓存目录结构：
+    <cache_dir>/index.json        # 键 -> 元数据（文件、大小、时长、最近使用时间）
+    <cache_dir>/ab/abcdef....mp3  # 音频内容
+
+注意：
+    audio/ 中的文件可能是缓存条目的硬链接，改写这些文件前必须先删除
+    （或写临时文件再 rename），否则会把缓存内容一起改掉。
+
+使用：
+    cache = TTSCache(TTSCache.default_dir())
+    key = cache_key(text, voice_id, rate, pitch, fmt)
+    hit = cache.fetch(key, output_path)
+    ...
+    cache.store(key, output_path, duration)
+    cache.save()
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import unicodedata
+from pathlib import Path
+
+
+# 默认缓存上限（MB）
+DEFAULT_CACHE_SIZE_MB = 500
+
+
+def normalize_text(text):
+    """规范化文本：Unicode NFC + 合并空白，避免无意义的缓存失效"""
+    text = unicodedata.normalize('NFC', text or '')
+    return ' '.join(text.split())
+
+
+def cache_key(text, voice_id, rate='+0%', pitch='+0Hz', fmt='mp3'):
+    """计算缓存键（sha256 十六进制）"""
+    payload = json.dumps(
+        [normalize_text(text), voice_id, rate, pitch, fmt],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def remove_output(path):
+    """删除已有输出文件（它可能是缓存的硬链接，不能原地覆盖）"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class TTSCache:
+    """持久化 TTS 缓存（单进程内使用，不做跨进程加锁）"""
+
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_CACHE_SIZE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.index_path = self.cache_dir / self.INDEX_NAME
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def default_dir():
+        """全局缓存目录：$XDG_CACHE_HOME/tutor/tts，默认 ~/.cache/tutor/tts"""
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return Path(base) / 'tutor' / 'tts'
+
+    def _load(self):
+        """加载索引，丢弃内容文件已不存在的条目"""
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, meta in data.get('entries', {}).items():
+            if (self.cache_dir / meta.get('file', '')).is_file():
+                self.entries[key] = meta
+            else:
+                self._dirty = True
+
+    def _blob_path(self, key, suffix):
+        return self.cache_dir / key[:2] / f"{key}{suffix}"
+
+    def fetch(self, key, dest):
+        """
+        查找缓存并落地到 dest
+
+        返回:
+            命中时返回元数据 dict（含 duration），未命中返回 None
+        """
+        meta = self.entries.get(key)
+        if meta is None:
+            self.misses += 1
+            return None
+
+        blob = self.cache_dir / meta['file']
+        remove_output(dest)
+        try:
+            os.link(blob, dest)
+        except OSError:
+            try:
+                shutil.copyfile(blob, dest)
+            except OSError:
+                # 内容文件丢失或不可读，按未命中处理
+                self.entries.pop(key, None)
+                self._dirty = True
+                self.misses += 1
+                return None
+
+        meta['last_used'] = time.time()
+        self._dirty = True
+        self.hits += 1
+        return meta
+
+    def peek(self, key):
+        """只读查询元数据（不落地文件、不计入命中统计），未命中返回 None"""
+        return self.entries.get(key)
+
+    def store(self, key, src, duration, **info):
+        """将合成结果存入缓存（复制，不影响 src）"""
+        src = Path(src)
+        blob = self._blob_path(key, src.suffix)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = blob.with_name(blob.name + '.tmp')
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, blob)
+
+        self.entries[key] = {
+            'file': str(blob.relative_to(self.cache_dir)),
+            'size': blob.stat().st_size,
+            'duration': duration,
+            'last_used': time.time(),
+            **info
+        }
+        self._dirty = True
+        self.evict()
+
+    def evict(self):
+        """按最近使用时间淘汰，直到总大小不超过上限"""
+        total = sum(meta.get('size', 0) for meta in self.entries.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, meta in sorted(self.entries.items(), key=lambda kv: kv[1].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.cache_dir / meta['file'])
+            except OSError:
+                pass
+            total -= meta.get('size', 0)
+            del self.entries[key]
+            self._dirty = True
+
+    def save(self):
+        """写回索引（临时文件 + rename，保证原子性）"""
+        if not self._dirty:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.INDEX_NAME + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+        self._dirty = False
+
+    def summary(self):
+        """命中统计文本"""
+        return f"缓存命中 {self.hits}，未命中 {self.misses}（{self.cache_dir}）"
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+长读白分句并发合成
+
+功能：
+- 在中文句末标点（。！？；）处切分长读白，按长度上限把相邻句子装进同一块
+- 各块并发合成（经 ResilientCaller 限流/重试/熔断），再按顺序拼接为一个文件
+- 块之间插入可控时长的静音（MP3 静音帧 / PCM 零采样），与后端流格式一致
+- 返回每块在拼接结果中的起始时间，渲染端可直接拿到句级时间
+
+拼接：
+    两个后端输出的都是恒定码率流，块的时长 = 字节数 / 每秒字节数，
+    因此偏移量可以精确到帧；WAV 会去掉各块的文件头后重新写头。
+
+使用：
+    from tts_chunks import split_sentences, synthesize_chunked, chunk_format
+
+    result, attempts = await synthesize_chunked(
+        backend, caller, text, voice_id, output_path, max_chars=80, gap=0.2)
+    result['duration'], result['boundaries'], result['chunks']
+"""
+
+import os
+import asyncio
+
+from tts_backends import TICKS_PER_SECOND
+
+
+# 句末标点（在其后切分）
+SENTENCE_ENDINGS = '。！？；'
+# 紧跟在句末标点后、应留在同一句的收尾符号
+CLOSING_MARKS = '”’」』）)》"\''
+
+# 默认块长度上限（字符）；0 表示不分句
+DEFAULT_CHUNK_CHARS = 0
+# 默认块间静音（秒）
+DEFAULT_CHUNK_GAP = 0.2
+
+
+def split_sentences(text, max_chars):
+    """
+    把 text 切分为若干块
+
+    在句末标点处断句，再把相邻句子依次装进不超过 max_chars 的块；
+    单句超长时不再细分。text 不超过 max_chars（或 max_chars <= 0）时返回 [text]。
+    """
+    text = (text or '').strip()
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+
+    sentences = []
+    start = 0
+    i = 0
+    while i < len(text):
+        if text[i] in SENTENCE_ENDINGS:
+            i += 1
+            while i < len(text) and (text[i] in SENTENCE_ENDINGS or text[i] in CLOSING_MARKS):
+                i += 1
+            sentences.append(text[start:i])
+            start = i
+        else:
+            i += 1
+    if text[start:].strip():
+        sentences.append(text[start:])
+
+    chunks = []
+    for sentence in (s.strip() for s in sentences):
+        if not sentence:
+            continue
+        if chunks and len(chunks[-1]) + len(sentence) <= max_chars:
+            chunks[-1] += sentence
+        else:
+            chunks.append(sentence)
+    return chunks or [text]
+
+
+def chunk_format(output_format, text, max_chars, gap):
+    """
+    参与缓存键计算的格式描述
+
+    分句拼接的结果与整段合成不同，真正被切分的文本要带上切分参数；
+    未切分的文本与不分句时共用缓存。
+    """
+    if len(split_sentences(text, max_chars)) > 1:
+        return f"{output_format}|chunk{max_chars}|gap{gap:g}"
+    return output_format
+
+
+def _part_path(output_path, index):
+    root, ext = os.path.splitext(str(output_path))
+    return f"{root}.part{index:02d}{ext}"
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def synthesize_chunked(backend, caller, text, voice_id, output_path,
+                             rate='+0%', pitch='+0Hz', max_chars=DEFAULT_CHUNK_CHARS,
+                             gap=DEFAULT_CHUNK_GAP):
+    """
+    分句并发合成并拼接到 output_path
+
+    参数:
+        backend: TTS 后端（需实现 silence()/file_header()）
+        caller: ResilientCaller，每块独立重试
+        max_chars: 块长度上限，<= 0 或文本不超长时整段合成
+        gap: 块间静音（秒）
+
+    返回:
+        (result, attempts)
+        result: {'duration', 'boundaries', 'chunks': [{'offset', 'duration', 'text'}, ...]}
+                boundaries 的 offset 已换算到拼接后的时间轴
+        attempts: 各块中最多的调用次数
+
+    异常:
+        CallFailed: 任一块重试后仍失败（其余块会等待完成后再清理）
+    """
+    chunks = split_sentences(text, max_chars)
+    if len(chunks) == 1:
+        result, attempts = await caller.call(
+            lambda: backend.synthesize(text, voice_id, output_path, rate, pitch))
+        result['chunks'] = [{'offset': 0.0, 'duration': result['duration'], 'text': text}]
+        return result, attempts
+
+    parts = [_part_path(output_path, i) for i in range(len(chunks))]
+
+    def synthesize_part(chunk, part):
+        return caller.call(lambda: backend.synthesize(chunk, voice_id, part, rate, pitch))
+
+    try:
+        outcomes = await asyncio.gather(
+            *(synthesize_part(chunk, part) for chunk, part in zip(chunks, parts)),
+            return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        silence = backend.silence(gap) if gap > 0 else b''
+        payloads = []
+        for part in parts:
+            with open(part, 'rb') as f:
+                payloads.append(f.read()[backend.header_bytes:])
+        total = sum(len(p) for p in payloads) + len(silence) * (len(payloads) - 1)
+
+        offset_bytes = 0
+        chunk_info = []
+        boundaries = []
+        with open(output_path, 'wb') as f:
+            f.write(backend.file_header(total))
+            for i, (chunk, payload, (result, _)) in enumerate(zip(chunks, payloads, outcomes)):
+                if i > 0:
+                    f.write(silence)
+                    offset_bytes += len(silence)
+                offset = offset_bytes / backend.bytes_per_second
+                ticks = round(offset * TICKS_PER_SECOND)
+                for b in result['boundaries']:
+                    boundaries.append({**b, 'offset': b['offset'] + ticks})
+                chunk_info.append({
+                    'offset': round(offset, 3),
+                    'duration': round(len(payload) / backend.bytes_per_second, 3),
+                    'text': chunk,
+                })
+                f.write(payload)
+                offset_bytes += len(payload)
+    finally:
+        for part in parts:
+            _remove(part)
+
+    duration = backend.stream_duration(backend.header_bytes + total, boundaries)
+    attempts = max(a for _, a in outcomes)
+    return {'duration': duration, 'boundaries': boundaries, 'chunks': chunk_info}, attempts
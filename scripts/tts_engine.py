@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+TTS 合成引擎（generate_tts.py 与 sample/geometry_proof/generate_edge_tts.py 共用）
+
+功能：
+- 在有界并发（信号量）下批量执行合成任务
+- 结果按输入顺序返回，与完成先后无关
+- 完成回调按输入顺序触发，控制台报告保持 CSV / 分镜顺序
+- 令牌桶限流、带抖动的指数退避重试、熔断（ResilientCaller）
+
+使用：
+    from tts_engine import run_bounded, ResilientCaller
+
+    caller = ResilientCaller(rps=5, retries=3, is_transient=is_transient)
+    result, attempts = await caller.call(lambda: backend.synthesize(...))
+    results = await run_bounded(entries, worker, jobs=4, on_done=report)
+"""
+
+import time
+import random
+import asyncio
+
+
+# 默认并发数（Edge TTS 在线服务，过高容易被限流）
+DEFAULT_JOBS = 4
+
+# Edge TTS 实际输出格式（与文件扩展名无关），参与缓存键计算
+EDGE_OUTPUT_FORMAT = 'audio-24khz-48kbitrate-mono-mp3'
+
+# 限流 / 重试 / 熔断默认值
+DEFAULT_RPS = 5.0               # 每秒请求数
+DEFAULT_RETRIES = 3             # 瞬时错误的最大重试次数
+DEFAULT_BACKOFF_BASE = 1.0      # 首次退避上限（秒），之后每次翻倍
+DEFAULT_BACKOFF_MAX = 20.0      # 单次退避上限（秒）
+DEFAULT_BREAKER_THRESHOLD = 5   # 连续失败多少次后熔断
+DEFAULT_BREAKER_COOLDOWN = 30.0 # 熔断持续时间（秒），之后放行一次试探请求
+
+
+async def run_bounded(items, worker, jobs=DEFAULT_JOBS, on_done=None):
+    """
+    在最多 jobs 个并发下对每个条目执行 worker
+
+    参数:
+        items: 条目列表
+        worker: 协程函数 worker(index, item) -> result
+        jobs: 最大并发数（<= 1 时退化为串行）
+        on_done: 可选回调 on_done(index, item, result)，按输入顺序调用：
+                 第 i 条只有在前 i-1 条全部完成后才会回调
+
+    返回:
+        与 items 同序的结果列表
+    """
+    items = list(items)
+    semaphore = asyncio.Semaphore(max(1, int(jobs or 1)))
+    finished = {}
+    next_index = 0
+
+    def flush():
+        nonlocal next_index
+        while next_index in finished:
+            if on_done:
+                on_done(next_index, items[next_index], finished[next_index])
+            next_index += 1
+
+    async def run_one(index, item):
+        async with semaphore:
+            result = await worker(index, item)
+        finished[index] = result
+        flush()
+        return result
+
+    return await asyncio.gather(*(run_one(i, item) for i, item in enumerate(items)))
+
+
+class TokenBucket:
+    """令牌桶限流（单事件循环内使用）"""
+
+    def __init__(self, rate, burst=None):
+        """
+        参数:
+            rate: 每秒补充的令牌数，<= 0 表示不限流
+            burst: 桶容量（默认等于 rate，至少为 1）
+        """
+        self.rate = float(rate or 0)
+        self.capacity = max(1.0, float(burst if burst is not None else self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        """取一个令牌，不足时等待"""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitOpenError(Exception):
+    """熔断中，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续 threshold 次失败后打开，cooldown 秒内的请求直接失败；
+    冷却结束后放行一次试探请求（半开），成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, threshold=DEFAULT_BREAKER_THRESHOLD, cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = float(cooldown)
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_call(self):
+        """调用前检查，熔断中抛出 CircuitOpenError"""
+        if self.state == 'closed':
+            return
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = 'half-open'
+        if self.state == 'half-open' and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(f"连续失败 {self.failures} 次，已熔断，暂停请求")
+
+    def record_success(self):
+        self.failures = 0
+        self.state = 'closed'
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half-open' or self.failures >= self.threshold:
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class CallFailed(Exception):
+    """重试后仍然失败；attempts 为实际调用次数"""
+
+    def __init__(self, error, attempts):
+        super().__init__(str(error))
+        self.error = error
+        self.attempts = attempts
+
+
+class ResilientCaller:
+    """限流 + 重试 + 熔断的调用包装"""
+
+    def __init__(self, rps=DEFAULT_RPS, retries=DEFAULT_RETRIES, is_transient=None,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 breaker=None, concurrency=None):
+        """
+        参数:
+            rps: 每秒最多发起的请求数，<= 0 表示不限流
+            retries: 瞬时错误的最大重试次数
+            is_transient: 判断异常是否可重试的函数，None 表示都不重试
+            breaker: CircuitBreaker 实例，None 表示使用默认熔断参数
+            concurrency: 同时进行中的请求上限（分句并发时防止请求数成倍放大），None 表示不限
+        """
+        self.limiter = TokenBucket(rps)
+        self.retries = max(0, int(retries))
+        self.is_transient = is_transient or (lambda error: False)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.concurrency = concurrency
+        # 信号量在事件循环内首次调用时创建
+        self._slots = None
+
+    def backoff(self, attempt):
+        """第 attempt 次失败后的等待时间（full jitter 指数退避）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def _run(self, func):
+        if not self.concurrency:
+            return await func()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(1, int(self.concurrency)))
+        async with self._slots:
+            return await func()
+
+    async def call(self, func):
+        """
+        调用协程函数 func()
+
+        返回:
+            (result, attempts)
+
+        异常:
+            CallFailed: 非瞬时错误、重试耗尽或熔断中
+        """
+        attempts = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                raise CallFailed(e, attempts)
+
+            await self.limiter.acquire()
+            attempts += 1
+            try:
+                result = await self._run(func)
+            except Exception as e:
+                transient = self.is_transient(e)
+                if transient:
+                    self.breaker.record_failure()
+                else:
+                    # 非瞬时错误（如参数无效）说明服务可达，不计入熔断
+                    self.breaker.record_success()
+                if not transient or attempts > self.retries:
+                    raise CallFailed(e, attempts)
+                await asyncio.sleep(self.backoff(attempts))
+                continue
+
+            self.breaker.record_success()
+            return result, attempts
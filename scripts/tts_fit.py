@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+按分镜目标时长拟合 TTS 语速
+
+背景：
+    分镜每一幕的标题都写了目标时长（### 第一幕：开场（8 秒）），
+    读白合成出来偏长时只能回头改动画、重新渲染。
+
+功能：
+- 合成前预测读白时长：有效字数 / 每秒字数 + 标点停顿，按语速缩放，首尾静音不随语速变化
+- 预测模型在运行中按实际合成结果校准（实测 / 预测 的比例），后面的场景预测越来越准
+- 缓存里已有同一读白在某些语速下的结果时（逐个整数语速查询缓存键，只算哈希不读文件），
+  其中有达标的直接选用，否则用实测时长外推，不再靠文本模型；重复运行因此结果一致且全部命中缓存
+- 每幕选一个语速使时长落在目标的容差内；语速限制在 [MIN_RATE, MAX_RATE] 之间，避免失真
+- 实测仍超出容差时按实测时长重新计算语速再合成一次（经缓存，下次运行直接命中），
+  最多 MAX_FIT_ATTEMPTS 次
+
+使用：
+    from tts_fit import DurationModel, fit_rate
+
+    model = DurationModel()
+    result, rate = await fit_rate(synthesize_at, text, target, model, known=lookup)
+    # synthesize_at(rate) -> {'duration': 秒, ...}；known(rate) -> 缓存中的时长或 None
+"""
+
+from tts_backends import PUNCTUATION_PAUSES
+
+
+# 默认每秒字数（Edge TTS 晓晓 +0% 的经验值），运行中按实测校准
+DEFAULT_CHARS_PER_SECOND = 4.5
+
+# 首尾静音（秒），不随语速变化
+EDGE_SILENCE = 0.2
+
+# 不发音的符号
+SILENT_MARKS = '“”‘’「」『』（）()《》"\'…—-'
+
+# 语速范围（百分比）：放慢太多拖沓，加快太多吞字
+MIN_RATE = -15
+MAX_RATE = 30
+
+# 默认相对容差：|实测 - 目标| <= 目标 × 容差 视为达标
+DEFAULT_FIT_TOLERANCE = 0.05
+
+# 单幕最多合成次数（首次 + 按实测修正）
+MAX_FIT_ATTEMPTS = 3
+
+
+def parse_rate(rate):
+    """'+10%' -> 10.0，无法解析时为 0"""
+    try:
+        return float(str(rate).strip().rstrip('%'))
+    except ValueError:
+        return 0.0
+
+
+def format_rate(percent):
+    """10 -> '+10%'，-5 -> '-5%'"""
+    percent = int(round(percent))
+    return f"{percent:+d}%"
+
+
+def speed_of(rate):
+    """语速字符串 -> 相对 +0% 的倍速"""
+    return max(0.1, 1 + parse_rate(rate) / 100)
+
+
+def text_body(text, chars_per_second=DEFAULT_CHARS_PER_SECOND):
+    """文本在 +0% 语速下的发音时长（不含首尾静音）"""
+    body = 0.0
+    for c in text or '':
+        if c.isspace() or c in SILENT_MARKS:
+            continue
+        body += PUNCTUATION_PAUSES.get(c, 1 / chars_per_second)
+    return body
+
+
+def within(duration, target, tolerance=DEFAULT_FIT_TOLERANCE):
+    """时长是否落在目标的容差内"""
+    return abs(duration - target) <= target * tolerance
+
+
+def rate_for(body, target):
+    """
+    使发音时长 body（+0% 语速）加首尾静音等于 target 的语速字符串，限制在语速范围内
+    """
+    available = max(target - EDGE_SILENCE, 0.1)
+    percent = (body / available - 1) * 100
+    return format_rate(min(MAX_RATE, max(MIN_RATE, percent)))
+
+
+def measured_body(rate, duration):
+    """由某语速下的实测时长反推 +0% 发音时长"""
+    return max(0.0, duration - EDGE_SILENCE) * speed_of(rate)
+
+
+class DurationModel:
+    """读白时长预测（按实测结果校准）"""
+
+    def __init__(self, chars_per_second=DEFAULT_CHARS_PER_SECOND):
+        self.chars_per_second = chars_per_second
+        self.observed = 0.0
+        self.predicted = 0.0
+
+    @property
+    def scale(self):
+        """实测 / 预测（无观测时为 1）"""
+        return self.observed / self.predicted if self.predicted > 0 else 1.0
+
+    def body(self, text):
+        """校准后的 +0% 发音时长"""
+        return text_body(text, self.chars_per_second) * self.scale
+
+    def predict(self, text, rate='+0%'):
+        """预测 text 在 rate 语速下的时长（秒）"""
+        return EDGE_SILENCE + self.body(text) / speed_of(rate)
+
+    def observe(self, text, rate, duration):
+        """记录一次实测结果"""
+        self.observed += measured_body(rate, duration)
+        self.predicted += text_body(text, self.chars_per_second)
+
+
+async def fit_rate(synthesize_at, text, target, model, known=None,
+                   tolerance=DEFAULT_FIT_TOLERANCE, base_rate='+0%'):
+    """
+    为一段读白选语速并合成，使时长落在 target 的容差内
+
+    参数:
+        synthesize_at: 协程函数 synthesize_at(rate) -> {'duration': 秒, ...}（应经过缓存）
+        target: 目标时长（秒），None 或 <= 0 时按 base_rate 合成，不拟合
+        model: DurationModel，合成结果会用于校准
+        known: 可选 known(rate) -> 缓存中该语速的实测时长或 None，用于代替文本预测
+               （base_rate 不是整数百分比时不会被查询）
+        base_rate: 不需要调整时使用的语速
+
+    返回:
+        (result, rate)：最后一次合成的结果及其语速
+    """
+    if not target or target <= 0:
+        return await synthesize_at(base_rate), base_rate
+
+    # 缓存中已有的语速：有达标的直接选最接近目标的，否则以实测时长为准外推
+    cached = {}
+    if known:
+        for percent in range(MIN_RATE, MAX_RATE + 1):
+            duration = known(format_rate(percent))
+            if duration is not None:
+                cached[format_rate(percent)] = duration
+    hits = [r for r, d in cached.items() if within(d, target, tolerance)]
+    if hits:
+        rate = min(hits, key=lambda r: (abs(cached[r] - target), abs(parse_rate(r) - parse_rate(base_rate))))
+    elif cached:
+        rate = rate_for(measured_body(*next(iter(cached.items()))), target)
+    else:
+        predicted = model.predict(text, base_rate)
+        rate = base_rate if within(predicted, target, tolerance) else rate_for(model.body(text), target)
+
+    tried = set()
+    result = None
+    for _ in range(MAX_FIT_ATTEMPTS):
+        tried.add(rate)
+        result = await synthesize_at(rate)
+        model.observe(text, rate, result['duration'])
+        if within(result['duration'], target, tolerance):
+            break
+        # 按实测修正；语速已到边界或与试过的相同时不再重试
+        rate_next = rate_for(measured_body(rate, result['duration']), target)
+        if rate_next in tried:
+            break
+        rate = rate_next
+    return result, rate
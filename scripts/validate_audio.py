@@ -6,11 +6,17 @@
 1. 读取分镜脚本的音频清单部分
 2. 验证音频文件存在且时长正常
 3. 生成/更新时长信息到JSON
-4. 更新分镜脚本的时长列
+4. 更新分镜脚本的时长列（只改写变化的单元格，无变化不写文件，临时文件 + rename 原子替换）
 5. 如果缺少长度或长度异常，报错提醒
 
 使用：
     python validate_audio.py 分镜.md ./audio
+    python validate_audio.py 分镜.md ./audio --jobs 16     # 并发探测线程数
+    python validate_audio.py 分镜.md ./audio --no-cache    # 忽略探测缓存，全部重新读取
+    python validate_audio.py 分镜.md ./audio --loudness    # 同时测量响度，记录每个文件的增益
+
+探测结果缓存在 audio/.probe_cache.json（以 路径/大小/mtime_ns 为键），
+未变化的文件重复验证时不再打开。
 
 输出：
     - 更新后的分镜.md（填充时长列）
@@ -19,123 +25,54 @@
 
 import sys
 import os
-import re
 import json
+import shutil
 from pathlib import Path
 
+from audio_probe import probe_many, ProbeCache, DEFAULT_PROBE_JOBS
+from storyboard import compile_storyboard, parse_storyboard_text, replace_cell
+
 
 def parse_storyboard(storyboard_path):
     """
-    解析分镜脚本，提取音频清单部分
+    解析分镜脚本，提取音频清单部分（由 storyboard.py 编译，按内容哈希缓存）
 
     返回: list of dict，每个dict包含幕号、文件名、读白文本等
     """
     with open(storyboard_path, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    # 查找音频生成清单表格
-    # 支持格式：| 幕号 | 文件名 | 读白文本 | 时长 | 说话人 | 情感 |
-    pattern = r'##\s*音频生成清单.*?(?=##|$)'
-    match = re.search(pattern, content, re.DOTALL)
-
-    if not match:
+    # 支持格式：| 幕号 | 文件名 | 读白文本 | 时长 | 说话人 | 情感 |（按表头识别列）
+    table = compile_storyboard(storyboard_path)['audio_table']
+    if table is None:
         print("Warning: 未找到音频生成清单部分")
         return [], content
 
-    section = match.group(0)
-    lines = section.split('\n')
-
     audio_list = []
-    for line in lines:
-        line = line.strip()
-        # 匹配表格行
-        if line.startswith('|') and not line.startswith('|---'):
-            parts = [p.strip() for p in line.split('|') if p.strip()]
-            if len(parts) >= 2 and parts[0].isdigit():
-                # 解析表格行
-                scene_num = int(parts[0])
-                filename = parts[1] if len(parts) > 1 else ""
-                text = parts[2] if len(parts) > 2 else ""
-                duration_str = parts[3] if len(parts) > 3 else ""
-                speaker = parts[4] if len(parts) > 4 else "xiaoxiao"
-                emotion = parts[5] if len(parts) > 5 else "平和"
-
-                # 解析时长（可能是空字符串或数字）
-                duration = None
-                if duration_str:
-                    try:
-                        # 支持格式：8, 8s, 8.5, 8.5s, 8秒
-                        duration = float(duration_str.replace('s', '').replace('秒', ''))
-                    except ValueError:
-                        duration = None
-
-                audio_list.append({
-                    'scene': scene_num,
-                    'file': filename,
-                    'text': text,
-                    'duration': duration,
-                    'speaker': speaker,
-                    'emotion': emotion
-                })
+    for row in table['rows']:
+        audio_list.append({
+            'scene': row['scene'],
+            'file': row['file'],
+            'text': row['text'],
+            'duration': row['duration'],
+            'speaker': row['speaker'],
+            'emotion': row['emotion']
+        })
 
     return audio_list, content
 
 
-def get_audio_duration(audio_path):
-    """
-    获取音频文件时长（秒）
-
-    尝试使用以下方法（按优先级）：
-    1. mutagen（支持多种格式）
-    2. wave（仅支持wav）
-    3. ffprobe（需要ffmpeg）
-    """
-    # 尝试 mutagen
-    try:
-        from mutagen.mp3 import MP3
-        from mutagen.wavpack import WavPack
-        audio = MP3(audio_path)
-        return audio.info.length
-    except:
-        pass
-
-    try:
-        from mutagen.wave import WAVE
-        audio = WAVE(audio_path)
-        return audio.info.length
-    except:
-        pass
-
-    # 尝试 wave 模块
-    try:
-        import wave
-        with wave.open(audio_path, 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            return frames / float(rate)
-    except:
-        pass
-
-    # 尝试 ffprobe
-    try:
-        import subprocess
-        result = subprocess.run(
-            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-             '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
-            capture_output=True, text=True
-        )
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-    except:
-        pass
-
-    return None
-
-
-def validate_audio_files(audio_list, audio_dir):
+def validate_audio_files(audio_list, audio_dir, jobs=DEFAULT_PROBE_JOBS, use_cache=True,
+                         probe_cache=None, loudness_target=None):
     """
     验证音频文件
 
+    文件头探测在线程池中并发进行（jobs），结果按 (路径, 大小, mtime_ns)
+    缓存在音频目录的旁路文件中；use_cache=False 时全部重新探测。
+    长驻进程（watch.py）可传入已加载的 probe_cache，避免每轮重新读取缓存文件。
+    loudness_target（LUFS）不为 None 时，同时解码测量积分响度，为每个文件记录
+    loudness / peak / gain（最终合成时施加的增益，dB）；测量结果同样缓存。
+
     返回: (valid, errors, updated_list)
     - valid: bool，是否全部通过
     - errors: list of str，错误信息
@@ -145,6 +82,19 @@ def validate_audio_files(audio_list, audio_dir):
     updated_list = []
     valid = True
 
+    cache = probe_cache
+    if cache is None and use_cache:
+        cache = ProbeCache.for_dir(audio_dir)
+    paths = [os.path.join(audio_dir, item['file']) for item in audio_list]
+    probed = probe_many(paths, jobs=jobs, cache=cache)
+    if loudness_target is not None:
+        from audio_loudness import measure_many, gain_for
+        for error in measure_many(probed, jobs, cache):
+            errors.append(f"⚠️ 警告：响度测量失败: {error}")
+    if cache is not None:
+        cache.save()
+        print(f"{cache.summary()}\n")
+
     for item in audio_list:
         scene_num = item['scene']
         filename = item['file']
@@ -158,7 +108,8 @@ def validate_audio_files(audio_list, audio_dir):
             continue
 
         # 获取实际时长
-        actual_duration = get_audio_duration(audio_path)
+        info = probed.get(audio_path)
+        actual_duration = info['duration'] if info else None
 
         if actual_duration is None:
             errors.append(f"❌ 错误：第{scene_num}幕音频时长获取失败: {filename}")
@@ -181,25 +132,49 @@ def validate_audio_files(audio_list, audio_dir):
         # 更新时长
         updated_item = item.copy()
         updated_item['duration'] = round(actual_duration, 2)
+        if loudness_target is not None and 'loudness' in info:
+            updated_item['loudness'] = info['loudness']
+            updated_item['peak'] = info['peak']
+            updated_item['gain'] = gain_for(info, loudness_target)
         updated_list.append(updated_item)
 
+        level = ""
+        if updated_item.get('loudness') is not None:
+            level = f", {updated_item['loudness']:.1f} LUFS, 增益 {updated_item['gain']:+.1f} dB"
         try:
-            print(f"✓ 第{scene_num}幕: {filename} - {actual_duration:.2f}s")
+            print(f"✓ 第{scene_num}幕: {filename} - {actual_duration:.2f}s{level}")
         except UnicodeEncodeError:
-            print(f"[OK] 第{scene_num}幕: {filename} - {actual_duration:.2f}s")
+            print(f"[OK] 第{scene_num}幕: {filename} - {actual_duration:.2f}s{level}")
 
     return valid, errors, updated_list
 
 
+# 合成与后处理阶段写入的字段，重新生成 audio_info.json 时对同一文件、同一文本的条目予以保留
+CARRIED_FIELDS = ('boundaries', 'chunks', 'pauses', 'trim', 'attempts', 'pcm')
+
+
 def generate_audio_info_json(updated_list, audio_dir):
-    """生成 audio_info.json 文件"""
+    """生成 audio_info.json 文件（保留已有条目中词边界、停顿等合成阶段写入的字段）"""
+    output_path = os.path.join(audio_dir, 'audio_info.json')
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            previous = {item.get('file'): item for item in json.load(f).get('files', [])}
+    except (OSError, ValueError, AttributeError):
+        previous = {}
+
+    files = []
+    for item in updated_list:
+        old = previous.get(item.get('file'))
+        if old is not None and old.get('text') == item.get('text'):
+            item = dict(item, **{k: old[k] for k in CARRIED_FIELDS if k in old and k not in item})
+        files.append(item)
+
     output = {
-        'files': updated_list,
-        'total_duration': sum(item.get('duration', 0) or 0 for item in updated_list),
-        'count': len(updated_list)
+        'files': files,
+        'total_duration': sum(item.get('duration', 0) or 0 for item in files),
+        'count': len(files)
     }
 
-    output_path = os.path.join(audio_dir, 'audio_info.json')
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
 
@@ -207,59 +182,92 @@ def generate_audio_info_json(updated_list, audio_dir):
     return output_path
 
 
-def update_storyboard(storyboard_path, original_content, updated_list):
-    """更新分镜脚本的时长列"""
-    lines = original_content.split('\n')
-    new_lines = []
-
-    # 追踪当前处理的音频列表索引
-    audio_idx = 0
-    in_audio_section = False
+def update_storyboard(storyboard_path, updated_list):
+    """
+    更新分镜脚本的时长列
 
-    for line in lines:
-        # 检测是否进入音频清单部分
-        if '音频生成清单' in line:
-            in_audio_section = True
+    按幕号（同一幕有多条时再按文件名）索引音频清单的表格行，只改写数值变化的
+    时长单元格，其余字节保持不变；没有变化时不写文件（mtime 不变，不会唤醒监听
+    分镜的下游工具），有变化时写临时文件后 rename，原子替换。
 
-        if in_audio_section and line.startswith('|') and not line.startswith('|---'):
-            parts = [p.strip() for p in line.split('|')]
-            # 过滤空字符串
-            parts = [p for p in parts if p]
+    返回: 改写的行数
+    """
+    # newline='' 保留原文件的换行符（CRLF 不会被改成 LF）
+    with open(storyboard_path, 'r', encoding='utf-8', newline='') as f:
+        content = f.read()
 
-            if len(parts) >= 2 and parts[0].isdigit() and audio_idx < len(updated_list):
-                scene_num = int(parts[0])
-                if scene_num == updated_list[audio_idx]['scene']:
-                    # 更新时长列
-                    duration = updated_list[audio_idx].get('duration')
-                    if duration is not None:
-                        # 重建表格行
-                        new_parts = parts[:3]  # 幕号、文件名、读白文本
-                        new_parts.append(f"{duration:.1f}")  # 时长
-                        if len(parts) > 4:
-                            new_parts.append(parts[4])  # 说话人
-                        if len(parts) > 5:
-                            new_parts.append(parts[5])  # 情感
+    table = parse_storyboard_text(content)['audio_table']
+    if table is None or 'duration' not in table['columns']:
+        print(f"Warning: 分镜中没有可回填的时长列: {storyboard_path}")
+        return 0
+
+    rows_by_scene = {}
+    for row in table['rows']:
+        rows_by_scene.setdefault(row['scene'], []).append(row)
+
+    lines = content.split('\n')
+    column = table['columns']['duration']
+    changed = 0
+    for item in updated_list:
+        duration = item.get('duration')
+        if duration is None:
+            continue
+        rows = rows_by_scene.get(item['scene'], [])
+        row = next((r for r in rows if r['file'] == item['file']), rows[0] if len(rows) == 1 else None)
+        if row is None:
+            print(f"Warning: 分镜中找不到第{item['scene']}幕的音频行: {item['file']}")
+            continue
 
-                        line = '| ' + ' | '.join(new_parts) + ' |'
-                    audio_idx += 1
+        value = f"{duration:.1f}"
+        if row['duration'] == float(value):
+            continue
+        lines[row['line']] = replace_cell(lines[row['line']], column, value)
+        changed += 1
 
-        new_lines.append(line)
+    if not changed:
+        print(f"时长无变化，未改写: {storyboard_path}")
+        return 0
 
-    # 写回文件
-    with open(storyboard_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(new_lines))
+    tmp = f"{storyboard_path}.tmp"
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        f.write('\n'.join(lines))
+    shutil.copymode(storyboard_path, tmp)
+    os.replace(tmp, storyboard_path)
 
-    print(f"已更新: {storyboard_path}")
+    print(f"已更新: {storyboard_path}（{changed} 行时长）")
+    return changed
 
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python validate_audio.py <分镜.md> [audio_dir]")
+        print("Usage: python validate_audio.py <分镜.md> [audio_dir] [--jobs N] [--no-cache] "
+              "[--loudness] [--target-lufs LUFS]")
         print("Example: python validate_audio.py 分镜.md ./audio")
         sys.exit(1)
 
     storyboard_path = sys.argv[1]
-    audio_dir = sys.argv[2] if len(sys.argv) > 2 else "./audio"
+    audio_dir = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else "./audio"
+
+    # 解析选项
+    jobs = DEFAULT_PROBE_JOBS
+    use_cache = '--no-cache' not in sys.argv
+    loudness_target = None
+    for i, arg in enumerate(sys.argv):
+        if arg == '--jobs' and i + 1 < len(sys.argv):
+            try:
+                jobs = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                print(f"Error: --jobs 需要整数: {sys.argv[i + 1]}")
+                sys.exit(1)
+        if arg == '--target-lufs' and i + 1 < len(sys.argv):
+            try:
+                loudness_target = float(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --target-lufs 需要数字: {sys.argv[i + 1]}")
+                sys.exit(1)
+    if '--loudness' in sys.argv and loudness_target is None:
+        from audio_loudness import DEFAULT_TARGET_LUFS
+        loudness_target = DEFAULT_TARGET_LUFS
 
     # 检查文件
     if not os.path.exists(storyboard_path):
@@ -274,7 +282,7 @@ def main():
     print(f"音频目录: {audio_dir}\n")
 
     # 解析分镜
-    audio_list, original_content = parse_storyboard(storyboard_path)
+    audio_list, _ = parse_storyboard(storyboard_path)
 
     if not audio_list:
         print("未找到音频清单，请检查分镜脚本格式")
@@ -283,7 +291,8 @@ def main():
     print(f"找到 {len(audio_list)} 个音频条目\n")
 
     # 验证音频
-    valid, errors, updated_list = validate_audio_files(audio_list, audio_dir)
+    valid, errors, updated_list = validate_audio_files(audio_list, audio_dir, jobs, use_cache,
+                                                       loudness_target=loudness_target)
 
     # 输出错误
     if errors:
@@ -299,7 +308,7 @@ def main():
 
     # 更新分镜
     if any(item.get('duration') is not None for item in updated_list):
-        update_storyboard(storyboard_path, original_content, updated_list)
+        update_storyboard(storyboard_path, updated_list)
 
     # 最终结果
     print("\n" + "="*50)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+分镜监听：编辑分镜后自动补配音、验证并回填时长
+
+功能：
+- 轮询分镜文件的 (大小, mtime_ns)，最后一次改动后静默 --debounce 秒才处理，
+  编辑器连续保存只触发一轮
+- 只重新编译改动过的分镜；编译结果按内容哈希缓存，只改了时间戳时不做任何事
+- 对比上一轮的音频清单，只重新合成读白/声音变化或音频缺失的条目，
+  也只重新验证这些条目
+- TTS 后端、限流器、TTS 缓存索引、探测缓存常驻内存，每轮只付出改动部分的开销
+- 每轮结束写出 audio/audio_info.json，并把实测时长回填到分镜（无变化时不写文件）
+
+使用：
+    python watch.py 分镜.md                       # 音频目录默认为分镜同目录下的 audio/
+    python watch.py 分镜.md --audio-dir ./audio --jobs 8
+    python watch.py proj_a proj_b                 # 目录：自动查找其中的分镜
+    python watch.py 分镜.md --once                # 同步一轮后退出
+    python watch.py 分镜.md --backend offline     # 离线替身后端，无需网络
+
+Ctrl+C 退出，退出前保存缓存索引。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+from tts_engine import run_bounded, ResilientCaller, DEFAULT_JOBS, DEFAULT_RPS, DEFAULT_RETRIES
+from tts_cache import TTSCache, DEFAULT_CACHE_SIZE_MB
+from tts_backends import create_backend, is_transient, TTSBackendError
+from tts_chunks import DEFAULT_CHUNK_CHARS, DEFAULT_CHUNK_GAP
+from generate_tts import VOICE_MAP, generate_audio
+from validate_audio import validate_audio_files, generate_audio_info_json, update_storyboard
+from audio_probe import ProbeCache, DEFAULT_PROBE_JOBS
+from storyboard import compile_storyboard, find_storyboard
+
+
+# 轮询间隔（秒）：只 stat 分镜文件，开销可以忽略
+DEFAULT_INTERVAL = 0.5
+
+# 去抖时间（秒）：最后一次改动后静默这么久才开始处理
+DEFAULT_DEBOUNCE = 1.0
+
+
+class WatchedStoryboard:
+    """一个被监听的分镜及其常驻状态"""
+
+    def __init__(self, path, audio_dir):
+        self.path = Path(path)
+        self.audio_dir = Path(audio_dir)
+        self.signature = None
+        self.changed_at = None
+        self.hash = None
+        # 文件名 -> (读白文本, 声音)：当前音频对应的内容，声音为 None 表示未知
+        self.synthesized = {}
+        # 文件名 -> 验证后的条目（含实测时长）
+        self.validated = {}
+        self.probe_cache = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def poll(self, now, debounce):
+        """检查是否有改动；改动后静默 debounce 秒时返回 True"""
+        signature = self._stat()
+        if signature != self.signature:
+            self.signature = signature
+            self.changed_at = now
+            return False
+        if signature is None or self.changed_at is None or now - self.changed_at < debounce:
+            return False
+        self.changed_at = None
+        return True
+
+    def load_previous(self):
+        """从已有的 audio_info.json 恢复上次的合成内容，重启后不必全部重新合成"""
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        self.probe_cache = ProbeCache.for_dir(str(self.audio_dir))
+        try:
+            with open(self.audio_dir / 'audio_info.json', 'r', encoding='utf-8') as f:
+                files = json.load(f).get('files', [])
+        except (OSError, ValueError):
+            return
+        for item in files:
+            if item.get('file') and item.get('text'):
+                self.synthesized[item['file']] = (item['text'], None)
+
+    def plan(self, rows, default_voice):
+        """
+        对比上一轮，返回 (entries, stale)
+
+        entries: 当前清单中可合成的条目（按表格顺序）
+        stale: 需要重新合成的条目（读白或声音变化、音频文件缺失）
+        """
+        entries, stale = [], []
+        for row in rows:
+            if not row['file'] or not row['text']:
+                continue
+            voice = row['speaker'] if row['speaker'] in VOICE_MAP else default_voice
+            entry = {'scene': row['scene'], 'file': row['file'], 'text': row['text'],
+                     'duration': row['duration'], 'speaker': row['speaker'],
+                     'emotion': row['emotion'], 'voice': voice}
+            entries.append(entry)
+
+            previous = self.synthesized.get(entry['file'])
+            if (previous is None or previous[0] != entry['text']
+                    or previous[1] not in (None, voice)
+                    or not (self.audio_dir / entry['file']).exists()):
+                stale.append(entry)
+        return entries, stale
+
+
+async def synthesize(entries, audio_dir, settings, cache, backend, caller):
+    """合成条目，返回失败的文件名集合"""
+    failed = set()
+
+    async def worker(index, entry):
+        return await generate_audio(entry['text'], str(audio_dir / entry['file']), entry['voice'],
+                                    settings['rate'], settings['pitch'], cache, backend, caller,
+                                    settings['chunk_chars'], settings['chunk_gap'])
+
+    def report(index, entry, result):
+        if not result['success']:
+            failed.add(entry['file'])
+            print(f"  ✗ 第{entry['scene']}幕: {entry['file']} - {result['error']}")
+            return
+        source = "，缓存" if result['cached'] else ""
+        print(f"  ✓ 第{entry['scene']}幕: {entry['file']} ({result['duration']:.2f}秒{source})")
+
+    await run_bounded(entries, worker, jobs=settings['jobs'], on_done=report)
+    return failed
+
+
+async def sync(board, settings, cache, backend, caller):
+    """处理一个分镜的一轮改动"""
+    try:
+        ir = compile_storyboard(board.path)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Warning: 无法读取分镜 {board.path}: {e}")
+        return
+    if ir['hash'] == board.hash:
+        return
+    first = board.hash is None
+    board.hash = ir['hash']
+
+    table = ir['audio_table']
+    if table is None:
+        print(f"[{time.strftime('%H:%M:%S')}] {board.path.name}: 未找到音频生成清单")
+        return
+
+    entries, stale = board.plan(table['rows'], settings['voice'])
+    current = {entry['file'] for entry in entries}
+    for name in list(board.synthesized):
+        if name not in current:
+            del board.synthesized[name]
+            board.validated.pop(name, None)
+
+    # 首轮全部验证一次（探测缓存使未改动的文件几乎零成本），之后只验证改动条目
+    to_validate = entries if first else stale
+    if not to_validate:
+        return
+
+    print(f"\n[{time.strftime('%H:%M:%S')}] {board.path.name}: "
+          f"{len(entries)} 条，重新合成 {len(stale)} 条")
+
+    failed = set()
+    if stale:
+        failed = await synthesize(stale, board.audio_dir, settings, cache, backend, caller)
+        for entry in stale:
+            if entry['file'] in failed:
+                board.synthesized.pop(entry['file'], None)
+            else:
+                board.synthesized[entry['file']] = (entry['text'], entry['voice'])
+        if cache is not None:
+            cache.save()
+
+    valid, errors, updated = validate_audio_files(
+        [{k: v for k, v in entry.items() if k != 'voice'} for entry in to_validate],
+        str(board.audio_dir), settings['probe_jobs'], probe_cache=board.probe_cache)
+    board.probe_cache.save()
+    for item in updated:
+        board.validated[item['file']] = item
+    for error in errors:
+        print(error)
+
+    # 合并为完整清单：未改动的条目沿用上一轮验证的时长
+    full_list = []
+    for entry in entries:
+        item = {k: v for k, v in entry.items() if k != 'voice'}
+        previous = board.validated.get(entry['file'])
+        if previous is not None and previous.get('duration') is not None:
+            item['duration'] = previous['duration']
+        full_list.append(item)
+
+    generate_audio_info_json(full_list, str(board.audio_dir))
+    update_storyboard(str(board.path), full_list)
+
+    status = "✅ 验证通过" if valid and not failed else "❌ 存在问题，修改分镜后会自动重试"
+    total = sum(item.get('duration') or 0 for item in full_list)
+    print(f"{status}（总时长 {total:.1f}秒）")
+
+
+async def watch(boards, settings, cache, backend, once=False):
+    """轮询循环；once=True 时每个分镜同步一轮后返回"""
+    # 限流器/熔断器/并发信号量与事件循环绑定，整个监听过程共用一份
+    caller = ResilientCaller(rps=settings['rps'], retries=settings['retries'],
+                             is_transient=is_transient, concurrency=settings['jobs'])
+    for board in boards:
+        board.load_previous()
+
+    if once:
+        for board in boards:
+            await sync(board, settings, cache, backend, caller)
+        return
+
+    while True:
+        now = time.monotonic()
+        for board in boards:
+            if board.poll(now, settings['debounce']):
+                await sync(board, settings, cache, backend, caller)
+        await asyncio.sleep(settings['interval'])
+
+
+def resolve_boards(paths, audio_dir=None):
+    """命令行路径 -> WatchedStoryboard 列表（目录中自动查找分镜）"""
+    boards = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            found = find_storyboard(path)
+            if found is None:
+                print(f"Warning: 目录中未找到分镜，跳过: {path}")
+                continue
+            path = found
+        elif not path.is_file():
+            print(f"Warning: 分镜文件不存在，跳过: {path}")
+            continue
+        boards.append(WatchedStoryboard(path, audio_dir or path.resolve().parent / 'audio'))
+    return boards
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='监听分镜改动，自动增量配音、验证并回填时长',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+示例:
+    python scripts/watch.py 分镜.md                   # 音频目录默认为分镜同目录下的 audio/
+    python scripts/watch.py 分镜.md --audio-dir ./audio
+    python scripts/watch.py proj_a proj_b --jobs 8    # 同时监听多个项目
+    python scripts/watch.py 分镜.md --once            # 同步一轮后退出
+        '''
+    )
+    parser.add_argument('paths', nargs='+', help='分镜文件或项目目录')
+    parser.add_argument('--audio-dir', help='音频目录（仅监听一个分镜时可用，默认：分镜同目录下的 audio/）')
+    parser.add_argument('--voice', default='xiaoxiao', choices=list(VOICE_MAP.keys()),
+                        help='说话人列为空或无法识别时使用的声音（默认：xiaoxiao）')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f'并发合成数（默认：{DEFAULT_JOBS}）')
+    parser.add_argument('--probe-jobs', type=int, default=DEFAULT_PROBE_JOBS,
+                        help=f'并发探测线程数（默认：{DEFAULT_PROBE_JOBS}）')
+    parser.add_argument('--rate', default='+0%', help='语速（默认：+0%%）')
+    parser.add_argument('--pitch', default='+0Hz', help='音调（默认：+0Hz）')
+    parser.add_argument('--cache-dir', default=str(TTSCache.default_dir()),
+                        help='缓存目录（默认：全局 ~/.cache/tutor/tts）')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f'缓存上限 MB（默认：{DEFAULT_CACHE_SIZE_MB}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用 TTS 缓存')
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                        help=f'每秒最多发起的 TTS 请求数（默认：{DEFAULT_RPS:g}，0 为不限流）')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'瞬时错误的最大重试次数（默认：{DEFAULT_RETRIES}）')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_CHARS,
+                        help='超过该字数的文本分句并发合成（默认：0 不切分）')
+    parser.add_argument('--chunk-gap', type=float, default=DEFAULT_CHUNK_GAP,
+                        help=f'分句拼接的句间静音秒数（默认：{DEFAULT_CHUNK_GAP:g}）')
+    parser.add_argument('--backend', default='edge',
+                        help='TTS 后端：edge（默认）或 offline[:latency=秒,fail=失败率,...]')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'轮询间隔秒数（默认：{DEFAULT_INTERVAL:g}）')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help=f'最后一次改动后等待多久再处理（默认：{DEFAULT_DEBOUNCE:g} 秒）')
+    parser.add_argument('--once', action='store_true', help='同步一轮后退出')
+    args = parser.parse_args()
+
+    if args.audio_dir and len(args.paths) > 1:
+        print("Error: --audio-dir 只能在监听单个分镜时使用")
+        sys.exit(1)
+
+    boards = resolve_boards(args.paths, args.audio_dir)
+    if not boards:
+        print("Error: 没有可监听的分镜")
+        sys.exit(1)
+
+    try:
+        backend = create_backend(args.backend)
+    except TTSBackendError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    settings = {
+        'voice': args.voice,
+        'jobs': max(1, args.jobs),
+        'probe_jobs': max(1, args.probe_jobs),
+        'rate': args.rate,
+        'pitch': args.pitch,
+        'rps': args.rps,
+        'retries': args.retries,
+        'chunk_chars': args.chunk,
+        'chunk_gap': args.chunk_gap,
+        'interval': max(0.05, args.interval),
+        'debounce': max(0.0, args.debounce),
+    }
+    cache = None if args.no_cache else TTSCache(args.cache_dir, args.cache_size)
+
+    print(f"监听 {len(boards)} 个分镜 (后端: {backend.name}, 并发: {settings['jobs']})")
+    for board in boards:
+        print(f"  {board.path} → {board.audio_dir}")
+    if not args.once:
+        print("Ctrl+C 退出")
+
+    try:
+        asyncio.run(watch(boards, settings, cache, backend, once=args.once))
+    except KeyboardInterrupt:
+        print("\n已停止监听")
+    finally:
+        if cache is not None:
+            cache.save()
+
+
+if __name__ == '__main__':
+    main()
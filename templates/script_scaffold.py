@@ -10,7 +10,8 @@ Math Video Scene Scaffold
 3. 运行 manim -pqh script.py MathScene
 
 常见问题：
-- 渲染卡住：通常是音频文件问题，尝试禁用 add_scene_audio
+- 渲染卡住：通常是音频文件问题（MP3 数据在渲染进程内解码），先运行
+  scripts/audio_pcm.py audio 生成 PCM WAV，add_scene_audio 会自动改用 audio/pcm/ 中的文件
 - deepcopy 错误：不要存储 self 引用到 Mobject 中
 - 视频未生成：检查 copy_video_to_root 路径是否正确
 """
@@ -61,7 +62,12 @@ class MathScene(Scene):
         super().__init__(**kwargs)
         self.audio_dir = "audio"
         self.audio_info_file = os.path.join(self.audio_dir, "audio_info.json")
+        self.audio_boundaries = {}
+        self.audio_pauses = {}
+        self.audio_pcm = {}
         self.audio_timings = self._load_audio_timings()
+        self.current_scene_num = None
+        self.scene_start_time = 0
 
     # ========== 3. 音频管理 ==========
     def _load_audio_timings(self):
@@ -80,6 +86,15 @@ class MathScene(Scene):
                         duration = item.get('duration')
                         if scene_num and duration:
                             timings[scene_num] = duration
+                        # 词边界时间戳：{'offsets': [秒...], 'durations': [...], 'tokens': [...]}
+                        if scene_num and item.get('boundaries'):
+                            self.audio_boundaries[scene_num] = item['boundaries']
+                        # 读白内部停顿 [[起, 止], ...]（audio_trim.py 写入），适合安排转场
+                        if scene_num and item.get('pauses'):
+                            self.audio_pauses[scene_num] = item['pauses']
+                        # 预解码的 PCM WAV（audio_pcm.py 写入，相对音频目录）
+                        if scene_num and item.get('pcm'):
+                            self.audio_pcm[scene_num] = item['pcm']
             except Exception as e:
                 print(f"Warning: Failed to load audio info: {e}")
 
@@ -94,21 +109,67 @@ class MathScene(Scene):
         """
         添加指定幕的音频
 
-        ⚠️ 注意：如果渲染卡住，尝试注释掉 self.add_sound() 行
+        优先使用 audio_pcm.py 预解码的 PCM WAV（audio/pcm/），渲染进程内无需再解码 MP3；
+        没有预解码文件时不挂载声音（原始 TTS 文件可能是 MP3 数据，add_sound 解码慢且可能卡住）
 
         使用：在每幕开始时调用 self.add_scene_audio(幕号)
         """
+        self.current_scene_num = scene_num
+        self.scene_start_time = self.time
         for sn, name, audio_file, duration in self.SCENES:
             if sn == scene_num:
                 audio_path = os.path.join(self.audio_dir, audio_file)
+                pcm = self.audio_pcm.get(scene_num)
+                pcm_path = os.path.join(self.audio_dir, pcm) if pcm else None
+                if pcm_path and os.path.exists(pcm_path):
+                    self.add_sound(pcm_path)
+                    return duration
                 if os.path.exists(audio_path):
-                    # self.add_sound(audio_path)  # 如果卡住，注释这行
+                    print(f"Warning: 未找到 PCM 音频，跳过 add_sound（运行 scripts/audio_pcm.py 生成）: {audio_path}")
                     return duration
                 else:
                     print(f"Warning: Audio file not found: {audio_path}")
                     return 0
         return 0
 
+    def narration_time(self, scene_num, text):
+        """
+        第 scene_num 幕读白中 text 开始被念出的时刻（秒，相对该幕音频开头）
+
+        按合成时记录的词边界时间戳查找，找不到时返回 None
+        """
+        boundaries = self.audio_boundaries.get(scene_num)
+        if not boundaries:
+            return None
+        starts = []
+        joined = ""
+        for token in boundaries['tokens']:
+            starts.append(len(joined))
+            joined += token.replace(" ", "")
+        pos = joined.find(text.replace(" ", ""))
+        if pos < 0:
+            return None
+        index = max(i for i, start in enumerate(starts) if start <= pos)
+        return boundaries['offsets'][index]
+
+    def wait_until_narration(self, text):
+        """
+        等待到当前幕读白念到 text 的时刻，用于把高亮/动画对齐到读白
+
+        使用：
+            self.add_scene_audio(2)
+            ...
+            self.wait_until_narration("正方形")
+            self.play(Indicate(square))
+        """
+        target = self.narration_time(self.current_scene_num, text)
+        if target is None:
+            print(f"Warning: 读白中未找到「{text}」的时间戳")
+            return
+        remaining = target - (self.time - self.scene_start_time)
+        if remaining > 0:
+            self.wait(remaining)
+
     # ========== 4. 几何计算（必须实现） ==========
     def calculate_geometry(self):
         """